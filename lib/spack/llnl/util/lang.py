@@ -14,6 +14,8 @@
 from six import string_types
 import sys
 
+from ordereddict_backport import OrderedDict
+
 
 # Ignore emacs backups when listing modules
 ignore_modules = [r'^\.#', '~$']
@@ -645,3 +647,79 @@ def uniq(sequence):
             uniq_list.append(element)
             last = element
     return uniq_list
+
+
+#: All the ``LRUCache`` objects created, for ``lru_cache_statistics()``
+_lru_caches = []
+
+
+class LRUCache(object):
+    """A bounded cache that evicts its least recently used entries.
+
+    The cache counts its hits and misses, so that its effectiveness can
+    be reported (see ``lru_cache_statistics()``).
+    """
+
+    def __init__(self, maxsize, name=None):
+        """Create a cache.
+
+        Args:
+            maxsize (int): maximum number of entries in the cache
+            name (str): name of the cache in statistics
+        """
+        self.maxsize = maxsize
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        _lru_caches.append(self)
+
+    def get(self, key, default=None):
+        """Return the value cached for a key, or default on a miss."""
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+
+        # Move the entry to the most recently used end
+        self._data[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Cache a value, evicting the least recently used entry if the
+        cache is full."""
+        self._data.pop(key, None)
+        self._data[key] = value
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries, and reset the statistics."""
+        self._data.clear()
+        self.hits = self.misses = 0
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups that were hits, or None if there were none."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+    def __str__(self):
+        rate = self.hit_rate
+        return '{0}: {1} hits, {2} misses ({3}), {4}/{5} entries'.format(
+            self.name, self.hits, self.misses,
+            'no lookups' if rate is None else '{0:.1%} hits'.format(rate),
+            len(self), self.maxsize)
+
+
+def lru_cache_statistics():
+    """Return the ``LRUCache`` objects that have been looked up."""
+    return [c for c in _lru_caches if c.hits or c.misses]
@@ -6,6 +6,10 @@
 import os
 import fcntl
 import errno
+import signal
+import struct
+import sys
+import threading
 import time
 import socket
 from datetime import datetime
@@ -15,8 +19,9 @@
 
 
 __all__ = ['Lock', 'LockTransaction', 'WriteTransaction', 'ReadTransaction',
-           'LockError', 'LockTimeoutError',
-           'LockPermissionError', 'LockROFileError', 'CantCreateLockError']
+           'LockError', 'LockTimeoutError', 'LockStatistics',
+           'LockPermissionError', 'LockROFileError', 'CantCreateLockError',
+           'lock_statistics', 'reset_lock_statistics']
 
 #: Mapping of supported locks to description
 lock_type = {fcntl.LOCK_SH: 'read', fcntl.LOCK_EX: 'write'}
@@ -25,6 +30,10 @@
 #: for example.
 true_fn = lambda: True
 
+#: Contention statistics for every lock (path and byte range) taken by
+#: this process, keyed by ``(path, start, length)``
+_statistics = {}
+
 
 def _attempts_str(wait_time, nattempts):
     # Don't print anything if we succeeded on the first try
@@ -35,6 +44,81 @@ def _attempts_str(wait_time, nattempts):
     return ' after {0:0.2f}s and {1}'.format(wait_time, attempts)
 
 
+class LockStatistics(object):
+    """Contention statistics for a single lock (file and byte range).
+
+    Records how many times the lock was acquired, how many of those
+    acquisitions had to wait for another process, the total number of
+    attempts and the time spent waiting.  ``holder_pid`` is the pid of the
+    process last observed holding the lock when we had to wait, if the
+    platform lets us query it.
+    """
+
+    def __init__(self, path, start=0, length=0, desc=''):
+        self.path = path
+        self.start = start
+        self.length = length
+        self.desc = desc
+        self.acquisitions = 0
+        self.contended = 0
+        self.attempts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.holder_pid = None
+
+    def record(self, wait_time, nattempts, holder_pid=None):
+        """Record one successful acquisition."""
+        self.acquisitions += 1
+        self.attempts += nattempts
+        self.wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+        if nattempts > 1:
+            self.contended += 1
+        if holder_pid is not None:
+            self.holder_pid = holder_pid
+
+    def __str__(self):
+        location = '{0}[{1}:{2}]{3}'.format(
+            self.path, self.start, self.length, self.desc)
+        holder = ', last holder pid {0}'.format(self.holder_pid) \
+            if self.holder_pid is not None else ''
+        return ('{0}: {1} acquired, {2} contended, {3} attempts, '
+                'waited {4:0.3f}s (max {5:0.3f}s){6}'.format(
+                    location, self.acquisitions, self.contended,
+                    self.attempts, self.wait_time, self.max_wait_time,
+                    holder))
+
+
+def lock_statistics(contended_only=False):
+    """Return the ``LockStatistics`` of this process, longest waits first.
+
+    Args:
+        contended_only (bool): only report locks that had to wait at least
+            once for another process
+    """
+    stats = [s for s in _statistics.values()
+             if s.contended or not contended_only]
+    return sorted(stats, key=lambda s: s.wait_time, reverse=True)
+
+
+def reset_lock_statistics():
+    """Forget all the lock statistics recorded so far."""
+    _statistics.clear()
+
+
+def _in_main_thread():
+    """Whether the calling thread is the interpreter's main thread."""
+    if hasattr(threading, 'main_thread'):
+        return threading.current_thread() is threading.main_thread()
+    # Python 2 has no public API for this; the main thread is the one
+    # the interpreter created, which is always named 'MainThread'.
+    return threading.current_thread().name == 'MainThread'
+
+
+class _LockWatchdogTimeout(Exception):
+    """Raised by the watchdog timer to interrupt a blocking ``lockf()``."""
+
+
 class Lock(object):
     """This is an implementation of a filesystem lock using Python's lockf.
 
@@ -50,7 +134,7 @@ class Lock(object):
     """
 
     def __init__(self, path, start=0, length=0, default_timeout=None,
-                 debug=False, desc=''):
+                 debug=False, desc='', blocking=False):
         """Construct a new lock on the file at ``path``.
 
         By default, the lock applies to the whole file.  Optionally,
@@ -71,6 +155,12 @@ def __init__(self, path, start=0, length=0, default_timeout=None,
             debug (bool): debug mode specific to locking
             desc (str): optional debug message lock description, which is
                 helpful for distinguishing between different Spack locks.
+            blocking (bool): wait for contended locks with a blocking
+                ``lockf()`` call (guarded by a watchdog timer if there is a
+                timeout) instead of polling.  The waiting process is woken
+                up as soon as the lock is released.  Falls back to polling
+                outside of the main thread or if an interval timer is
+                already in use.
         """
         self.path = path
         self._file = None
@@ -92,6 +182,9 @@ def __init__(self, path, start=0, length=0, default_timeout=None,
         # user sets a timeout for each attempt)
         self.default_timeout = default_timeout or None
 
+        # wait for contended locks with blocking calls instead of polling
+        self.blocking = blocking
+
         # PID and host of lock holder (only used in debug mode)
         self.pid = self.old_pid = None
         self.host = self.old_host = None
@@ -137,8 +230,13 @@ def __str__(self):
     def _lock(self, op, timeout=None):
         """This takes a lock using POSIX locks (``fcntl.lockf``).
 
-        The lock is implemented as a spin lock using a nonblocking call
-        to ``lockf()``.
+        By default, the lock is implemented as a spin lock using a
+        nonblocking call to ``lockf()``.  If the lock was created with
+        ``blocking=True``, contended attempts instead wait in a blocking
+        ``lockf()`` call guarded by a watchdog timer.
+
+        Wait time, attempts and the pid of the holder are recorded in the
+        process-wide ``lock_statistics()``.
 
         If the lock times out, it raises a ``LockError``. If the lock is
         successfully acquired, the total wait time and the number of attempts
@@ -178,25 +276,137 @@ def _lock(self, op, timeout=None):
                         .format(lock_type[op], self._start, self._length,
                                 timeout))
 
-        poll_intervals = iter(Lock._poll_interval_generator())
         start_time = time.time()
+        if self._can_block():
+            acquired, num_attempts, holder = self._wait_blocking(
+                op, timeout, start_time)
+        else:
+            acquired, num_attempts, holder = self._wait_polling(
+                op, timeout, start_time)
+
+        # TBD: Is an extra attempt after timeout needed/appropriate?
+        if not acquired:
+            num_attempts += 1
+            acquired = self._poll_lock(op)
+
+        if acquired:
+            total_wait_time = time.time() - start_time
+            self._record_statistics(total_wait_time, num_attempts, holder)
+            return total_wait_time, num_attempts
+
+        raise LockTimeoutError("Timed out waiting for a {0} lock."
+                               .format(lock_type[op]))
+
+    def _wait_polling(self, op, timeout, start_time):
+        """Spin on a nonblocking ``lockf()`` until ``timeout`` expires.
+
+        Returns whether the lock was acquired, the number of attempts, and
+        the pid of the process holding the lock when we first had to wait.
+        """
+        poll_intervals = iter(Lock._poll_interval_generator())
         num_attempts = 0
+        holder = None
         while (not timeout) or (time.time() - start_time) < timeout:
             num_attempts += 1
             if self._poll_lock(op):
-                total_wait_time = time.time() - start_time
-                return total_wait_time, num_attempts
+                return True, num_attempts, holder
 
+            if num_attempts == 1:
+                holder = self._holder_pid(op)
             time.sleep(next(poll_intervals))
 
-        # TBD: Is an extra attempt after timeout needed/appropriate?
-        num_attempts += 1
+        return False, num_attempts, holder
+
+    def _can_block(self):
+        """Whether blocking waits can be used for this attempt.
+
+        The watchdog relies on ``SIGALRM``, which can only be handled in the
+        main thread, and must not clobber a timer armed by someone else.
+        """
+        return (self.blocking and _in_main_thread() and
+                signal.getitimer(signal.ITIMER_REAL)[0] == 0)
+
+    def _wait_blocking(self, op, timeout, start_time):
+        """Wait for the lock in a blocking ``lockf()`` call.
+
+        Uncontended locks are taken with a single nonblocking attempt.
+        Otherwise, the process sleeps in the kernel until the lock is
+        released, or until the watchdog timer interrupts the call after
+        ``timeout`` seconds.  If the kernel refuses to block because it
+        detects a potential deadlock (``EDEADLK``), this falls back to
+        polling for the rest of ``timeout``.
+
+        Returns whether the lock was acquired, the number of attempts, and
+        the pid of the process holding the lock when we started waiting.
+        """
         if self._poll_lock(op):
-            total_wait_time = time.time() - start_time
-            return total_wait_time, num_attempts
+            return True, 1, None
 
-        raise LockTimeoutError("Timed out waiting for a {0} lock."
-                               .format(lock_type[op]))
+        holder = self._holder_pid(op)
+
+        def watchdog(signum, frame):
+            raise _LockWatchdogTimeout()
+
+        deadlock = False
+        old_handler = signal.signal(signal.SIGALRM, watchdog)
+        try:
+            if timeout:
+                signal.setitimer(signal.ITIMER_REAL, timeout)
+            fcntl.lockf(self._file, op, self._length, self._start,
+                        os.SEEK_SET)
+            acquired = True
+        except _LockWatchdogTimeout:
+            # The timer may also fire right after lockf() returns; the
+            # final nonblocking attempt in _lock() settles that case.
+            acquired = False
+        except (IOError, OSError) as e:
+            if e.errno != errno.EDEADLK:
+                raise
+            acquired, deadlock = False, True
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old_handler)
+
+        if deadlock:
+            self._log_debug("{0} locking [{1}:{2}]: potential deadlock, "
+                            "falling back to polling"
+                            .format(lock_type[op], self._start, self._length))
+            acquired, num_attempts, _ = self._wait_polling(
+                op, timeout, start_time)
+            return acquired, num_attempts + 2, holder
+
+        if acquired:
+            self._on_lock_acquired(op)
+        return acquired, 2, holder
+
+    def _holder_pid(self, op):
+        """Pid of a process holding a lock that conflicts with ``op``.
+
+        This uses ``F_GETLK``, whose ``struct flock`` layout is only known
+        here for 64-bit Linux; elsewhere this returns ``None``.
+        """
+        if not (sys.platform.startswith('linux') and
+                struct.calcsize('P') == 8):
+            return None
+
+        l_type = fcntl.F_WRLCK if op == fcntl.LOCK_EX else fcntl.F_RDLCK
+        flock = struct.pack('hhqqi', l_type, os.SEEK_SET, self._start,
+                            self._length, 0)
+        try:
+            result = fcntl.fcntl(self._file, fcntl.F_GETLK, flock)
+        except (IOError, OSError):
+            return None
+
+        l_type, _, _, _, pid = struct.unpack('hhqqi', result)
+        return pid if l_type != fcntl.F_UNLCK else None
+
+    def _record_statistics(self, wait_time, nattempts, holder_pid):
+        key = (self.path, self._start, self._length)
+        stats = _statistics.get(key)
+        if stats is None:
+            stats = _statistics[key] = LockStatistics(
+                self.path, self._start, self._length, self.desc)
+        stats.record(wait_time, nattempts, holder_pid)
 
     def _poll_lock(self, op):
         """Attempt to acquire the lock in a non-blocking manner. Return whether
@@ -208,19 +418,7 @@ def _poll_lock(self, op):
             # Try to get the lock (will raise if not available.)
             fcntl.lockf(self._file, op | fcntl.LOCK_NB,
                         self._length, self._start, os.SEEK_SET)
-
-            # help for debugging distributed locking
-            if self.debug:
-                # All locks read the owner PID and host
-                self._read_log_debug_data()
-                self._log_debug('{0} locked {1} [{2}:{3}] (owner={4})'
-                                .format(lock_type[op], self.path,
-                                        self._start, self._length, self.pid))
-
-                # Exclusive locks write their PID/host
-                if op == fcntl.LOCK_EX:
-                    self._write_log_debug_data()
-
+            self._on_lock_acquired(op)
             return True
 
         except IOError as e:
@@ -230,6 +428,20 @@ def _poll_lock(self, op):
 
         return False
 
+    def _on_lock_acquired(self, op):
+        """Record the lock owner, which helps debugging distributed locking.
+        """
+        if self.debug:
+            # All locks read the owner PID and host
+            self._read_log_debug_data()
+            self._log_debug('{0} locked {1} [{2}:{3}] (owner={4})'
+                            .format(lock_type[op], self.path,
+                                    self._start, self._length, self.pid))
+
+            # Exclusive locks write their PID/host
+            if op == fcntl.LOCK_EX:
+                self._write_log_debug_data()
+
     def _ensure_parent_directory(self):
         parent = os.path.dirname(self.path)
 
@@ -4,6 +4,7 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import codecs
+import multiprocessing.pool
 import os
 import re
 import tarfile
@@ -26,8 +27,10 @@
 import spack.config as config
 import spack.database as spack_db
 import spack.fetch_strategy as fs
+import spack.util.compression as compression
 import spack.util.gpg
 import spack.relocate as relocate
+import spack.util.spack_json as sjson
 import spack.util.spack_yaml as syaml
 import spack.mirror
 import spack.util.url as url_util
@@ -38,6 +41,13 @@
 
 _build_cache_relative_path = 'build_cache'
 
+#: Extension of the compressed tarball in .spack archives, by format
+_tarball_compressions = {
+    'gzip': 'gz',
+    'bzip2': 'bz2',
+    'zstd': 'zst',
+}
+
 BUILD_CACHE_INDEX_TEMPLATE = '''
 <html>
 <head>
@@ -108,6 +118,13 @@ class NoChecksumException(spack.error.SpackError):
     pass
 
 
+class InvalidTarballException(spack.error.SpackError):
+    """
+    Raised if a package tarball does not contain an install prefix.
+    """
+    pass
+
+
 class NewLayoutException(spack.error.SpackError):
     """
     Raised if directory layout is different from buildcache.
@@ -237,16 +254,33 @@ def tarball_path_name(spec, ext):
 
 def checksum_tarball(file):
     # calculate sha256 hash of tar file
+    with open(file, 'rb') as tfile:
+        return _checksum_stream(tfile)
+
+
+def _checksum_stream(fileobj):
+    """sha256 hash of the data read from a binary file object."""
     block_size = 65536
     hasher = hashlib.sha256()
-    with open(file, 'rb') as tfile:
-        buf = tfile.read(block_size)
-        while len(buf) > 0:
-            hasher.update(buf)
-            buf = tfile.read(block_size)
+    buf = fileobj.read(block_size)
+    while len(buf) > 0:
+        hasher.update(buf)
+        buf = fileobj.read(block_size)
     return hasher.hexdigest()
 
 
+class _HashingWriter(object):
+    """Wraps a binary file object, hashing the data written to it."""
+
+    def __init__(self, fileobj, hasher):
+        self.fileobj = fileobj
+        self.hasher = hasher
+
+    def write(self, data):
+        self.hasher.update(data)
+        self.fileobj.write(data)
+
+
 def sign_tarball(key, force, specfile_path):
     # Sign the packages if keys available
     if spack.util.gpg.Gpg.gpg() is None:
@@ -282,7 +316,9 @@ def generate_package_index(cache_prefix):
 
     Creates (or replaces) the "index.json" page at the location given in
     cache_prefix.  This page contains a link for each binary package (*.yaml)
-    and public key (*.key) under cache_prefix.
+    and public key (*.key) under cache_prefix.  The full hash of each binary
+    package is recorded in it, so rebuild checks can be answered from the
+    index alone (see ``specs_needing_rebuild()``).
     """
     tmpdir = tempfile.mkdtemp()
     db_root_dir = os.path.join(tmpdir, 'db_root')
@@ -297,20 +333,29 @@ def generate_package_index(cache_prefix):
 
     tty.debug('Retrieving spec.yaml files from {0} to build index'.format(
         cache_prefix))
+    full_hashes = {}
     for file_path in file_list:
         try:
             yaml_url = url_util.join(cache_prefix, file_path)
             tty.debug('fetching {0}'.format(yaml_url))
             _, _, yaml_file = web_util.read_from_url(yaml_url)
             yaml_contents = codecs.getreader('utf-8')(yaml_file).read()
-            # yaml_obj = syaml.load(yaml_contents)
-            # s = Spec.from_yaml(yaml_obj)
-            s = Spec.from_yaml(yaml_contents)
+            yaml_obj = syaml.load(yaml_contents)
+            s = Spec.from_dict(yaml_obj)
             db.add(s, None)
+            full_hash = yaml_obj.get('full_hash')
+            if full_hash:
+                full_hashes[s.dag_hash()] = full_hash
         except (URLError, web_util.SpackWebError) as url_err:
             tty.error('Error reading spec.yaml: {0}'.format(file_path))
             tty.error(url_err)
 
+    # records may have been added as dependencies of other specs, before
+    # their own spec.yaml was read, so set the full hashes once all are in
+    for dag_hash, full_hash in full_hashes.items():
+        if dag_hash in db._data:
+            db._data[dag_hash].spec._full_hash = full_hash
+
     try:
         index_json_path = os.path.join(db_root_dir, 'index.json')
         with open(index_json_path, 'w') as f:
@@ -338,7 +383,9 @@ def build_tarball(spec, outdir, force=False, rel=False, unsigned=False,
     tmpdir = tempfile.mkdtemp()
     cache_prefix = build_cache_prefix(tmpdir)
 
-    tarfile_name = tarball_name(spec, '.tar.gz')
+    compress = _tarball_compressions[
+        config.get('config:buildcache_compression', 'gzip')]
+    tarfile_name = tarball_name(spec, '.tar.' + compress)
     tarfile_dir = os.path.join(cache_prefix, tarball_directory_name(spec))
     tarfile_path = os.path.join(tarfile_dir, tarfile_name)
     spackfile_path = os.path.join(
@@ -371,19 +418,11 @@ def build_tarball(spec, outdir, force=False, rel=False, unsigned=False,
         else:
             raise NoOverwriteException(url_util.format(remote_specfile_path))
 
-    # make a copy of the install directory to work with
+    # the install directory is archived in place: workdir only holds the
+    # files that differ from it in the tarball, i.e. the buildinfo file
+    # and, with relative rpaths, copies of the binaries and links to change
     workdir = os.path.join(tmpdir, os.path.basename(spec.prefix))
-    # install_tree copies hardlinks
-    # create a temporary tarfile from prefix and exract it to workdir
-    # tarfile preserves hardlinks
-    temp_tarfile_name = tarball_name(spec, '.tar')
-    temp_tarfile_path = os.path.join(tarfile_dir, temp_tarfile_name)
-    with closing(tarfile.open(temp_tarfile_path, 'w')) as tar:
-        tar.add(name='%s' % spec.prefix,
-                arcname='.')
-    with closing(tarfile.open(temp_tarfile_path, 'r')) as tar:
-        tar.extractall(workdir)
-    os.remove(temp_tarfile_path)
+    mkdirp(os.path.join(workdir, '.spack'))
 
     # create info for later relocation and create tar
     write_buildinfo_file(spec, workdir, rel)
@@ -392,6 +431,7 @@ def build_tarball(spec, outdir, force=False, rel=False, unsigned=False,
     # in the spack install tree before creating tarball
     if rel:
         try:
+            copy_files_to_relocate(workdir, spec)
             make_package_relative(workdir, spec, allow_root)
         except Exception as e:
             shutil.rmtree(workdir)
@@ -407,16 +447,19 @@ def build_tarball(spec, outdir, force=False, rel=False, unsigned=False,
             shutil.rmtree(tmpdir)
             tty.die(e)
 
-    # create gzip compressed tarball of the install prefix
-    with closing(tarfile.open(tarfile_path, 'w:gz')) as tar:
-        tar.add(name='%s' % workdir,
-                arcname='%s' % os.path.basename(spec.prefix))
-    # remove copy of install directory
+    # create compressed tarball of the install prefix, computing its
+    # sha256 checksum on the way
+    hasher = hashlib.sha256()
+    with open(tarfile_path, 'wb') as f:
+        with compression.compressing_writer(
+                _HashingWriter(f, hasher), compress) as stream:
+            with closing(tarfile.open(fileobj=stream, mode='w|')) as tar:
+                add_prefix_to_tarball(
+                    tar, spec.prefix, workdir, os.path.basename(spec.prefix))
+    checksum = hasher.hexdigest()
+    # remove files changed for the tarball
     shutil.rmtree(workdir)
 
-    # get the sha256 checksum of the tarball
-    checksum = checksum_tarball(tarfile_path)
-
     # add sha256 checksum to spec.yaml
     with open(spec_file, 'r') as inputfile:
         content = inputfile.read()
@@ -546,10 +589,55 @@ def check_package_relocatable(workdir, spec, allow_root):
     buildinfo = read_buildinfo_file(workdir)
     cur_path_names = list()
     for filename in buildinfo['relocate_binaries']:
-        cur_path_names.append(os.path.join(workdir, filename))
+        cur_path_names.append(os.path.join(spec.prefix, filename))
     relocate.raise_if_not_relocatable(cur_path_names, allow_root)
 
 
+def copy_files_to_relocate(workdir, spec):
+    """
+    Copy the binaries and links listed in the buildinfo file of workdir
+    from the install prefix to workdir, so they can be made relative.
+    """
+    buildinfo = read_buildinfo_file(workdir)
+    for filename in (buildinfo['relocate_binaries'] +
+                     buildinfo.get('relocate_links', [])):
+        src = os.path.join(spec.prefix, filename)
+        dest = os.path.join(workdir, filename)
+        mkdirp(os.path.dirname(dest))
+        if os.path.islink(src):
+            os.symlink(os.readlink(src), dest)
+        else:
+            shutil.copy2(src, dest)
+
+
+def add_prefix_to_tarball(tar, prefix, workdir, arcname):
+    """
+    Add the install prefix to an open tarfile under arcname, taking
+    the files that exist in workdir from there instead.
+    """
+    def add(rel_path):
+        name = os.path.join(workdir, rel_path)
+        is_dir = os.path.isdir(name) and not os.path.islink(name)
+        if is_dir or not os.path.lexists(name):
+            name = os.path.join(prefix, rel_path)
+        tar.add(name=name, arcname=os.path.normpath(
+            os.path.join(arcname, rel_path)), recursive=False)
+
+    add('.')
+    for root, dirs, files in os.walk(prefix):
+        dirs.sort()
+        for entry in sorted(dirs + files):
+            add(os.path.relpath(os.path.join(root, entry), prefix))
+
+    # files that only exist in workdir, like the buildinfo file
+    for root, dirs, files in os.walk(workdir):
+        for entry in sorted(files):
+            path = os.path.join(root, entry)
+            rel_path = os.path.relpath(path, workdir)
+            if not os.path.lexists(os.path.join(prefix, rel_path)):
+                add(rel_path)
+
+
 def relocate_package(spec, allow_root):
     """
     Relocate the given package
@@ -680,17 +768,21 @@ def extract_tarball(spec, filename, allow_root=False, unsigned=False,
     stagepath = os.path.dirname(filename)
     spackfile_name = tarball_name(spec, '.spack')
     spackfile_path = os.path.join(stagepath, spackfile_name)
-    tarfile_name = tarball_name(spec, '.tar.gz')
-    tarfile_path = os.path.join(tmpdir, tarfile_name)
     specfile_name = tarball_name(spec, '.spec.yaml')
     specfile_path = os.path.join(tmpdir, specfile_name)
 
+    # only the spec file and its signature are written to disk, the
+    # tarball is extracted straight from the .spack archive below
     with closing(tarfile.open(spackfile_path, 'r')) as tar:
-        tar.extractall(tmpdir)
-    # some buildcache tarfiles use bzip2 compression
-    if not os.path.exists(tarfile_path):
-        tarfile_name = tarball_name(spec, '.tar.bz2')
-        tarfile_path = os.path.join(tmpdir, tarfile_name)
+        names = tar.getnames()
+        for name in (specfile_name, '%s.asc' % specfile_name):
+            if name in names:
+                tar.extract(name, tmpdir)
+    # the tarball may be compressed with gzip, bzip2 or zstd
+    for compress in ('gz', 'bz2', 'zst'):
+        tarfile_name = tarball_name(spec, '.tar.' + compress)
+        if tarfile_name in names:
+            break
     if not unsigned:
         if os.path.exists('%s.asc' % specfile_path):
             try:
@@ -705,9 +797,6 @@ def extract_tarball(spec, filename, allow_root=False, unsigned=False,
                 "Package spec file failed signature verification.\n"
                 "Use spack buildcache keys to download "
                 "and install a key for verification from the mirror.")
-    # get the sha256 checksum of the tarball
-    checksum = checksum_tarball(tarfile_path)
-
     # get the sha256 checksum recorded at creation
     spec_dict = {}
     with open(specfile_path, 'r') as inputfile:
@@ -715,13 +804,6 @@ def extract_tarball(spec, filename, allow_root=False, unsigned=False,
         spec_dict = syaml.load(content)
     bchecksum = spec_dict['binary_cache_checksum']
 
-    # if the checksums don't match don't install
-    if bchecksum['hash'] != checksum:
-        shutil.rmtree(tmpdir)
-        raise NoChecksumException(
-            "Package tarball failed checksum verification.\n"
-            "It cannot be installed.")
-
     new_relative_prefix = str(os.path.relpath(spec.prefix,
                                               spack.store.layout.root))
     # if the original relative prefix is in the spec file use it
@@ -742,29 +824,49 @@ def extract_tarball(spec, filename, allow_root=False, unsigned=False,
 #        msg += "uses relative rpaths."
 #        raise NewLayoutException(msg)
 
-    # extract the tarball in a temp directory
-    with closing(tarfile.open(tarfile_path, 'r')) as tar:
-        tar.extractall(path=tmpdir)
+    # if the checksums don't match don't install. The tarball is hashed
+    # straight from the .spack archive, so nothing unverified is written.
+    with closing(tarfile.open(spackfile_path, 'r')) as tar:
+        tarball_checksum = _checksum_stream(tar.extractfile(tarfile_name))
+    if bchecksum['hash'] != tarball_checksum:
+        shutil.rmtree(tmpdir)
+        raise NoChecksumException(
+            "Package tarball failed checksum verification.\n"
+            "It cannot be installed.")
+
+    # extract the tarball in a temp directory next to the prefix, in a
+    # single pass that decompresses it (in parallel when possible)
+    parent = os.path.dirname(spec.prefix)
+    mkdirp(parent)
+    extractdir = tempfile.mkdtemp(
+        dir=parent, prefix='.%s-' % os.path.basename(spec.prefix))
+    try:
+        with closing(tarfile.open(spackfile_path, 'r')) as tar:
+            compression.untar_stream(
+                tar.extractfile(tarfile_name), compress, extractdir)
+    except Exception:
+        shutil.rmtree(extractdir)
+        shutil.rmtree(tmpdir)
+        raise
+
     # get the parent directory of the file .spack/binary_distribution
     # this should the directory unpacked from the tarball whose
     # name is unknown because the prefix naming is unknown
-    bindist_file = glob.glob('%s/*/.spack/binary_distribution' % tmpdir)[0]
-    workdir = re.sub('/.spack/binary_distribution$', '', bindist_file)
+    bindist_files = glob.glob(
+        '%s/*/.spack/binary_distribution' % extractdir)
+    if not bindist_files:
+        shutil.rmtree(extractdir)
+        shutil.rmtree(tmpdir)
+        raise InvalidTarballException(
+            "Package tarball has no .spack/binary_distribution file.\n"
+            "It cannot be installed.")
+    workdir = re.sub('/.spack/binary_distribution$', '', bindist_files[0])
     tty.debug('workdir %s' % workdir)
-    # install_tree copies hardlinks
-    # create a temporary tarfile from prefix and exract it to workdir
-    # tarfile preserves hardlinks
-    temp_tarfile_name = tarball_name(spec, '.tar')
-    temp_tarfile_path = os.path.join(tmpdir, temp_tarfile_name)
-    with closing(tarfile.open(temp_tarfile_path, 'w')) as tar:
-        tar.add(name='%s' % workdir,
-                arcname='.')
-    with closing(tarfile.open(temp_tarfile_path, 'r')) as tar:
-        tar.extractall(spec.prefix)
-    os.remove(temp_tarfile_path)
+    # moving the extracted directory into place preserves hardlinks
+    os.rename(workdir, spec.prefix)
+    shutil.rmtree(extractdir)
 
     # cleanup
-    os.remove(tarfile_path)
     os.remove(specfile_path)
 
     try:
@@ -1014,6 +1116,71 @@ def needs_rebuild(spec, mirror_url, rebuild_on_errors=False):
     return False
 
 
+def read_index_full_hashes(mirror_url):
+    """Read the full hashes recorded in the build cache index of a mirror.
+
+    Returns:
+        (dict): the full hash of each spec in the index, by DAG hash. It is
+            empty if the index could not be read, or predates full hashes.
+    """
+    index_url = url_util.join(build_cache_prefix(mirror_url), 'index.json')
+    try:
+        _, _, index_file = web_util.read_from_url(index_url,
+                                                  'application/json')
+        index = sjson.load(codecs.getreader('utf-8')(index_file).read())
+        installs = index['database']['installs']
+    except (URLError, web_util.SpackWebError, ValueError, KeyError) as e:
+        tty.debug('Failed to read index {0}'.format(index_url), e)
+        return {}
+
+    full_hashes = {}
+    for dag_hash, record in installs.items():
+        node = next(iter(record['spec'].values()))
+        if 'full_hash' in node:
+            full_hashes[dag_hash] = node['full_hash']
+    return full_hashes
+
+
+def specs_needing_rebuild(specs, mirror_url, rebuild_on_errors=False,
+                          concurrency=32):
+    """Check many specs against the build cache of a mirror at once.
+
+    The full hashes recorded in the build cache index are read once, and
+    the specs they match are up to date.  The index may be older than the
+    binaries it describes, so the ``spec.yaml`` of the other specs is read
+    as ``needs_rebuild()`` does, ``concurrency`` at a time.
+
+    Returns:
+        (list): the specs that need to be rebuilt, in the order given
+    """
+    full_hashes = read_index_full_hashes(mirror_url)
+
+    to_check = {}
+    for spec in specs:
+        if not spec.concrete:
+            raise ValueError('spec must be concrete to check against mirror')
+        if full_hashes.get(spec.dag_hash()) != spec.full_hash():
+            to_check.setdefault(spec.dag_hash(), spec)
+    tty.debug('{0} specs to check against {1} after reading its index'
+              .format(len(to_check), mirror_url))
+    if not to_check:
+        return []
+
+    def check(spec):
+        return needs_rebuild(spec, mirror_url, rebuild_on_errors)
+
+    pool = multiprocessing.pool.ThreadPool(min(concurrency, len(to_check)))
+    try:
+        rebuild = pool.map(check, to_check.values())
+    finally:
+        pool.terminate()
+        pool.join()
+
+    rebuild_hashes = set(
+        h for h, needed in zip(to_check, rebuild) if needed)
+    return [s for s in specs if s.dag_hash() in rebuild_hashes]
+
+
 def check_specs_against_mirrors(mirrors, specs, output_file=None,
                                 rebuild_on_errors=False):
     """Check all the given specs against buildcaches on the given mirrors and
@@ -1039,12 +1206,12 @@ def check_specs_against_mirrors(mirrors, specs, output_file=None,
 
         rebuild_list = []
 
-        for spec in specs:
-            if needs_rebuild(spec, mirror.fetch_url, rebuild_on_errors):
-                rebuild_list.append({
-                    'short_spec': spec.short_spec,
-                    'hash': spec.dag_hash()
-                })
+        for spec in specs_needing_rebuild(
+                specs, mirror.fetch_url, rebuild_on_errors):
+            rebuild_list.append({
+                'short_spec': spec.short_spec,
+                'hash': spec.dag_hash()
+            })
 
         if rebuild_list:
             rebuilds[mirror.fetch_url] = {
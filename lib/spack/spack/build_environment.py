@@ -40,6 +40,7 @@
 import traceback
 import types
 from six import StringIO
+from six.moves import shlex_quote as cmd_quote
 
 import llnl.util.tty as tty
 from llnl.util.tty.color import cescape, colorize
@@ -92,6 +93,11 @@
 SPACK_DEBUG_LOG_DIR = 'SPACK_DEBUG_LOG_DIR'
 SPACK_CCACHE_BINARY = 'SPACK_CCACHE_BINARY'
 SPACK_SYSTEM_DIRS = 'SPACK_SYSTEM_DIRS'
+SPACK_CC_CACHE_FILE = 'SPACK_CC_CACHE_FILE'
+
+#: Name of the file, in the stage directory, where the argument lists of
+#: the compiler wrapper are precomputed for a build
+_spack_cc_cache_file = 'spack-cc-cache.sh'
 
 
 # Platform-specific library suffix.
@@ -443,6 +449,89 @@ def set_build_environment_variables(pkg, env, dirty):
     return env
 
 
+def _bash_read_array(value, separator):
+    """Split ``value`` like ``IFS=<separator> read -ra`` does in bash."""
+    value = value.split('\n', 1)[0]
+    if separator == ' ':
+        return value.split()
+    fields = value.split(separator)
+    if fields[-1] == '':
+        fields.pop()
+    return fields
+
+
+#: Arrays of the compiler wrapper that are precomputed, and the variables
+#: (and separators) they are read from
+_wrapper_arrays = [
+    ('SPACK_SYSTEM_DIRS', 'SPACK_SYSTEM_DIRS', ':'),
+    ('SPACK_FFLAGS', 'SPACK_FFLAGS', ' '),
+    ('SPACK_CPPFLAGS', 'SPACK_CPPFLAGS', ' '),
+    ('SPACK_CFLAGS', 'SPACK_CFLAGS', ' '),
+    ('SPACK_CXXFLAGS', 'SPACK_CXXFLAGS', ' '),
+    ('SPACK_LDFLAGS', 'SPACK_LDFLAGS', ' '),
+    ('SPACK_LDLIBS', 'SPACK_LDLIBS', ' '),
+    ('rpath_dirs', SPACK_RPATH_DIRS, ':'),
+    ('link_dirs', SPACK_LINK_DIRS, ':'),
+    ('extra_rpaths', 'SPACK_COMPILER_EXTRA_RPATHS', ':'),
+    ('implicit_rpaths', 'SPACK_COMPILER_IMPLICIT_RPATHS', ':'),
+    ('spack_include_dirs', SPACK_INCLUDE_DIRS, ':'),
+]
+
+
+def wrapper_cache_contents(environ):
+    """Return a bash script with the compiler wrapper's argument lists.
+
+    ``lib/spack/env/cc`` sources this script instead of splitting the
+    ``SPACK_*`` variables and filtering ``PATH`` on every invocation. Each
+    part of the script only takes effect if the variables it was computed
+    from still have the same values, so the wrapper computes the lists
+    itself if the environment changes during the build.
+
+    Args:
+        environ (dict): the build environment
+    """
+    def guard(names):
+        return ' && '.join(
+            '"${0}" == {1}'.format(n, cmd_quote(environ.get(n, '')))
+            for n in names)
+
+    lines = ['# Generated by Spack, sourced by the compiler wrapper']
+    lines.append('if [[ {0} ]]; then'.format(
+        guard(v for _, v, _ in _wrapper_arrays)))
+    for array, variable, separator in _wrapper_arrays:
+        items = _bash_read_array(environ.get(variable, ''), separator)
+        lines.append('    {0}=({1})'.format(
+            array, ' '.join(cmd_quote(i) for i in items)))
+    lines.append('    cached_lists=true')
+    lines.append('fi')
+
+    # PATH without the directories of the compiler wrappers
+    env_dirs = _bash_read_array(environ.get(SPACK_ENV_PATH, ''), ':')
+    env_dirs += ['', '.']
+    path = [d for d in _bash_read_array(environ.get('PATH', ''), ':')
+            if d not in env_dirs]
+    lines.append('if [[ {0} ]]; then'.format(
+        guard(['PATH', SPACK_ENV_PATH])))
+    lines.append('    cached_filtered_path={0}'.format(
+        cmd_quote(':'.join(path))))
+    lines.append('    cached_path=true')
+    lines.append('fi')
+    return '\n'.join(lines) + '\n'
+
+
+def write_wrapper_cache(stage_path):
+    """Precompute the compiler wrapper's argument lists for this build.
+
+    The lists are written to a file in ``stage_path``, which is passed to
+    the wrapper through ``SPACK_CC_CACHE_FILE``. This must be called after
+    the build environment has been set up.
+    """
+    path = os.path.join(stage_path, _spack_cc_cache_file)
+    with open(path, 'w') as f:
+        f.write(wrapper_cache_contents(os.environ))
+    os.environ[SPACK_CC_CACHE_FILE] = path
+
+
 def _set_variables_for_single_module(pkg, module):
     """Helper function to set module variables for single module."""
     # Put a marker on this module so that it won't execute the body of this
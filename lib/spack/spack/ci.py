@@ -5,6 +5,7 @@
 
 import base64
 import datetime
+import hashlib
 import json
 import os
 import shutil
@@ -20,6 +21,7 @@
 
 import spack
 import spack.binary_distribution as bindist
+import spack.caches
 import spack.cmd.buildcache as buildcache
 import spack.compilers as compilers
 import spack.config as cfg
@@ -37,6 +39,9 @@
     'always',
 ]
 
+#: Version of the format of staged jobs in the misc cache
+staged_jobs_cache_version = 1
+
 spack_gpg = SpackCommand('gpg')
 spack_compiler = SpackCommand('compiler')
 
@@ -225,13 +230,15 @@ def get_spec_dependencies(specs, deps, spec_labels):
             _add_dependency(entry['spec'], entry['depends'], deps)
 
 
-def stage_spec_jobs(specs):
+def stage_spec_jobs(specs, balance=False):
     """Take a set of release specs and generate a list of "stages", where the
         jobs in any stage are dependent only on jobs in previous stages.  This
         allows us to maximize build parallelism within the gitlab-ci framework.
 
     Arguments:
         specs (Iterable): Specs to build
+        balance (bool): Spread jobs off the critical path evenly over the
+            stages (see ``compute_stages()``)
 
     Returns: A tuple of information objects describing the specs, dependencies
         and stages:
@@ -250,46 +257,154 @@ def stage_spec_jobs(specs):
             the keys in the spec_labels and deps objects.
 
     """
+    deps = {}
+    spec_labels = {}
 
-    # The convenience method below, "remove_satisfied_deps()", does not modify
-    # the "deps" parameter.  Instead, it returns a new dictionary where only
-    # dependencies which have not yet been satisfied are included in the
-    # return value.
-    def remove_satisfied_deps(deps, satisfied_list):
-        new_deps = {}
+    get_spec_dependencies(specs, deps, spec_labels)
 
-        for key, value in iteritems(deps):
-            new_value = set([v for v in value if v not in satisfied_list])
-            if new_value:
-                new_deps[key] = new_value
+    return spec_labels, deps, compute_stages(spec_labels, deps, balance)
 
-        return new_deps
 
-    deps = {}
-    spec_labels = {}
+def compute_stages(labels, deps, balance=False):
+    """Assign jobs to stages, so that each job only depends on jobs in
+    previous stages.
 
-    get_spec_dependencies(specs, deps, spec_labels)
+    By default each job is put in the earliest stage it can be in, in time
+    linear in the number of jobs and dependencies.  The number of stages
+    is the length of the longest chain of dependencies (the critical path),
+    and does not change when ``balance`` is ``True``, but then the jobs
+    that are not on the critical path are moved to less crowded stages,
+    within the range allowed by their dependencies and dependents.  This
+    never makes the largest stage larger, evens out the number of runners
+    needed over the pipeline, and takes time proportional to the number of
+    jobs times the number of stages at worst.
+
+    Arguments:
+        labels (Iterable): the labels of the jobs
+        deps (dict): the set of labels of the dependencies of each job,
+            keyed on its label
+        balance (bool): whether to balance the number of jobs per stage
+
+    Returns: An ordered list of sets of job labels, one for each stage.
+    """
+    labels = sorted(labels)
+    index = dict((label, i) for i, label in enumerate(labels))
+
+    # Dependencies and dependents of each job, by index
+    dependencies = [[] for _ in labels]
+    dependents = [[] for _ in labels]
+    for label, dep_labels in iteritems(deps):
+        i = index[label]
+        for dep_label in dep_labels:
+            j = index.get(dep_label)
+            if j is not None and j != i:
+                dependencies[i].append(j)
+                dependents[j].append(i)
+
+    # Kahn's algorithm: a job is staged right after its last dependency
+    stage = [0] * len(labels)
+    missing = [len(d) for d in dependencies]
+    order = [i for i, n in enumerate(missing) if not n]
+    for i in order:
+        for j in dependents[i]:
+            stage[j] = max(stage[j], stage[i] + 1)
+            missing[j] -= 1
+            if not missing[j]:
+                order.append(j)
+
+    if len(order) != len(labels):
+        cycle = [labels[i] for i, n in enumerate(missing) if n]
+        raise SpackError('Cannot stage jobs with circular dependencies: '
+                         '{0}'.format(', '.join(cycle)))
+
+    nstages = max(stage) + 1 if stage else 0
+
+    if balance:
+        # Starting from the last jobs, move each job to the stage with the
+        # fewest jobs between its dependencies and its dependents, if that
+        # lowers the number of jobs in its current stage.  Jobs on the
+        # critical path have nowhere to go.
+        load = [0] * nstages
+        for i in order:
+            load[stage[i]] += 1
+        for i in reversed(order):
+            earliest = max([stage[j] + 1 for j in dependencies[i]] or [0])
+            latest = min([stage[j] - 1 for j in dependents[i]] or
+                         [nstages - 1])
+            best = min(range(earliest, latest + 1), key=lambda s: load[s])
+            if load[best] + 1 < load[stage[i]]:
+                load[stage[i]] -= 1
+                load[best] += 1
+                stage[i] = best
+
+    stages = [set() for _ in range(nstages)]
+    for i, label in enumerate(labels):
+        stages[stage[i]].add(label)
+    return stages
+
+
+def _staged_jobs_cache_key(specs, balance):
+    """Key of the staged jobs of concrete specs in the misc cache.
+
+    The build hash of a spec covers its whole DAG, so the staged jobs only
+    change when the concrete specs in the lockfile do."""
+    sha = hashlib.sha256()
+    sha.update('{0}:{1}'.format(staged_jobs_cache_version, balance)
+               .encode('utf-8'))
+    for spec in specs:
+        sha.update(spec.build_hash().encode('utf-8'))
+    return 'ci/staged-jobs-{0}.json'.format(sha.hexdigest())
+
+
+def stage_env_spec_jobs(env, phase_name, balance=False):
+    """Stage the jobs of one phase of a CI environment.
+
+    Specs of the phase that are concrete in the environment are not
+    concretized again, and when all of them are, the result of
+    ``stage_spec_jobs()`` is cached in the misc cache, keyed on the
+    concrete specs.
+
+    Arguments:
+        env (Environment): the concretized environment
+        phase_name (str): name of the spec list of the phase
+        balance (bool): whether to balance the number of jobs per stage
 
-    # Save the original deps, as we need to return them at the end of the
-    # function.  In the while loop below, the "dependencies" variable is
-    # overwritten rather than being modified each time through the loop,
-    # thus preserving the original value of "deps" saved here.
-    dependencies = deps
-    unstaged = set(spec_labels.keys())
-    stages = []
-
-    while dependencies:
-        dependents = set(dependencies.keys())
-        next_stage = unstaged.difference(dependents)
-        stages.append(next_stage)
-        unstaged.difference_update(next_stage)
-        # Note that "dependencies" is a dictionary mapping each dependent
-        # package to the set of not-yet-handled dependencies.  The final step
-        # below removes all the dependencies that are handled by this stage.
-        dependencies = remove_satisfied_deps(dependencies, next_stage)
-
-    if unstaged:
-        stages.append(unstaged.copy())
+    Returns: the same tuple as ``stage_spec_jobs()``
+    """
+    concretized = dict(env.concretized_specs())
+    specs = [concretized.get(s, s) for s in env.spec_lists[phase_name]]
+    if not all(s.concrete for s in specs):
+        return stage_spec_jobs(specs, balance)
+
+    misc_cache = spack.caches.misc_cache
+    key = _staged_jobs_cache_key(specs, balance)
+    if misc_cache.init_entry(key):
+        with misc_cache.read_transaction(key) as f:
+            cached = json.load(f)
+        tty.debug('Using staged jobs for {0} from the cache'
+                  .format(phase_name))
+        spec_labels = dict(
+            (label, {'spec': Spec(entry['spec']),
+                     'rootSpec': specs[entry['root']]})
+            for label, entry in cached['specs'].items())
+        deps = dict((label, set(labels))
+                    for label, labels in cached['dependencies'].items())
+        stages = [set(stage) for stage in cached['stages']]
+        return spec_labels, deps, stages
+
+    spec_labels, deps, stages = stage_spec_jobs(specs, balance)
+
+    roots = dict((id(s), i) for i, s in enumerate(specs))
+    with misc_cache.write_transaction(key) as (old, new):
+        json.dump({
+            'specs': dict(
+                (label, {'spec': str(entry['spec']),
+                         'root': roots[id(entry['rootSpec'])]})
+                for label, entry in spec_labels.items()),
+            'dependencies': dict(
+                (label, sorted(labels)) for label, labels in deps.items()),
+            'stages': [sorted(stage) for stage in stages],
+        }, new)
 
     return spec_labels, deps, stages
 
@@ -388,11 +503,17 @@ def append_dep(s, d):
                 continue
 
             skey, slabel = spec_deps_key_label(s)
+            append_dep(rlabel, slabel)
+
+            # Nodes shared by several roots are only described once
+            if slabel in spec_labels:
+                spec_labels[slabel]['root'] = root_spec
+                continue
+
             spec_labels[slabel] = {
                 'spec': get_spec_string(s),
                 'root': root_spec,
             }
-            append_dep(rlabel, slabel)
 
             for d in s.dependencies(deptype=all):
                 dkey, dlabel = spec_deps_key_label(d)
@@ -450,11 +571,16 @@ def format_job_needs(phase_name, strip_compilers, dep_jobs,
 
 def generate_gitlab_ci_yaml(env, print_summary, output_file,
                             custom_spack_repo=None, custom_spack_ref=None,
-                            run_optimizer=False, use_dependencies=False):
+                            run_optimizer=False, use_dependencies=False,
+                            prune_dag=False):
     # FIXME: What's the difference between one that opens with 'spack'
     # and one that opens with 'env'?  This will only handle the former.
+    # Only specs that are not in the lockfile yet are concretized, and the
+    # lockfile is updated so that the next generation can reuse them.
     with spack.concretize.disable_compiler_existence_check():
-        env.concretize()
+        with env.write_transaction():
+            env.concretize()
+            env.write(regenerate_views=False)
 
     yaml_root = ev.config_dict(env.yaml)
 
@@ -511,6 +637,8 @@ def generate_gitlab_ci_yaml(env, print_summary, output_file,
     if 'enable-artifacts-buildcache' in gitlab_ci:
         enable_artifacts_buildcache = gitlab_ci['enable-artifacts-buildcache']
 
+    balance_stages = gitlab_ci.get('balance-stages', False)
+
     bootstrap_specs = []
     phases = []
     if 'bootstrap' in gitlab_ci:
@@ -542,8 +670,8 @@ def generate_gitlab_ci_yaml(env, print_summary, output_file,
     for phase in phases:
         phase_name = phase['name']
         with spack.concretize.disable_compiler_existence_check():
-            staged_phases[phase_name] = stage_spec_jobs(
-                env.spec_lists[phase_name])
+            staged_phases[phase_name] = stage_env_spec_jobs(
+                env, phase_name, balance_stages)
 
     if print_summary:
         for phase in phases:
@@ -552,6 +680,20 @@ def generate_gitlab_ci_yaml(env, print_summary, output_file,
             phase_stages = staged_phases[phase_name]
             print_staging_summary(*phase_stages)
 
+    # Check which specs need to be rebuilt all at once
+    rebuild_hashes = set()
+    if prune_dag:
+        release_specs = []
+        for phase in phases:
+            spec_labels = staged_phases[phase['name']][0]
+            for spec_label, entry in spec_labels.items():
+                pkg_name = pkg_name_from_spec_label(spec_label)
+                release_specs.append(entry['rootSpec'][pkg_name])
+        rebuild_specs = bindist.specs_needing_rebuild(
+            release_specs, mirror_urls[0], rebuild_on_errors=True)
+        rebuild_hashes = set(s.dag_hash() for s in rebuild_specs)
+    pruned_jobs = set()
+
     all_job_names = []
     output_object = {}
     job_id = 0
@@ -608,6 +750,12 @@ def generate_gitlab_ci_yaml(env, print_summary, output_file,
                 job_name = get_job_name(phase_name, strip_compilers,
                                         release_spec, osname, build_group)
 
+                if prune_dag and release_spec.dag_hash() not in rebuild_hashes:
+                    tty.debug('Pruning {0}, which is up to date on {1}'
+                              .format(job_name, mirror_urls[0]))
+                    pruned_jobs.add(job_name)
+                    continue
+
                 debug_flag = ''
                 if 'enable-debug-messages' in gitlab_ci:
                     debug_flag = '-d '
@@ -701,6 +849,10 @@ def generate_gitlab_ci_yaml(env, print_summary, output_file,
 
                 variables.update(job_vars)
 
+                # Jobs for specs that are already on the mirror do not exist
+                job_dependencies = [d for d in job_dependencies
+                                    if d['job'] not in pruned_jobs]
+
                 artifact_paths = [
                     'jobs_scratch_dir',
                     'cdash_report',
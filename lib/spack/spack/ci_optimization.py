@@ -12,10 +12,20 @@
     collections_abc = collections
 
 import copy
-import hashlib
+
+import six
 
 import spack.util.spack_yaml as syaml
 
+#: Serialized sizes of items of documents being optimized, keyed on their
+#: fingerprint()
+_item_sizes = {}
+
+#: Sizes of the entries of documents being optimized, keyed on the entry's
+#: key and the id of its value.  The value is kept alongside, so that its id
+#: is not reused; values are never modified once in a document.
+_entry_sizes = {}
+
 
 def sort_yaml_obj(obj):
     if isinstance(obj, collections_abc.Mapping):
@@ -30,6 +40,55 @@ def sort_yaml_obj(obj):
     return obj
 
 
+def fingerprint(obj):
+    """Returns a hashable value that is the same for objects that are
+    equal after sort_yaml_obj(), so objects can be compared and counted
+    without serializing them."""
+    if isinstance(obj, six.string_types):
+        return ('str', obj)
+
+    if isinstance(obj, collections_abc.Mapping):
+        return ('mapping', tuple(sorted(
+            ((str(k), fingerprint(v)) for k, v in obj.items()),
+            key=lambda item: item[0])))
+
+    if isinstance(obj, collections_abc.Sequence):
+        return ('sequence', tuple(fingerprint(x) for x in obj))
+
+    return (type(obj).__name__, obj)
+
+
+def _item_size(key, value):
+    item = (str(key), fingerprint(value))
+    if item not in _item_sizes:
+        _item_sizes[item] = len(syaml.dump_config(
+            sort_yaml_obj({key: value}), default_flow_style=True))
+    return _item_sizes[item]
+
+
+def _entry_size(key, value):
+    entry = (key, id(value))
+    if entry not in _entry_sizes:
+        if isinstance(value, collections_abc.Mapping):
+            size = len(str(key)) + sum(
+                _item_size(k, v) for k, v in value.items())
+        else:
+            size = _item_size(key, value)
+        _entry_sizes[entry] = (value, size)
+    return _entry_sizes[entry][1]
+
+
+def document_size(yaml):
+    """Returns an estimate of the size of the mapping "yaml" once serialized.
+
+    Jobs are measured as the sum of the sizes of their serialized items, and
+    other values of "yaml" as a whole.  Each distinct item is only serialized
+    once, and each job only measured once, so comparing successive versions
+    of a document, which share most of their jobs and items, is cheap.
+    """
+    return sum(_entry_size(k, v) for k, v in yaml.items())
+
+
 def matches(obj, proto):
     """Returns True if the test object "obj" matches the prototype object
     "proto".
@@ -178,15 +237,11 @@ def common_subobject(yaml, sub):
             break
         common_index += 1
 
-    new_yaml = {}
+    # Values that do not match are shared with the original object
+    new_yaml = dict(yaml)
 
-    for key, val in yaml.items():
-        new_yaml[key] = copy.deepcopy(val)
-
-        if not matches(val, sub):
-            continue
-
-        new_yaml[key] = subkeys(new_yaml[key], sub)
+    for key in match_list:
+        new_yaml[key] = subkeys(copy.deepcopy(yaml[key]), sub)
         add_extends(new_yaml[key], common_key)
 
     new_yaml[common_key] = sub
@@ -236,7 +291,7 @@ def try_optimization_pass(name, yaml, optimization_pass, *args, **kwargs):
 
     The pass's results are greedily rejected if it does not modify the original
     yaml document, or if it produces a yaml document that serializes to a
-    larger string.
+    larger string (as estimated by document_size()).
 
     Returns (new_yaml, yaml, applied, other_results) if applied, or
     (yaml, new_yaml, applied, other_results) otherwise.
@@ -248,10 +303,8 @@ def try_optimization_pass(name, yaml, optimization_pass, *args, **kwargs):
         # pass was not applied
         return (yaml, new_yaml, False, other_results)
 
-    pre_size = len(syaml.dump_config(
-        sort_yaml_obj(yaml), default_flow_style=True))
-    post_size = len(syaml.dump_config(
-        sort_yaml_obj(new_yaml), default_flow_style=True))
+    pre_size = document_size(yaml)
+    post_size = document_size(new_yaml)
 
     # pass makes the size worse: not applying
     applied = (post_size <= pre_size)
@@ -272,7 +325,7 @@ def build_histogram(iterator, key):
 
     Returns a list of tuples (hash, count, proportion, value), where
 
-      - "hash" is a sha1sum hash of the value.
+      - "hash" is the fingerprint() of the value.
       - "count" is the number of occurences of values that hash to "hash".
       - "proportion" is the proportion of all values considered above that
         hash to "hash".
@@ -295,9 +348,7 @@ def build_histogram(iterator, key):
         except (KeyError, TypeError):
             continue
 
-        value_hash = hashlib.sha1()
-        value_hash.update(syaml.dump_config(sort_yaml_obj(val)).encode())
-        value_hash = value_hash.hexdigest()
+        value_hash = fingerprint(val)
 
         buckets[value_hash] += 1
         values[value_hash] = val
@@ -307,8 +358,15 @@ def build_histogram(iterator, key):
 
 
 def optimizer(yaml):
-    original_size = len(syaml.dump_config(
-        sort_yaml_obj(yaml), default_flow_style=True))
+    try:
+        return _optimize(yaml)
+    finally:
+        _item_sizes.clear()
+        _entry_sizes.clear()
+
+
+def _optimize(yaml):
+    original_size = document_size(yaml)
 
     # try factoring out commonly repeated portions
     common_job = {
@@ -385,8 +443,7 @@ def optimizer(yaml):
             common_subobject,
             {'variables': {'SPACK_ROOT_SPEC': spec}})
 
-    new_size = len(syaml.dump_config(
-        sort_yaml_obj(yaml), default_flow_style=True))
+    new_size = document_size(yaml)
 
     print('\n')
     print_delta('overall summary', original_size, new_size)
@@ -384,25 +384,31 @@ def get_arg(name, default=None):
 
     transform = {'package': decorator, 'fullpackage': decorator}
 
-    def fmt(s, depth=0):
-        """Formatter function for all output specs"""
-        string = ""
-        if hashes:
-            string += gray_hash(s, hlen) + ' '
-        string += depth * "    "
-        string += s.cformat(format_string, transform=transform)
-        return string
-
     def format_list(specs):
         """Display a single list of specs, with no groups"""
-        # create the final, formatted versions of all specs
-        formatted = []
+        # gather the specs to display with their depth
+        nodes = []
         for spec in specs:
-            formatted.append((fmt(spec), spec))
+            nodes.append((0, spec))
             if deps:
-                for depth, dep in spec.traverse(root=False, depth=True):
-                    formatted.append((fmt(dep, depth), dep))
-                formatted.append(('', None))  # mark newlines
+                nodes.extend(spec.traverse(root=False, depth=True))
+                nodes.append((0, None))  # mark newlines
+
+        # create the final, formatted versions of all specs
+        strings = iter(spack.spec.format_specs(
+            [s for _, s in nodes if s is not None], format_string,
+            color=None, transform=transform))
+        formatted = []
+        for depth, spec in nodes:
+            if spec is None:
+                formatted.append(('', None))
+                continue
+            string = ""
+            if hashes:
+                string += gray_hash(spec, hlen) + ' '
+            string += depth * "    "
+            string += next(strings)
+            formatted.append((string, spec))
 
         # unless any of these are set, we can just colify and be done.
         if not any((deps, paths)):
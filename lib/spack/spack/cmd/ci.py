@@ -63,6 +63,10 @@ def setup_parser(subparser):
         '--dependencies', action='store_true', default=False,
         help="(Experimental) disable DAG scheduling; use "
              ' "plain" dependencies.')
+    generate.add_argument(
+        '--prune-dag', action='store_true', default=False,
+        help="Do not generate jobs for specs that are already up to date "
+             "on the mirror.")
     generate.set_defaults(func=ci_generate)
 
     # Check a spec against mirror. Rebuild, create buildcache and push to
@@ -86,6 +90,7 @@ def ci_generate(args):
     spack_ref = args.spack_ref
     run_optimizer = args.optimize
     use_dependencies = args.dependencies
+    prune_dag = args.prune_dag
 
     if not output_file:
         output_file = os.path.abspath(".gitlab-ci.yml")
@@ -99,7 +104,8 @@ def ci_generate(args):
     spack_ci.generate_gitlab_ci_yaml(
         env, True, output_file, spack_repo, spack_ref,
         run_optimizer=run_optimizer,
-        use_dependencies=use_dependencies)
+        use_dependencies=use_dependencies,
+        prune_dag=prune_dag)
 
     if copy_yaml_to:
         copy_to_dir = os.path.dirname(copy_yaml_to)
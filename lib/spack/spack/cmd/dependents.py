@@ -31,25 +31,25 @@ def setup_parser(subparser):
 
 
 def inverted_dependencies():
-    """Iterate through all packages and return a dictionary mapping package
-       names to possible dependencies.
+    """Return a dictionary mapping package names to possible dependents,
+       from the dependency index of the repository path.
 
        Virtual packages are included as sources, so that you can query
        dependents of, e.g., `mpi`, but virtuals are not included as
        actual dependents.
     """
-    dag = {}
-    for pkg in spack.repo.path.all_packages():
-        dag.setdefault(pkg.name, set())
-        for dep in pkg.dependencies:
-            deps = [dep]
-
-            # expand virtuals if necessary
-            if spack.repo.path.is_virtual(dep):
-                deps += [s.name for s in spack.repo.path.providers_for(dep)]
-
-            for d in deps:
-                dag.setdefault(d, set()).add(pkg.name)
+    index = spack.repo.path.dependency_index
+    dag = dict((name, set()) for name in spack.repo.path.all_package_names())
+    for dep in index.dependency_names():
+        deps = [dep]
+
+        # expand virtuals if necessary
+        if spack.repo.path.is_virtual(dep):
+            deps += [s.name for s in spack.repo.path.providers_for(dep)]
+
+        dependents = index.dependents_of(dep)
+        for d in deps:
+            dag.setdefault(d, set()).update(dependents)
     return dag
 
 
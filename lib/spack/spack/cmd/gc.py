@@ -3,11 +3,17 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+from __future__ import print_function
+
+import multiprocessing.pool
+import os
+
 import llnl.util.tty as tty
 
 import spack.cmd.common.arguments
 import spack.cmd.uninstall
 import spack.environment
+import spack.package
 import spack.store
 
 description = "remove specs that are now no longer needed"
@@ -16,7 +22,66 @@
 
 
 def setup_parser(subparser):
-    spack.cmd.common.arguments.add_common_arguments(subparser, ['yes_to_all'])
+    spack.cmd.common.arguments.add_common_arguments(
+        subparser, ['yes_to_all', 'jobs'])
+    subparser.add_argument(
+        '-n', '--dry-run', action='store_true',
+        help="only report which specs would be removed and how much "
+        "disk space that would free")
+
+
+def prefix_size(prefix):
+    """Return the number of bytes used by the files in a prefix.
+
+    Files hard linked more than once within the prefix are counted once,
+    symbolic links are not followed.
+    """
+    size, seen = 0, set()
+    for root, dirs, files in os.walk(prefix):
+        for name in dirs + files:
+            try:
+                st = os.lstat(os.path.join(root, name))
+            except OSError:
+                continue
+            if st.st_nlink > 1:
+                if (st.st_dev, st.st_ino) in seen:
+                    continue
+                seen.add((st.st_dev, st.st_ino))
+            size += st.st_size
+    return size
+
+
+def format_bytes(size):
+    """Format a number of bytes with a binary unit, e.g. ``1.5 GiB``."""
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024:
+            break
+        size /= 1024.0
+    else:
+        unit = 'TiB'
+    if unit == 'B':
+        return '{0} B'.format(size)
+    return '{0:.1f} {1}'.format(size, unit)
+
+
+def report(specs, jobs=None):
+    """Print the specs that would be removed with their size on disk."""
+    pool = multiprocessing.pool.ThreadPool(min(jobs or 16, len(specs)))
+    try:
+        sizes = pool.map(
+            lambda s: 0 if s.external else prefix_size(s.prefix), specs)
+    finally:
+        pool.terminate()
+        pool.join()
+
+    tty.msg('The following packages would be uninstalled:\n')
+    for spec, size in sorted(zip(specs, sizes), key=lambda x: -x[1]):
+        print('    {0:>10}  {1}'.format(
+            format_bytes(size),
+            spec.cformat('{name}{@version}{%compiler}{/hash:7}')))
+    print('')
+    tty.msg('{0} packages, {1} reclaimable'.format(
+        len(specs), format_bytes(sum(sizes))))
 
 
 def gc(parser, args):
@@ -41,7 +106,11 @@ def gc(parser, args):
         tty.msg(msg)
         return
 
+    if args.dry_run:
+        report(specs, args.jobs)
+        return
+
     if not args.yes_to_all:
         spack.cmd.uninstall.confirm_removal(specs)
 
-    spack.cmd.uninstall.do_uninstall(None, specs, force=False)
+    spack.package.PackageBase.uninstall_specs(specs, jobs=args.jobs)
@@ -240,5 +240,18 @@ def print_text_info(pkg):
 
 
 def info(parser, args):
-    pkg = spack.repo.get(args.package)
+    try:
+        pkg = spack.repo.get(args.package)
+    except spack.repo.UnknownPackageError as e:
+        # Point to packages that mention the name, from the search index
+        similar = []
+        if spack.repo.SearchIndex.words(args.package):
+            similar = sorted(
+                spack.repo.path.search_index.search(args.package))
+        if not similar:
+            raise
+        more = len(similar) - 10
+        tty.die(e.message, 'Packages that mention "{0}": {1}{2}'.format(
+            args.package, ', '.join(similar[:10]),
+            ' and {0} more'.format(more) if more > 0 else ''))
     print_text_info(pkg)
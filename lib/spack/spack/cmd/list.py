@@ -19,8 +19,8 @@
 
 import spack.dependency
 import spack.repo
+import spack.util.string
 import spack.cmd.common.arguments as arguments
-from spack.version import VersionList
 
 if sys.version_info > (3, 1):
     from html import escape  # novm
@@ -84,13 +84,26 @@ def filter_by_name(pkgs, args):
             res.append(rc)
 
         if args.search_description:
+            # Descriptions are read from the search index, and only for
+            # packages that have the literal parts of a filter in their
+            # indexed words
+            index = spack.repo.path.search_index
+            candidates = {}
+            for f, rc in zip(args.filter, res):
+                if '[' in f:
+                    candidates[rc] = set(index)
+                else:
+                    candidates[rc] = index.containing(
+                        ' '.join(re.split(r'[*?]', f)))
+
             def match(p, f):
                 if f.match(p):
                     return True
 
-                pkg = spack.repo.get(p)
-                if pkg.__doc__:
-                    return f.match(pkg.__doc__)
+                if p in candidates[f]:
+                    doc = index[p]['description']
+                    if doc:
+                        return f.match(doc)
                 return False
         else:
             def match(p, f):
@@ -108,10 +121,10 @@ def name_only(pkgs, out):
     colify(pkgs, indent=indent, output=out)
 
 
-def github_url(pkg):
+def github_url(pkg_name):
     """Link to a package file on github."""
     url = 'https://github.com/spack/spack/blob/develop/var/spack/repos/builtin/packages/{0}/package.py'
-    return url.format(pkg.name)
+    return url.format(pkg_name)
 
 
 def rows_for_ncols(elts, ncols):
@@ -125,11 +138,14 @@ def rows_for_ncols(elts, ncols):
         yield row
 
 
-def get_dependencies(pkg):
+def get_dependencies(pkg_name):
+    """Possible dependencies of a package, by dependency type, from the
+    dependency index of the repositories."""
+    dependencies = spack.repo.path.dependency_index.get(pkg_name, {})
     all_deps = {}
     for deptype in spack.dependency.all_deptypes:
-        deps = pkg.dependencies_of_type(deptype)
-        all_deps[deptype] = [d for d in deps]
+        all_deps[deptype] = [
+            d for d, types in dependencies.items() if deptype in types]
 
     return all_deps
 
@@ -137,7 +153,7 @@ def get_dependencies(pkg):
 @formatter
 def version_json(pkg_names, out):
     """Print all packages with their latest versions."""
-    pkgs = [spack.repo.get(name) for name in pkg_names]
+    index = spack.repo.path.search_index
 
     out.write('[\n')
 
@@ -151,14 +167,14 @@ def version_json(pkg_names, out):
         '   "maintainers": {5},\n'
         '   "dependencies": {6}'
         '}}'.format(
-            pkg.name,
-            VersionList(pkg.versions).preferred(),
-            json.dumps([str(v) for v in reversed(sorted(pkg.versions))]),
-            pkg.homepage,
-            github_url(pkg),
-            json.dumps(pkg.maintainers),
-            json.dumps(get_dependencies(pkg))
-        ) for pkg in pkgs
+            name,
+            index[name]['preferred_version'],
+            json.dumps(index[name]['versions']),
+            index[name]['homepage'],
+            github_url(name),
+            json.dumps(index[name]['maintainers']),
+            json.dumps(get_dependencies(name))
+        ) for name in pkg_names
     ])
     out.write(pkg_latest)
     # important: no trailing comma in JSON arrays
@@ -175,8 +191,8 @@ def html(pkg_names, out):
     raw HTML is much faster.
     """
 
-    # Read in all packages
-    pkgs = [spack.repo.get(name) for name in pkg_names]
+    # Read the metadata of all packages from the index
+    index = spack.repo.path.search_index
 
     # Start at 2 because the title of the page from Sphinx is id1.
     span_id = 2
@@ -193,7 +209,7 @@ def head(n, span_id, title, anchor=None):
     # Start with the number of packages, skipping the title and intro
     # blurb, which we maintain in the RST file.
     out.write('<p>\n')
-    out.write('Spack currently has %d mainline packages:\n' % len(pkgs))
+    out.write('Spack currently has %d mainline packages:\n' % len(pkg_names))
     out.write('</p>\n')
 
     # Table of links to all packages
@@ -213,9 +229,10 @@ def head(n, span_id, title, anchor=None):
     out.write('<hr class="docutils"/>\n')
 
     # Output some text for each package.
-    for pkg in pkgs:
-        out.write('<div class="section" id="%s">\n' % pkg.name)
-        head(2, span_id, pkg.name)
+    for name in pkg_names:
+        record = index[name]
+        out.write('<div class="section" id="%s">\n' % name)
+        head(2, span_id, name)
         span_id += 1
 
         out.write('<dl class="docutils">\n')
@@ -224,26 +241,27 @@ def head(n, span_id, title, anchor=None):
         out.write('<dd><ul class="first last simple">\n')
         out.write(('<li>'
                    '<a class="reference external" href="%s">%s</a>'
-                   '</li>\n') % (pkg.homepage, escape(pkg.homepage, True)))
+                   '</li>\n') % (record['homepage'],
+                                 escape(record['homepage'], True)))
         out.write('</ul></dd>\n')
 
         out.write('<dt>Spack package:</dt>\n')
         out.write('<dd><ul class="first last simple">\n')
         out.write(('<li>'
                    '<a class="reference external" href="%s">%s/package.py</a>'
-                   '</li>\n') % (github_url(pkg), pkg.name))
+                   '</li>\n') % (github_url(name), name))
         out.write('</ul></dd>\n')
 
-        if pkg.versions:
+        if record['versions']:
             out.write('<dt>Versions:</dt>\n')
             out.write('<dd>\n')
-            out.write(', '.join(
-                str(v) for v in reversed(sorted(pkg.versions))))
+            out.write(', '.join(record['versions']))
             out.write('\n')
             out.write('</dd>\n')
 
+        dependencies = get_dependencies(name)
         for deptype in spack.dependency.all_deptypes:
-            deps = pkg.dependencies_of_type(deptype)
+            deps = dependencies[deptype]
             if deps:
                 out.write('<dt>%s Dependencies:</dt>\n' % deptype.capitalize())
                 out.write('<dd>\n')
@@ -256,7 +274,9 @@ def head(n, span_id, title, anchor=None):
 
         out.write('<dt>Description:</dt>\n')
         out.write('<dd>\n')
-        out.write(escape(pkg.format_doc(indent=2), True))
+        out.write(escape(
+            spack.util.string.format_doc(record['description'], indent=2),
+            True))
         out.write('\n')
         out.write('</dd>\n')
         out.write('</dl>\n')
@@ -7,6 +7,7 @@
 
 import os
 import re
+import sys
 
 import llnl.util.tty as tty
 from llnl.util.tty.colify import colify
@@ -14,8 +15,11 @@
 
 import spack.cmd
 import spack.cmd.common.arguments as arguments
+import spack.cmd.dependents
 import spack.paths
 import spack.repo
+import spack.store
+import spack.util.spack_json as sjson
 from spack.util.executable import which
 
 description = "query packages associated with particular git revisions"
@@ -70,6 +74,20 @@ def setup_parser(subparser):
         'rev2', nargs='?', default='HEAD',
         help="revision to compare to rev1 (default is HEAD)")
 
+    affected_parser = sp.add_parser('affected', help=pkg_affected.__doc__)
+    affected_parser.add_argument(
+        'rev1', nargs='?', default='HEAD^',
+        help="revision to compare against")
+    affected_parser.add_argument(
+        'rev2', nargs='?', default='HEAD',
+        help="revision to compare to rev1 (default is HEAD)")
+    affected_parser.add_argument(
+        '-i', '--installed', action='store_true',
+        help="also show the installed specs of affected packages")
+    affected_parser.add_argument(
+        '--json', action='store_true',
+        help="print the changes and affected packages as JSON")
+
 
 def packages_path():
     """Get the test repo if it is active, otherwise the builtin repo."""
@@ -116,6 +134,59 @@ def list_packages(rev):
                   if line and not line.startswith('.'))
 
 
+def diff_package_files(rev1, rev2):
+    """Packages added, removed and changed between two revisions.
+
+    All three sets come from a single ``git diff --name-status``. A
+    package is added or removed with its ``package.py``, and changed if
+    any other of its files is.
+
+    Returns:
+        (tuple): sets of names of added, removed and changed packages
+    """
+    git = get_git()
+    out = git('diff', '--relative', '--name-status', '--no-renames',
+              rev1, rev2, output=str)
+
+    added, removed, changed = set(), set(), set()
+    for line in out.split('\n'):
+        if not line:
+            continue
+        status, path = line.split('\t', 1)
+        pkg_name, sep, filename = path.partition('/')
+        if not sep:
+            continue  # not a file of a package
+        if filename == spack.repo.package_file_name:
+            if status == 'A':
+                added.add(pkg_name)
+            elif status == 'D':
+                removed.add(pkg_name)
+        changed.add(pkg_name)
+
+    changed -= added | removed
+    return added, removed, changed
+
+
+def affected_packages(pkg_names):
+    """Names of the given packages and of all the packages that can depend
+    on them, directly or not, in the current repositories.
+
+    Dependents are read from the persistent dependency index of the
+    repositories, and packages that depend on a virtual are dependents of
+    all its providers.
+    """
+    ideps = spack.cmd.dependents.inverted_dependencies()
+
+    affected = set()
+    stack = list(pkg_names)
+    while stack:
+        name = stack.pop()
+        if name not in affected:
+            affected.add(name)
+            stack.extend(ideps.get(name, ()))
+    return affected
+
+
 def pkg_add(args):
     """add a package to the git stage with `git add`"""
     git = get_git()
@@ -176,18 +247,7 @@ def pkg_changed(args):
         tty.die("Invald change type: '%s'." % args.type,
                 "Can contain only A (added), R (removed), or C (changed)")
 
-    removed, added = diff_packages(args.rev1, args.rev2)
-
-    git = get_git()
-    out = git('diff', '--relative', '--name-only', args.rev1, args.rev2,
-              output=str).strip()
-
-    lines = [] if not out else re.split(r'\s+', out)
-    changed = set()
-    for path in lines:
-        pkg_name, _, _ = path.partition(os.sep)
-        if pkg_name not in added and pkg_name not in removed:
-            changed.add(pkg_name)
+    added, removed, changed = diff_package_files(args.rev1, args.rev2)
 
     packages = set()
     if 'a' in lower_type:
@@ -201,6 +261,37 @@ def pkg_changed(args):
         colify(sorted(packages))
 
 
+def pkg_affected(args):
+    """show packages changed since a commit and their possible dependents"""
+    added, removed, changed = diff_package_files(args.rev1, args.rev2)
+    affected = affected_packages(added | removed | changed)
+
+    installed = []
+    if args.installed:
+        installed = [s for s in spack.store.db.query(installed=True)
+                     if s.name in affected]
+
+    if args.json:
+        result = {
+            'added': sorted(added),
+            'removed': sorted(removed),
+            'changed': sorted(changed),
+            'affected': sorted(affected)}
+        if args.installed:
+            result['installed'] = [
+                {'name': s.name, 'hash': s.dag_hash(), 'spec': s.format()}
+                for s in sorted(installed)]
+        sjson.dump(result, sys.stdout)
+        return
+
+    if affected:
+        colify(sorted(affected))
+    if installed:
+        print()
+        tty.msg('Installed specs of affected packages')
+        spack.cmd.display_specs(installed, long=True)
+
+
 def pkg(parser, args):
     if not spack.cmd.spack_is_git_repo():
         tty.die("This spack is not a git clone. Can't use 'spack pkg'")
@@ -210,5 +301,6 @@ def pkg(parser, args):
               'list': pkg_list,
               'removed': pkg_removed,
               'added': pkg_added,
-              'changed': pkg_changed}
+              'changed': pkg_changed,
+              'affected': pkg_affected}
     action[args.pkg_command](args)
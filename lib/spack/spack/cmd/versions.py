@@ -11,6 +11,7 @@
 import llnl.util.tty as tty
 
 import spack.cmd.common.arguments as arguments
+import spack.package
 import spack.repo
 
 description = "list available versions of a package"
@@ -25,12 +26,24 @@ def setup_parser(subparser):
         '-c', '--concurrency', default=32, type=int,
         help='number of concurrent requests'
     )
-    arguments.add_common_arguments(subparser, ['package'])
+    arguments.add_common_arguments(subparser, ['packages'])
 
 
 def versions(parser, args):
-    pkg = spack.repo.get(args.package)
+    pkgs = [spack.repo.get(name) for name in args.packages]
 
+    fetched = [{} for _ in pkgs]
+    if not args.safe_only:
+        # Spider the list pages of all the packages in a single run
+        fetched = spack.package.fetch_remote_versions(pkgs, args.concurrency)
+
+    for pkg, fetched_versions in zip(pkgs, fetched):
+        if len(pkgs) > 1:
+            tty.msg('{0}:'.format(pkg.name))
+        print_versions(pkg, fetched_versions, args.safe_only)
+
+
+def print_versions(pkg, fetched_versions, safe_only):
     if sys.stdout.isatty():
         tty.msg('Safe versions (already checksummed):')
 
@@ -43,13 +56,12 @@ def versions(parser, args):
     else:
         colify(sorted(safe_versions, reverse=True), indent=2)
 
-    if args.safe_only:
+    if safe_only:
         return
 
     if sys.stdout.isatty():
         tty.msg('Remote versions (not yet checksummed):')
 
-    fetched_versions = pkg.fetch_remote_versions(args.concurrency)
     remote_versions = set(fetched_versions).difference(safe_versions)
 
     if not remote_versions:
@@ -209,7 +209,13 @@ def to_dict(self, include_fields=default_install_record_fields):
 
         for field_name in include_fields:
             if field_name == 'spec':
-                rec_dict.update({'spec': self.spec.to_node_dict()})
+                node_dict = self.spec.to_node_dict()
+                # keep the full hash recorded for specs read from a
+                # build cache, which Spec.from_node_dict() reads back
+                if self.spec._full_hash:
+                    node = next(iter(node_dict.values()))
+                    node['full_hash'] = self.spec._full_hash
+                rec_dict.update({'spec': node_dict})
             elif field_name == 'deprecated_for' and self.deprecated_for:
                 rec_dict.update({'deprecated_for': self.deprecated_for})
             else:
@@ -1216,6 +1222,18 @@ def remove(self, spec):
         with self.write_transaction():
             return self._remove(spec)
 
+    def remove_specs(self, specs):
+        """Removes many specs from the database at once.
+
+        This does the same as calling ``remove()`` on each spec, in any
+        order, but reads and writes the database only once.
+
+        Returns:
+            (list): the concrete specs that were removed
+        """
+        with self.write_transaction():
+            return [self._remove(spec) for spec in specs]
+
     def deprecator(self, spec):
         """Return the spec that the given spec is deprecated for, or None"""
         with self.read_transaction():
@@ -1256,6 +1274,41 @@ def deprecate(self, spec, deprecator):
         with self.write_transaction():
             return self._deprecate(spec, deprecator)
 
+    def installed_dependents(self, specs):
+        """Return the installed specs that depend on each of the given ones.
+
+        The reverse DAG of the whole database is built once from the
+        records, so this costs the same for one spec or for thousands.
+        It can't be read from the specs themselves, because a spec keeps
+        only one dependent per package name.
+
+        Args:
+            specs (list): concrete specs in the database
+
+        Returns:
+            (dict): mapping from the DAG hash of each spec to the list of
+                installed specs that depend on it, directly or not
+        """
+        with self.read_transaction():
+            parents = {}
+            for key, rec in self._data.items():
+                for dep in rec.spec.dependencies(_tracked_deps):
+                    parents.setdefault(dep.dag_hash(), []).append(key)
+
+            result = {}
+            for spec in specs:
+                root = spec.dag_hash()
+                seen, stack = set([root]), [root]
+                while stack:
+                    for key in parents.get(stack.pop(), ()):
+                        if key not in seen:
+                            seen.add(key)
+                            stack.append(key)
+                seen.discard(root)
+                result[root] = [self._data[key].spec for key in sorted(seen)
+                                if self._data[key].installed]
+        return result
+
     @_autospec
     def installed_relatives(self, spec, direction='children', transitive=True,
                             deptype='all'):
@@ -1515,15 +1568,22 @@ def unused_specs(self):
             2. Installed as a "run" or "link" dependency (even transitive) of
                a spec at point 1.
         """
-        needed, visited = set(), set()
         with self.read_transaction():
-            for key, rec in self._data.items():
-                if rec.explicit:
-                    # recycle `visited` across calls to avoid
-                    # redundantly traversing
-                    for spec in rec.spec.traverse(visited=visited):
-                        needed.add(spec.dag_hash())
+            # Mark every record reachable from an explicit one, walking the
+            # whole DAG once with an explicit stack of DAG hashes ...
+            needed = set()
+            stack = [key for key, rec in self._data.items() if rec.explicit]
+            while stack:
+                key = stack.pop()
+                if key in needed:
+                    continue
+                needed.add(key)
+                rec = self._data.get(key)
+                if rec is not None:
+                    stack.extend(dspec.spec.dag_hash() for dspec in
+                                 rec.spec._dependencies.values())
 
+            # ... then sweep the installed records that were not marked.
             unused = [rec.spec for key, rec in self._data.items()
                       if key not in needed and rec.installed]
 
@@ -152,9 +152,10 @@ def __init__(cls, name, bases, attr_dict):
             for directive in cls._directives_to_be_executed:
                 directive(cls)
 
-            # Ignore any directives executed *within* top-level
-            # directives by clearing out the queue they're appended to
-            DirectiveMeta._directives_to_be_executed = []
+                # Ignore any directives executed *within* top-level
+                # directives by clearing out the queue they're appended
+                # to, before a later directive loads another package
+                DirectiveMeta._directives_to_be_executed = []
 
         super(DirectiveMeta, cls).__init__(name, bases, attr_dict)
 
@@ -3,6 +3,7 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import errno
 import os
 import shutil
 import glob
@@ -115,9 +116,17 @@ def remove_install_directory(self, spec, deprecated=False):
         path = os.path.dirname(path)
         while path != self.root:
             if os.path.isdir(path):
-                if os.listdir(path):
+                try:
+                    if os.listdir(path):
+                        return
+                    os.rmdir(path)
+                except OSError as e:
+                    # Prefixes may be removed concurrently: another
+                    # removal emptied or refilled this directory first.
+                    if e.errno not in (errno.ENOENT, errno.ENOTEMPTY,
+                                       errno.EEXIST):
+                        raise
                     return
-                os.rmdir(path)
             path = os.path.dirname(path)
 
 
@@ -24,10 +24,12 @@
 """
 import copy
 import functools
+import multiprocessing.pool
 import os
 import os.path
 import re
 import shutil
+import subprocess
 import sys
 
 import llnl.util.tty as tty
@@ -37,6 +39,7 @@
 import spack.error
 import spack.util.crypto as crypto
 import spack.util.pattern as pattern
+import spack.util.spack_json as sjson
 import spack.util.url as url_util
 import spack.util.web as web_util
 from llnl.util.filesystem import (
@@ -56,6 +59,54 @@
     " <package>', then try again using the correct URL.")
 
 
+#: Archives at least this large are downloaded with several concurrent
+#: range requests when ``config:url_fetch_connections`` is more than 1
+range_request_threshold = 64 * 2**20
+
+#: Number of times a download interrupted by a network error is resumed
+#: before giving up
+resume_attempts = 3
+
+#: Size of the blocks read from curl and written to the archive
+_block_size = 2**20
+
+#: Curl exit code when the server cannot resume a download
+_curl_range_error = 33
+
+#: Curl exit codes for transfers interrupted by the network, which leave
+#: a partial download that can be resumed
+_curl_transfer_errors = (18, 28, 52, 55, 56, 92)
+
+
+#: Algorithm used to checksum downloads when no digest is known, which
+#: is the one ``spack checksum`` reports
+_default_hash_algo = 'sha256'
+
+#: Suffix of the file, next to a stage's archive, recording the digest
+#: the archive was verified against
+_verified_marker_suffix = '.verified'
+
+
+def _update_checker_from_file(checker, path):
+    """Add the contents of the file at ``path`` to a running checksum."""
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(_block_size)
+            if not data:
+                break
+            checker.update(data)
+
+
+def _read_and_remove(path):
+    """Return the contents of the file at ``path`` and remove it."""
+    if not os.path.exists(path):
+        return ''
+    with open(path) as f:
+        contents = f.read()
+    os.remove(path)
+    return contents
+
+
 def warn_content_type_mismatch(subject, content_type='HTML'):
     tty.warn(CONTENT_TYPE_MISMATCH_WARNING_TEMPLATE.format(
         subject=subject, content_type=content_type))
@@ -261,6 +312,9 @@ def __init__(self, url=None, checksum=None, **kwargs):
 
         self.extension = kwargs.get('extension', None)
 
+        # checksum of the archive, computed while it was downloaded
+        self._fetched_checksum = None
+
         if not self.url:
             raise ValueError("URLFetchStrategy requires a url for fetching.")
 
@@ -292,6 +346,7 @@ def fetch(self):
             tty.debug('Already downloaded {0}'.format(self.archive_file))
             return
 
+        self._fetched_checksum = None
         url = None
         errors = []
         for url in self.candidate_urls:
@@ -328,26 +383,44 @@ def _fetch_from_url(self, url):
             save_file = self.stage.save_filename
             partial_file = self.stage.save_filename + '.part'
         tty.msg('Fetching {0}'.format(url))
-        if partial_file:
-            save_args = ['-C',
-                         '-',  # continue partial downloads
-                         '-o',
-                         partial_file]  # use a .part file
-        else:
-            save_args = ['-O']
 
-        curl_args = save_args + [
+        if not partial_file:
+            curl_args = ['-O', '-D', '-'] + self._curl_options() + [url]
+            curl = self.curl
+            with working_dir(self.stage.path):
+                headers = curl(*curl_args, output=str, fail_on_error=False)
+            if curl.returncode != 0:
+                self._curl_failed(url, curl.returncode, partial_file)
+            self._check_content_type(headers)
+            return partial_file, save_file
+
+        # Large archives can be split over several connections, unless
+        # there is already a partial download to resume.
+        headers = None
+        connections = spack.config.get('config:url_fetch_connections', 1)
+        if connections > 1 and not os.path.exists(partial_file):
+            remote_headers, size = self._remote_size(url)
+            if (size and size >= range_request_threshold and
+                    self._fetch_ranges(url, partial_file, size, connections)):
+                headers = remote_headers
+
+        if headers is None:
+            headers = self._fetch_resumable(url, partial_file)
+
+        self._check_content_type(headers)
+        return partial_file, save_file
+
+    def _curl_options(self, status_bar=True):
+        """Options common to all the curl commands used to fetch."""
+        curl_args = [
             '-f',  # fail on >400 errors
-            '-D',
-            '-',  # print out HTML headers
             '-L',  # resolve 3xx redirects
-            url,
         ]
 
         if not spack.config.get('config:verify_ssl'):
             curl_args.append('-k')
 
-        if sys.stdout.isatty() and tty.msg_enabled():
+        if status_bar and sys.stdout.isatty() and tty.msg_enabled():
             curl_args.append('-#')  # status bar when using a tty
         else:
             curl_args.append('-sS')  # show errors if fail
@@ -369,50 +442,226 @@ def _fetch_from_url(self, url):
             # Timeout if can't establish a connection after n sec.
             curl_args.extend(['--connect-timeout', str(connect_timeout)])
 
-        # Run curl but grab the mime type from the http headers
-        curl = self.curl
-        with working_dir(self.stage.path):
-            headers = curl(*curl_args, output=str, fail_on_error=False)
+        return curl_args
 
-        if curl.returncode != 0:
-            # clean up archive on failure.
-            if self.archive_file:
-                os.remove(self.archive_file)
+    def _new_checker(self):
+        """Checker fed with the archive while it is downloaded.
 
-            if partial_file and os.path.exists(partial_file):
-                os.remove(partial_file)
+        It uses the algorithm of the digest of this fetcher, or sha256 if
+        there is no digest, like ``spack checksum``.
+        """
+        if self.digest:
+            try:
+                return crypto.Checker(self.digest)
+            except ValueError:
+                pass  # check() reports unknown digests
+        return crypto.Checker(None, algorithm=_default_hash_algo)
+
+    def _set_fetched_checksum(self, checker):
+        checker.check_updates()
+        self._fetched_checksum = (checker.hash_name, checker.sum)
+
+    def _curl_to_file(self, curl_args, path, checker=None):
+        """Run curl, appending what it writes on stdout to ``path``.
 
-            if curl.returncode == 22:
-                # This is a 404.  Curl will print the error.
-                raise FailedDownloadError(
-                    url, "URL %s was not found!" % url)
-
-            elif curl.returncode == 60:
-                # This is a certificate error.  Suggest spack -k
-                raise FailedDownloadError(
-                    url,
-                    "Curl was unable to fetch due to invalid certificate. "
-                    "This is either an attack, or your cluster's SSL "
-                    "configuration is bad.  If you believe your SSL "
-                    "configuration is bad, you can try running spack -k, "
-                    "which will not check SSL certificates."
-                    "Use this at your own risk.")
+        If a ``checker`` is given, the data is also added to its checksum
+        as it is written. Returns the exit code of curl.
+        """
+        command = self.curl.exe + ['-o', '-'] + curl_args
+        with open(path, 'ab') as f:
+            proc = subprocess.Popen(command, stdout=subprocess.PIPE)
+            while True:
+                data = proc.stdout.read(_block_size)
+                if not data:
+                    break
+                f.write(data)
+                if checker:
+                    checker.update(data)
+            proc.stdout.close()
+            return proc.wait()
+
+    def _fetch_resumable(self, url, partial_file):
+        """Download ``url`` into ``partial_file`` as a single stream.
+
+        The download continues from the data already in ``partial_file``,
+        and is resumed if the transfer is interrupted by a network error.
+        If it still fails, ``partial_file`` is kept so that the next fetch
+        can resume it.  Returns the HTTP headers of the response.
+        """
+        headers_file = partial_file + '.headers'
+        checker = self._new_checker()
+        offset = 0
+        if os.path.exists(partial_file):
+            offset = os.path.getsize(partial_file)
+            _update_checker_from_file(checker, partial_file)
+
+        attempts = 0
+        while True:
+            curl_args = ['-D', headers_file] + self._curl_options()
+            if offset:
+                tty.debug('Resuming download of {0} at byte {1}'
+                          .format(url, offset))
+                curl_args.extend(['-C', str(offset)])
+            returncode = self._curl_to_file(
+                curl_args + [url], partial_file, checker)
+
+            if returncode == 0:
+                break
 
+            size = os.path.getsize(partial_file)
+            if returncode == _curl_range_error and offset:
+                # The server cannot resume, so start over.
+                os.remove(partial_file)
+                checker = self._new_checker()
+                offset = 0
+            elif (returncode in _curl_transfer_errors and size > offset and
+                  attempts < resume_attempts):
+                attempts += 1
+                offset = size
             else:
-                # This is some other curl error.  Curl will print the
-                # error, but print a spack message too
-                raise FailedDownloadError(
-                    url,
-                    "Curl failed with error %d" % curl.returncode)
-
-        # Check if we somehow got an HTML file rather than the archive we
-        # asked for.  We only look at the last content type, to handle
-        # redirects properly.
+                self._curl_failed(url, returncode, partial_file)
+
+        self._set_fetched_checksum(checker)
+        return _read_and_remove(headers_file)
+
+    def _remote_size(self, url):
+        """Size of the archive at ``url`` if it can be downloaded with HTTP
+        range requests, otherwise None.  Also returns the headers.
+        """
+        curl = self.curl
+        curl_args = ['-I'] + self._curl_options(status_bar=False) + [url]
+        headers = curl(*curl_args, output=str, error=os.devnull,
+                       fail_on_error=False)
+        if curl.returncode != 0:
+            return None, None
+
+        # Only look at the headers of the last response after redirects.
+        last = re.split(r'\r?\n\r?\n(?=\S)', headers.strip())[-1]
+        accept = re.search(r'^Accept-Ranges:\s*bytes', last,
+                           flags=re.IGNORECASE | re.MULTILINE)
+        length = re.search(r'^Content-Length:\s*(\d+)', last,
+                           flags=re.IGNORECASE | re.MULTILINE)
+        if not (accept and length):
+            return headers, None
+        return headers, int(length.group(1))
+
+    def _fetch_ranges(self, url, partial_file, size, connections):
+        """Download ``url`` over several connections with range requests.
+
+        Each connection downloads a contiguous segment of the archive into
+        its own file, which is resumed if it is interrupted. The segments
+        are then concatenated into ``partial_file`` and checksummed while
+        they are written.  Returns False if the server did not honor the
+        range requests and the archive must be downloaded as one stream.
+        """
+        segment_size = -(-size // connections)
+        segments = [(i, min(i + segment_size, size) - 1)
+                    for i in range(0, size, segment_size)]
+        paths = ['{0}.{1}'.format(partial_file, i)
+                 for i in range(len(segments))]
+        options = self._curl_options(status_bar=False)
+
+        def fetch_segment(i):
+            first, last = segments[i]
+            path = paths[i]
+            attempts = 0
+            returncode = 0
+            while attempts <= resume_attempts:
+                have = os.path.getsize(path) if os.path.exists(path) else 0
+                if have >= last - first + 1:
+                    break
+                curl_args = options + [
+                    '-r', '{0}-{1}'.format(first + have, last), url]
+                returncode = self._curl_to_file(curl_args, path)
+                if returncode == 0:
+                    break
+                if not (returncode in _curl_transfer_errors and
+                        os.path.getsize(path) > have):
+                    break
+                attempts += 1
+            return returncode
+
+        tty.debug('Fetching {0} with {1} connections'
+                  .format(url, len(segments)))
+        pool = multiprocessing.pool.ThreadPool(processes=len(segments))
+        try:
+            returncodes = pool.map(fetch_segment, range(len(segments)))
+        finally:
+            pool.terminate()
+            pool.join()
+
+        for returncode in returncodes:
+            if returncode != 0:
+                # keep the complete segments, but no partial archive, so
+                # that the next fetch resumes with range requests.
+                self._curl_failed(url, returncode, None)
+
+        expected = [last - first + 1 for first, last in segments]
+        if [os.path.getsize(p) for p in paths] != expected:
+            tty.debug('{0} does not support range requests'.format(url))
+            for path in paths:
+                os.remove(path)
+            return False
+
+        checker = self._new_checker()
+        with open(partial_file, 'wb') as f:
+            for path in paths:
+                with open(path, 'rb') as segment:
+                    while True:
+                        data = segment.read(_block_size)
+                        if not data:
+                            break
+                        f.write(data)
+                        checker.update(data)
+                os.remove(path)
+
+        self._set_fetched_checksum(checker)
+        return True
+
+    def _check_content_type(self, headers):
+        """Warn if we got an HTML file rather than the archive we asked for.
+        """
+        # We only look at the last content type, to handle redirects
+        # properly.
         content_types = re.findall(r'Content-Type:[^\r\n]+', headers,
                                    flags=re.IGNORECASE)
         if content_types and 'text/html' in content_types[-1]:
             warn_content_type_mismatch(self.archive_file or "the archive")
-        return partial_file, save_file
+
+    def _curl_failed(self, url, returncode, partial_file):
+        """Clean up after curl failed, and raise a FailedDownloadError."""
+        # clean up archive on failure.
+        if self.archive_file:
+            os.remove(self.archive_file)
+
+        # Keep partial downloads that were interrupted, so that they can
+        # be resumed.
+        if returncode not in _curl_transfer_errors:
+            if partial_file and os.path.exists(partial_file):
+                os.remove(partial_file)
+
+        if returncode == 22:
+            # This is a 404.  Curl will print the error.
+            raise FailedDownloadError(
+                url, "URL %s was not found!" % url)
+
+        elif returncode == 60:
+            # This is a certificate error.  Suggest spack -k
+            raise FailedDownloadError(
+                url,
+                "Curl was unable to fetch due to invalid certificate. "
+                "This is either an attack, or your cluster's SSL "
+                "configuration is bad.  If you believe your SSL "
+                "configuration is bad, you can try running spack -k, "
+                "which will not check SSL certificates."
+                "Use this at your own risk.")
+
+        else:
+            # This is some other curl error.  Curl will print the
+            # error, but print a spack message too
+            raise FailedDownloadError(
+                url,
+                "Curl failed with error %d" % returncode)
 
     @property
     @_needs_stage
@@ -504,21 +753,81 @@ def archive(self, destination):
             destination,
             keep_original=True)
 
+    @_needs_stage
+    def archive_checksum(self, algo):
+        """Hex digest of the archive computed with ``algo``.
+
+        The archive is only read if it was not already checksummed with
+        ``algo`` while it was downloaded.
+        """
+        if self._fetched_checksum and self._fetched_checksum[0] == algo:
+            return self._fetched_checksum[1]
+        return crypto.checksum(
+            crypto.hash_fun_for_algo(algo), self.archive_file)
+
+    @property
+    def _verified_marker(self):
+        return self.archive_file + _verified_marker_suffix
+
+    def _archive_is_verified(self, algo):
+        """Whether the marker next to the archive says that it was already
+        verified against our digest, and the archive did not change since.
+        """
+        try:
+            with open(self._verified_marker) as f:
+                marker = sjson.load(f)
+            stat = os.stat(self.archive_file)
+            return (marker['algorithm'] == algo and
+                    marker['digest'] == self.digest and
+                    marker['size'] == stat.st_size and
+                    marker['mtime'] == stat.st_mtime)
+        except (IOError, OSError, ValueError, KeyError, TypeError,
+                sjson.SpackJSONError):
+            return False
+
+    def _mark_archive_verified(self, algo):
+        stat = os.stat(self.archive_file)
+        marker = {
+            'algorithm': algo,
+            'digest': self.digest,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+        }
+        try:
+            with open(self._verified_marker, 'w') as f:
+                sjson.dump(marker, f)
+        except (IOError, OSError) as e:
+            tty.debug('Cannot mark {0} as verified: {1}'
+                      .format(self.archive_file, e))
+
     @_needs_stage
     def check(self):
         """Check the downloaded archive against a checksum digest.
-           No-op if this stage checks code out of a repository."""
+           No-op if this stage checks code out of a repository.
+
+           Verified archives get a marker recording the digest, size and
+           modification time, so that they are not hashed again while
+           those still match."""
         if not self.digest:
             raise NoDigestError(
                 "Attempt to check URLFetchStrategy with no digest.")
 
         checker = crypto.Checker(self.digest)
-        if not checker.check(self.archive_file):
+        algo = checker.hash_name
+        if self._archive_is_verified(algo):
+            tty.debug('Archive {0} was already verified'
+                      .format(self.archive_file))
+            return
+
+        checker.sum = self.archive_checksum(algo)
+        if checker.sum != checker.hexdigest:
             raise ChecksumError(
                 "%s checksum failed for %s" %
                 (checker.hash_name, self.archive_file),
                 "Expected %s but got %s" % (self.digest, checker.sum))
 
+        self._mark_archive_verified(algo)
+
     @_needs_stage
     def reset(self):
         """
@@ -529,10 +838,12 @@ def reset(self):
                 "Tried to reset URLFetchStrategy before fetching",
                 "Failed on reset() for URL %s" % self.url)
 
-        # Remove everything but the archive from the stage
+        # Remove everything but the archive (and the record that it was
+        # verified) from the stage
+        keep = (self.archive_file, self._verified_marker)
         for filename in os.listdir(self.stage.path):
             abspath = os.path.join(self.stage.path, filename)
-            if abspath != self.archive_file:
+            if abspath not in keep:
                 shutil.rmtree(abspath, ignore_errors=True)
 
         # Expand the archive again
@@ -20,8 +20,17 @@
    This can be used to implement support for things like module
    systems (e.g. modules, lmod, etc.) or to add other custom
    features.
+
+   Hooks can also be run for many specs at once, e.g. with
+   ``post_uninstall.for_specs(specs)``. Modules that define a function
+   with the hook name followed by ``_specs`` (``post_uninstall_specs``)
+   get all the specs in one call, the others are called for each spec.
+   A hook failing there does not prevent the other hooks from running.
 """
 import os.path
+import traceback
+
+import llnl.util.tty as tty
 
 import spack.paths
 import spack.util.imp as simp
@@ -58,6 +67,37 @@ def __call__(self, *args, **kwargs):
                 if hasattr(hook, '__call__'):
                     hook(*args, **kwargs)
 
+    def for_specs(self, specs):
+        """Run the hook of every module for all the ``specs``.
+
+        A hook raising an error is reported with a warning, and the hooks
+        of the other modules and for the other specs still run.
+
+        Returns:
+            (bool): whether all the hooks succeeded
+        """
+        specs = list(specs)
+        succeeded = True
+        for module in all_hook_modules():
+            hook = getattr(module, self.hook_name + '_specs', None)
+            if hasattr(hook, '__call__'):
+                calls = [(hook, specs, 'all specs')]
+            else:
+                hook = getattr(module, self.hook_name, None)
+                if not hasattr(hook, '__call__'):
+                    continue
+                calls = [(hook, spec, str(spec)) for spec in specs]
+
+            for hook, arg, description in calls:
+                try:
+                    hook(arg)
+                except Exception:
+                    succeeded = False
+                    tty.warn('The {0} hook in {1} failed for {2}\n\n{3}'
+                             .format(self.hook_name, module.__name__,
+                                     description, traceback.format_exc()))
+        return succeeded
+
 
 pre_install = HookRunner('pre_install')
 post_install = HookRunner('post_install')
@@ -9,7 +9,7 @@
 import llnl.util.tty as tty
 
 
-def _for_each_enabled(spec, method_name):
+def _for_each_enabled(specs, method_name):
     """Calls a method for each enabled module"""
     enabled = spack.config.get('modules:enable')
     if not enabled:
@@ -17,18 +17,23 @@ def _for_each_enabled(spec, method_name):
         return
 
     for name in enabled:
-        generator = spack.modules.module_types[name](spec)
-        try:
-            getattr(generator, method_name)()
-        except RuntimeError as e:
-            msg = 'cannot perform the requested {0} operation on module files'
-            msg += ' [{1}]'
-            tty.warn(msg.format(method_name, str(e)))
+        for spec in specs:
+            generator = spack.modules.module_types[name](spec)
+            try:
+                getattr(generator, method_name)()
+            except RuntimeError as e:
+                msg = 'cannot perform the requested {0} operation on module '
+                msg += 'files [{1}]'
+                tty.warn(msg.format(method_name, str(e)))
 
 
 def post_install(spec):
-    _for_each_enabled(spec, 'write')
+    _for_each_enabled([spec], 'write')
 
 
 def post_uninstall(spec):
-    _for_each_enabled(spec, 'remove')
+    _for_each_enabled([spec], 'remove')
+
+
+def post_uninstall_specs(specs):
+    _for_each_enabled(specs, 'remove')
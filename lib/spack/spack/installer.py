@@ -30,6 +30,8 @@
 import glob
 import heapq
 import itertools
+import multiprocessing
+import multiprocessing.pool
 import os
 import shutil
 import six
@@ -46,6 +48,7 @@
 import spack.package
 import spack.package_prefs as prefs
 import spack.repo
+import spack.spec
 import spack.store
 
 from llnl.util.tty.color import colorize
@@ -354,6 +357,33 @@ def _try_install_from_binary_cache(pkg, explicit, unsigned=False):
     return _process_binary_cache_tarball(pkg, binary_spec, explicit, unsigned)
 
 
+def _extract_binary(args):
+    """
+    Extract and relocate a downloaded binary package.
+
+    This runs in the worker processes of a bulk install from binary caches,
+    so the spec is passed as its dictionary and errors are reported as
+    strings.
+
+    Args:
+        args (tuple): the spec's dictionary, the path to the tarball and
+            whether package signatures are not to be checked
+
+    Return:
+        (str or None) a description of the error if the extraction failed,
+            otherwise ``None``
+    """
+    spec_dict, tarball, unsigned = args
+    spec = spack.spec.Spec.from_dict(spec_dict)
+    spec._mark_concrete()
+    try:
+        binary_distribution.extract_tarball(spec, tarball, allow_root=False,
+                                            unsigned=unsigned, force=False)
+    except Exception as exc:
+        return '{0}: {1}'.format(exc.__class__.__name__, str(exc))
+    return None
+
+
 def _update_explicit_entry_in_db(pkg, rec, explicit):
     """
     Ensure the spec is marked explicit in the database.
@@ -558,7 +588,8 @@ def package_id(pkg):
 
 
 install_args_docstring = """
-            cache_only (bool): Fail if binary package unavailable.
+            cache_only (bool): Fail if binary package unavailable.  All the
+                binary packages are then downloaded and extracted in parallel.
             dirty (bool): Don't clean the build environment before installing.
             explicit (bool): True if package was explicitly installed, False
                 if package was implicitly installed (as a dependency).
@@ -1027,6 +1058,141 @@ def _init_queue(self, install_deps, install_package):
             # Now add the package itself, if appropriate
             self._push_task(self.pkg, False, 0, 0, STATUS_ADDED)
 
+    def _install_binaries(self, unsigned=False):
+        """
+        Install the queued packages from binary caches in bulk.
+
+        The tarballs of all the packages that are available from a mirror
+        are downloaded concurrently, then extracted and relocated in a pool
+        of processes, and finally registered in the database in one write
+        transaction.  A package is only installed this way if its
+        dependencies are already installed or are installed along with it.
+        Everything else is left to the regular installation loop.
+
+        Args:
+            unsigned (bool): ``True`` if binary package signatures are not
+                to be checked, otherwise, ``False``
+        """
+        # Order the packages to install so dependencies come first
+        tasks, visited = [], set()
+
+        def visit(task):
+            if task.pkg_id in visited:
+                return
+            visited.add(task.pkg_id)
+            for dep_id in sorted(task.dependencies):
+                if dep_id in self.build_tasks:
+                    visit(self.build_tasks[dep_id])
+            tasks.append(task)
+
+        for pkg_id in sorted(self.build_tasks):
+            visit(self.build_tasks[pkg_id])
+
+        tasks = [task for task in tasks if not (
+            task.pkg.spec.external or task.pkg.installed_upstream or
+            self._check_db(task.pkg.spec)[1])]
+        if not tasks:
+            return
+
+        # Look up the specs first: they are small, and fetching them is
+        # serialized by the build cache stage lock anyway.
+        binary_specs = {}
+        for task in tasks:
+            try:
+                specs = binary_distribution.get_spec(task.pkg.spec,
+                                                     force=False)
+            except Exception as exc:
+                # Leave the error to the regular installation loop
+                tty.debug('Failed to look up {0} in binary caches: {1}'
+                          .format(task.pkg_id, str(exc)))
+                continue
+            binary_spec = spack.spec.Spec.from_dict(task.pkg.spec.to_dict())
+            binary_spec._mark_concrete()
+            if binary_spec in specs:
+                binary_specs[task.pkg_id] = binary_spec
+
+        # Only install packages whose dependencies are, or will be, installed
+        ready = set()
+        for task in tasks:
+            if task.pkg_id not in binary_specs or any(
+                    dep_id in self.build_tasks and dep_id not in ready and
+                    not self._check_db(self.build_tasks[dep_id].pkg.spec)[1]
+                    for dep_id in task.dependencies):
+                continue
+
+            # Leave packages that other processes are working on to the
+            # regular installation loop.
+            ltype, lock = self._ensure_locked('write', task.pkg)
+            if lock is not None:
+                ready.add(task.pkg_id)
+
+        tasks = [task for task in tasks if task.pkg_id in ready]
+        if not tasks:
+            return
+
+        tty.msg('Downloading {0} packages from binary cache'
+                .format(len(tasks)))
+        pool = multiprocessing.pool.ThreadPool(min(16, len(tasks)))
+        try:
+            tarballs = pool.map(
+                lambda t: binary_distribution.download_tarball(
+                    binary_specs[t.pkg_id]), tasks)
+        finally:
+            pool.terminate()
+            pool.join()
+
+        args = []
+        for task, tarball in zip(tasks, tarballs):
+            if tarball is None:
+                tty.msg('{0} exists in binary cache but with different hash'
+                        .format(task.pkg.name))
+                continue
+            tty.msg('Extracting {0} from binary cache'.format(task.pkg_id))
+            self._prepare_for_install(task, False, True)
+            args.append((task, (task.pkg.spec.to_dict(), tarball, unsigned)))
+
+        jobs = min(spack.config.get('config:build_jobs', 16),
+                   multiprocessing.cpu_count(), len(args))
+        if jobs > 1:
+            pool = multiprocessing.Pool(jobs)
+            try:
+                errors = pool.map(_extract_binary, [a for _, a in args])
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            errors = [_extract_binary(a) for _, a in args]
+
+        extracted = set()
+        for (task, _), error in zip(args, errors):
+            if error:
+                tty.warn('Failed to extract {0} from binary cache: {1}'
+                         .format(task.pkg_id, error))
+            else:
+                extracted.add(task.pkg_id)
+
+        # Register the packages, dependencies first, so that a package is
+        # never recorded without its dependencies.
+        installed = []
+        with spack.store.db.write_transaction():
+            for task in tasks:
+                if task.pkg_id not in extracted:
+                    continue
+                if any(dep_id in ready and dep_id not in installed
+                       for dep_id in task.dependencies):
+                    task.pkg.remove_prefix()
+                    continue
+                task.pkg.installed_from_binary_cache = True
+                spack.store.db.add(task.pkg.spec, spack.store.layout,
+                                   explicit=task.pkg_id == self.pkg_id)
+                installed.append(task.pkg_id)
+
+        for task in tasks:
+            if task.pkg_id in installed:
+                tty.debug('Successfully extracted {0} from binary cache'
+                          .format(task.pkg_id))
+                spack.hooks.post_install(task.pkg.spec)
+
     def _install_task(self, task, **kwargs):
         """
         Perform the installation of the requested spec and/or dependency
@@ -1116,6 +1282,10 @@ def build_process():
                         # Save the build environment in a file before building.
                         dump_environment(pkg.env_path)
 
+                        # Precompute the compiler wrapper's argument lists
+                        spack.build_environment.write_wrapper_cache(
+                            pkg.stage.path)
+
                         for attr in ('configure_args', 'cmake_args'):
                             try:
                                 configure_args = getattr(pkg, attr)()
@@ -1431,6 +1601,10 @@ def install(self, **kwargs):
         # Initialize the build task queue
         self._init_queue(install_deps, install_package)
 
+        # Binary-only installs do not need to go one package at a time
+        if kwargs.get('cache_only', False) and kwargs.get('use_cache', True):
+            self._install_binaries(kwargs.get('unsigned', False))
+
         # Proceed with the installation
         while self.build_pq:
             task = self._pop_task()
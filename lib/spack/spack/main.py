@@ -23,6 +23,8 @@
 
 import llnl.util.cpu
 import llnl.util.filesystem as fs
+import llnl.util.lang
+import llnl.util.lock
 import llnl.util.tty as tty
 import llnl.util.tty.color as color
 from llnl.util.tty.log import log_output
@@ -781,6 +783,29 @@ def main(argv=None):
             traceback.print_exc()
         return e.code
 
+    finally:
+        if args.debug:
+            _print_lock_statistics()
+            _print_cache_statistics()
+
+
+def _print_lock_statistics():
+    """Report the locks this process had to wait for, if any."""
+    stats = llnl.util.lock.lock_statistics(contended_only=True)
+    if stats:
+        tty.debug('Lock contention (longest waits first):')
+        for s in stats:
+            tty.debug('    {0}'.format(s))
+
+
+def _print_cache_statistics():
+    """Report the hit rates of the in-memory caches used by this process."""
+    stats = llnl.util.lang.lru_cache_statistics()
+    if stats:
+        tty.debug('Cache hit rates:')
+        for s in stats:
+            tty.debug('    {0}'.format(s))
+
 
 class SpackCommandError(Exception):
     """Raised when SpackCommand execution fails."""
@@ -17,11 +17,11 @@
 import functools
 import hashlib
 import inspect
+import multiprocessing.pool
 import os
 import re
 import shutil
 import sys
-import textwrap
 import time
 import traceback
 import six
@@ -46,6 +46,7 @@
 import spack.store
 import spack.url
 import spack.util.environment
+import spack.util.string
 import spack.util.web
 from llnl.util.lang import memoized
 from llnl.util.link_tree import LinkTree
@@ -745,51 +746,53 @@ def possible_dependencies(
         visited = {} if visited is None else visited
         missing = {} if missing is None else missing
 
-        visited.setdefault(cls.name, set())
+        # Dependencies of this package come from the class itself, and
+        # those of all other packages from the repository's dependency
+        # index, so that none of them needs to be loaded.
+        index = spack.repo.path.dependency_index
 
-        for name, conditions in cls.dependencies.items():
-            # check whether this dependency could be of the type asked for
-            types = [dep.type for cond, dep in conditions.items()]
-            types = set.union(*types)
-            if not any(d in types for d in deptype):
-                continue
+        def visit(pkg_name, dependencies):
+            visited.setdefault(pkg_name, set())
 
-            # expand virtuals if enabled, otherwise just stop at virtuals
-            if spack.repo.path.is_virtual(name):
-                if expand_virtuals:
-                    providers = spack.repo.path.providers_for(name)
-                    dep_names = [spec.name for spec in providers]
-                else:
-                    visited.setdefault(cls.name, set()).add(name)
-                    visited.setdefault(name, set())
+            for name, deptypes in dependencies.items():
+                # check whether this dependency could be of the type asked
+                if not any(d in deptypes for d in deptype):
                     continue
-            else:
-                dep_names = [name]
 
-            # add the dependency names to the visited dict
-            visited.setdefault(cls.name, set()).update(set(dep_names))
+                # expand virtuals if enabled, otherwise just stop at virtuals
+                if spack.repo.path.is_virtual(name):
+                    if expand_virtuals:
+                        providers = spack.repo.path.providers_for(name)
+                        dep_names = [spec.name for spec in providers]
+                    else:
+                        visited[pkg_name].add(name)
+                        visited.setdefault(name, set())
+                        continue
+                else:
+                    dep_names = [name]
 
-            # recursively traverse dependencies
-            for dep_name in dep_names:
-                if dep_name in visited:
-                    continue
+                # add the dependency names to the visited dict
+                visited[pkg_name].update(dep_names)
 
-                visited.setdefault(dep_name, set())
+                # recursively traverse dependencies
+                for dep_name in dep_names:
+                    if dep_name in visited:
+                        continue
 
-                # skip the rest if not transitive
-                if not transitive:
-                    continue
+                    visited.setdefault(dep_name, set())
 
-                try:
-                    dep_cls = spack.repo.path.get_pkg_class(dep_name)
-                except spack.repo.UnknownPackageError:
-                    # log unknown packages
-                    missing.setdefault(cls.name, set()).add(dep_name)
-                    continue
+                    # skip the rest if not transitive
+                    if not transitive:
+                        continue
+
+                    if dep_name not in index:
+                        # log unknown packages
+                        missing.setdefault(pkg_name, set()).add(dep_name)
+                        continue
 
-                dep_cls.possible_dependencies(
-                    transitive, expand_virtuals, deptype, visited, missing)
+                    visit(dep_name, index[dep_name])
 
+        visit(cls.name, spack.repo.DependencyIndex.dependency_types(cls))
         return visited
 
     # package_dir and module are *class* properties (see PackageMeta),
@@ -2175,6 +2178,152 @@ def uninstall_by_spec(spec, force=False, deprecator=None):
 
         tty.msg('Successfully uninstalled {0}'.format(spec.short_spec))
 
+    @staticmethod
+    def uninstall_specs(specs, force=False, jobs=None):
+        """Uninstall many specs at once.
+
+        This does what ``uninstall_by_spec()`` does for each spec, but
+        runs the pre-uninstall hooks of dependents before those of their
+        dependencies, removes the prefixes with a pool of threads (those of
+        dependents before those of their dependencies, which are kept if a
+        dependent could not be removed), records
+        all the removals in the database with a single write, and runs the
+        post-uninstall hooks for all the specs at once.
+
+        Args:
+            specs (list): installed specs to be uninstalled
+            force (bool): uninstall specs even if installed specs that
+                are not being uninstalled depend on them, and carry on
+                if uninstallation hooks fail
+            jobs (int): maximum number of prefixes removed concurrently
+                (default 16)
+        """
+        db = spack.store.db
+        specs = dependents_first(specs)
+        hashes = set(s.dag_hash() for s in specs)
+
+        deprecated = set()
+        with db.read_transaction():
+            for spec in specs:
+                if not db.query(spec, installed=any):
+                    raise InstallError(str(spec) + " is not installed.")
+                if db.deprecator(spec):
+                    deprecated.add(spec.dag_hash())
+
+            if not force:
+                all_dependents = db.installed_dependents(specs)
+                for spec in specs:
+                    dependents = [d for d in all_dependents[spec.dag_hash()]
+                                  if d.dag_hash() not in hashes]
+                    if dependents:
+                        raise PackageStillNeededError(spec, dependents)
+
+        def package_for(spec):
+            try:
+                return spec.package
+            except spack.repo.UnknownEntityError:
+                return None
+
+        # Prefixes that are already gone only need their DB entry removed,
+        # and specs of unknown packages get no hooks.
+        present = [s for s in specs if os.path.isdir(s.prefix)]
+        hooked = [s for s in present if package_for(s) is not None]
+        errors = {}
+        locks = [db.prefix_lock(s) for s in present]
+        acquired = []
+        try:
+            for lock in locks:
+                lock.acquire_write()
+                acquired.append(lock)
+
+            for spec in hooked:
+                try:
+                    spack.hooks.pre_uninstall(spec)
+                except Exception as error:
+                    if not force:
+                        raise
+                    error_msg = (
+                        "One or more pre_uninstall hooks have failed"
+                        " for {0}, but Spack is continuing with the"
+                        " uninstall".format(str(spec)))
+                    if isinstance(error, spack.error.SpackError):
+                        error_msg += (
+                            "\n\nError message: {0}".format(str(error)))
+                    tty.warn(error_msg)
+
+            # Uninstalling in Spack only requires removing the prefix.
+            def remove_prefix(spec):
+                msg = 'Deleting package prefix [{0}]'
+                tty.debug(msg.format(spec.short_spec))
+                try:
+                    spack.store.layout.remove_install_directory(
+                        spec, spec.dag_hash() in deprecated)
+                except spack.directory_layout.RemoveFailedError as e:
+                    errors[spec.dag_hash()] = e
+
+            # Prefixes are removed in waves, each with the specs whose
+            # dependents in the batch were all removed in earlier waves.
+            # Specs whose prefix could not be removed stay installed, and
+            # so do their dependencies.
+            dependents = dict((s.dag_hash(), []) for s in specs)
+            for spec in specs:
+                for dep in spec.dependencies():
+                    if dep.dag_hash() in dependents:
+                        dependents[dep.dag_hash()].append(spec.dag_hash())
+
+            waves = []
+            wave_of = {}
+            for spec in specs:
+                h = spec.dag_hash()
+                wave_of[h] = max([wave_of[d] + 1 for d in dependents[h]] or
+                                 [0])
+                if wave_of[h] == len(waves):
+                    waves.append([])
+                waves[wave_of[h]].append(spec)
+
+            present_hashes = set(s.dag_hash() for s in present)
+            kept = set()
+            pool = multiprocessing.pool.ThreadPool(
+                min(jobs or 16, len(present) or 1))
+            try:
+                for wave in waves:
+                    to_remove = []
+                    for spec in wave:
+                        h = spec.dag_hash()
+                        if any(d in kept for d in dependents[h]):
+                            tty.debug('Keeping {0}, needed by a package that'
+                                      ' was not uninstalled'
+                                      .format(spec.short_spec))
+                            kept.add(h)
+                        elif h in present_hashes and not spec.external:
+                            to_remove.append(spec)
+                    pool.map(remove_prefix, to_remove)
+                    kept.update(errors)
+            finally:
+                pool.terminate()
+                pool.join()
+
+            specs = [s for s in specs if s.dag_hash() not in kept]
+            tty.debug('Deleting {0} DB entries'.format(len(specs)))
+            db.remove_specs(specs)
+        finally:
+            for lock in reversed(acquired):
+                lock.release_write()
+
+        # Each failing hook is reported, and does not prevent the others
+        # from running.
+        if not spack.hooks.post_uninstall.for_specs(
+                s for s in hooked if s.dag_hash() not in kept):
+            tty.warn(
+                "One or more post-uninstallation hooks failed, but the"
+                " prefixes have been removed (if they are not external).")
+
+        for spec in specs:
+            tty.msg('Successfully uninstalled {0}'.format(spec.short_spec))
+
+        if errors:
+            raise next(iter(errors.values()))
+
     def do_uninstall(self, force=False):
         """Uninstall this package by spec."""
         # delegate to instance-less method.
@@ -2398,17 +2547,8 @@ def do_clean(self):
 
     def format_doc(self, **kwargs):
         """Wrap doc string at 72 characters and format nicely"""
-        indent = kwargs.get('indent', 0)
-
-        if not self.__doc__:
-            return ""
-
-        doc = re.sub(r'\s+', ' ', self.__doc__)
-        lines = textwrap.wrap(doc, 72)
-        results = six.StringIO()
-        for line in lines:
-            results.write((" " * indent) + line + "\n")
-        return results.getvalue()
+        return spack.util.string.format_doc(
+            self.__doc__, kwargs.get('indent', 0))
 
     @property
     def all_urls(self):
@@ -2440,16 +2580,7 @@ def fetch_remote_versions(self, concurrency=128):
         Returns:
             dict: a dictionary mapping versions to URLs
         """
-        if not self.all_urls:
-            return {}
-
-        try:
-            return spack.util.web.find_versions_of_archive(
-                self.all_urls, self.list_url, self.list_depth, concurrency
-            )
-        except spack.util.web.NoNetworkConnectionError as e:
-            tty.die("Package.fetch_versions couldn't connect to:", e.url,
-                    e.message)
+        return fetch_remote_versions([self], concurrency)[0]
 
     @property
     def rpath(self):
@@ -2608,6 +2739,60 @@ def possible_dependencies(*pkg_or_spec, **kwargs):
     return visited
 
 
+def fetch_remote_versions(packages, concurrency=128):
+    """Find remote versions of a number of packages.
+
+    The list pages of all the packages are spidered in a single run. See
+    ``PackageBase.fetch_remote_versions`` for details.
+
+    Returns:
+        list: a dictionary mapping versions to URLs for each package
+    """
+    queries = [(pkg.all_urls, pkg.list_url, pkg.list_depth)
+               for pkg in packages if pkg.all_urls]
+    try:
+        found = iter(spack.util.web.find_versions_of_archives(
+            queries, concurrency))
+    except spack.util.web.NoNetworkConnectionError as e:
+        tty.die("Package.fetch_versions couldn't connect to:", e.url,
+                e.message)
+
+    return [next(found) if pkg.all_urls else {} for pkg in packages]
+
+
+def dependents_first(specs):
+    """Order concrete specs so that each comes before its dependencies.
+
+    Only dependency relations between the given specs are taken into
+    account. Specs that don't depend on each other keep their order.
+
+    Returns:
+        list: the specs, in topological order from dependents to
+            dependencies
+    """
+    by_hash = OrderedDict((s.dag_hash(), s) for s in specs)
+    deps = dict((h, [d.dag_hash() for d in s.dependencies()
+                     if d.dag_hash() in by_hash])
+                for h, s in by_hash.items())
+
+    # Number of dependents of each spec that are not placed yet
+    waiting = dict((h, 0) for h in by_hash)
+    for h in by_hash:
+        for d in deps[h]:
+            waiting[d] += 1
+
+    ready = [h for h in reversed(by_hash) if not waiting[h]]
+    ordered = []
+    while ready:
+        h = ready.pop()
+        ordered.append(by_hash[h])
+        for d in reversed(deps[h]):
+            waiting[d] -= 1
+            if not waiting[d]:
+                ready.append(d)
+    return ordered
+
+
 class FetchError(spack.error.SpackError):
     """Raised when something goes wrong during fetch."""
 
@@ -193,22 +193,23 @@ def fetch(self):
         self.stage.fetch()
         self.stage.check()
 
-        root = self.stage.path
         if self.archive_sha256:
             self.stage.expand_archive()
             root = self.stage.source_path
 
-        files = os.listdir(root)
-        if not files:
-            if self.archive_sha256:
+            files = os.listdir(root)
+            if not files:
                 raise NoSuchPatchError(
                     "Archive was empty: %s" % self.url)
-            else:
+            self.path = os.path.join(root, files.pop())
+        else:
+            # the stage also holds files other than the patch, such as the
+            # record that it was verified
+            self.path = self.stage.archive_file
+            if not self.path:
                 raise NoSuchPatchError(
                     "Patch failed to download: %s" % self.url)
 
-        self.path = os.path.join(root, files.pop())
-
         if not os.path.isfile(self.path):
             raise NoSuchPatchError(
                 "Archive %s contains no patch file!" % self.url)
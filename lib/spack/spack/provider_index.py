@@ -3,40 +3,132 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 """Classes and functions to manage providers of virtual dependencies"""
-import itertools
+from bisect import bisect_left
 
 import six
+
+import llnl.util.lang
+
 import spack.error
 import spack.util.spack_json as sjson
+import spack.version
+
+#: Memoized results of ``satisfies()`` between provided and requested
+#: virtual specs, and between packages and their ``provides()`` conditions
+_satisfies_cache = llnl.util.lang.LRUCache(
+    8192, name='provider satisfies')
 
+#: Memoized results of checking whether two specs can be constrained
+#: by one another, for ``ProviderIndex.satisfies()``
+_compatible_cache = llnl.util.lang.LRUCache(
+    8192, name='provider compatibility')
 
-def _cross_provider_maps(lmap, rmap):
-    """Return a dictionary that combines constraint requests from both input.
+
+def _node_key(spec):
+    """Hashable key of the attributes of a node that are checked by
+    ``satisfies()`` and ``constrain()``.
+
+    Attributes are turned into strings where possible, as their hashes are
+    cached and the key is hashed at every lookup.
+    """
+    variants = tuple(sorted(
+        (name, type(v), v.value) for name, v in spec.variants.items()))
+    return (spec.name, spec.namespace, str(spec.versions), variants,
+            str(spec.architecture), str(spec.compiler),
+            str(spec.compiler_flags))
+
+
+def _satisfies(spec, other, spec_key=None, other_key=None):
+    """Memoized ``spec.satisfies(other, deps=False)``.
 
     Args:
-        lmap: main provider map
-        rmap: provider map with additional constraints
+        spec: spec that should satisfy the constraint
+        other: constraint, with the same name as ``spec``
+        spec_key: ``_node_key(spec)``, if already computed
+        other_key: ``_node_key(other)``, if already computed
     """
-    # TODO: this is pretty darned nasty, and inefficient, but there
-    # TODO: are not that many vdeps in most specs.
-    result = {}
-    for lspec, rspec in itertools.product(lmap, rmap):
+    if spec.concrete or other.concrete:
+        return spec.satisfies(other, deps=False)
+
+    key = (spec_key or _node_key(spec), other_key or _node_key(other))
+    result = _satisfies_cache.get(key)
+    if result is None:
+        result = spec.satisfies(other, deps=False)
+        _satisfies_cache.put(key, result)
+    return result
+
+
+def _compatible(spec, other, deps=False):
+    """Whether ``spec.constrained(other, deps)`` succeeds (memoized)."""
+    if spec.concrete:
+        # this is what constrain() checks, without copying the DAG
+        return spec.satisfies(other)
+
+    if other.concrete or (
+            deps and (spec.dependencies() or other.dependencies())):
         try:
-            constrained = lspec.constrained(rspec)
+            spec.constrained(other, deps)
+            return True
         except spack.error.UnsatisfiableSpecError:
-            continue
-
-        # lp and rp are left and right provider specs.
-        for lp_spec, rp_spec in itertools.product(lmap[lspec], rmap[rspec]):
-            if lp_spec.name == rp_spec.name:
-                try:
-                    const = lp_spec.constrained(rp_spec, deps=False)
-                    result.setdefault(constrained, set()).add(const)
-                except spack.error.UnsatisfiableSpecError:
-                    continue
+            return False
+
+    key = (_node_key(spec), _node_key(other))
+    result = _compatible_cache.get(key)
+    if result is None:
+        try:
+            spec.constrained(other, deps=False)
+            result = True
+        except spack.error.UnsatisfiableSpecError:
+            result = False
+        _compatible_cache.put(key, result)
     return result
 
 
+def _version_bounds(spec):
+    """Sort keys of the lowest and highest versions a spec allows."""
+    versions = spec.versions
+    if not versions:
+        # no versions means no constraint
+        return spack.version._open_start, spack.version._open_end
+    return versions[0]._sort_key[0], versions[-1]._upper_key
+
+
+def _compatible_providers(lmap, rmap):
+    """Whether some provider in one map can be combined with one in the other.
+
+    Args:
+        lmap: main provider map
+        rmap: provider map with additional constraints
+
+    Returns:
+        True if a virtual spec and a provider in ``lmap`` are compatible
+        with a virtual spec and a provider of the same package in ``rmap``
+    """
+    # Group the providers on the right by package name, so that providers
+    # on the left are only paired with providers of the same package
+    rproviders = dict(
+        (rspec, _group_by_name(rp_specs)) for rspec, rp_specs in rmap.items())
+
+    for lspec, lp_specs in lmap.items():
+        for rspec, rp_by_name in rproviders.items():
+            if not _compatible(lspec, rspec, deps=True):
+                continue
+
+            # lp and rp are left and right provider specs.
+            for lp_spec in lp_specs:
+                for rp_spec in rp_by_name.get(lp_spec.name, ()):
+                    if _compatible(lp_spec, rp_spec):
+                        return True
+    return False
+
+
+def _group_by_name(specs):
+    by_name = {}
+    for spec in specs:
+        by_name.setdefault(spec.name, []).append(spec)
+    return by_name
+
+
 class _IndexBase(object):
     #: This is a dict of dicts used for finding providers of particular
     #: virtual dependencies. The dict of dicts looks like:
@@ -70,12 +162,43 @@ def providers_for(self, virtual_spec):
 
         # Add all the providers that satisfy the vpkg spec.
         if virtual_spec.name in self.providers:
-            for p_spec, spec_set in self.providers[virtual_spec.name].items():
-                if p_spec.satisfies(virtual_spec, deps=False):
-                    result.update(spec_set)
+            providers = self.providers[virtual_spec.name]
+            virtual_key = _node_key(virtual_spec)
+            for p_spec, p_key in self._candidates(virtual_spec):
+                if _satisfies(p_spec, virtual_spec, p_key, virtual_key):
+                    result.update(providers[p_spec])
 
         # Return providers in order. Defensively copy.
-        return sorted(s.copy() for s in result)
+        return [s.copy() for s in sorted(result, key=lambda s: s._cmp_key())]
+
+    def _candidates(self, virtual_spec):
+        """Provided specs whose versions may satisfy a virtual spec.
+
+        The provided specs of each virtual are bucketed by the upper end
+        of their version ranges, so that the ones entirely below the
+        requested versions are skipped by bisection.
+
+        Returns:
+            list of (provided spec, node key) pairs
+        """
+        name = virtual_spec.name
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            entries = []
+            for i, p_spec in enumerate(self.providers[name]):
+                lower, upper = _version_bounds(p_spec)
+                entries.append((upper, i, lower, p_spec))
+            entries.sort()
+            bucket = ([upper for upper, _, _, _ in entries],
+                      [(lower, p_spec, _node_key(p_spec))
+                       for _, _, lower, p_spec in entries])
+            self._buckets[name] = bucket
+
+        uppers, specs = bucket
+        lowest, highest = _version_bounds(virtual_spec)
+        start = bisect_left(uppers, lowest)
+        return [(p_spec, key) for lower, p_spec, key in specs[start:]
+                if lower <= highest]
 
     def __contains__(self, name):
         return name in self.providers
@@ -95,15 +218,9 @@ def satisfies(self, other):
 
         # This ensures that some provider in other COULD satisfy the
         # vpkg constraints on self.
-        result = {}
-        for name in common:
-            crossed = _cross_provider_maps(
-                self.providers[name], other.providers[name]
-            )
-            if crossed:
-                result[name] = crossed
-
-        return all(c in result for c in common)
+        return all(
+            _compatible_providers(self.providers[name], other.providers[name])
+            for name in common)
 
     def __eq__(self, other):
         return self.providers == other.providers
@@ -150,6 +267,10 @@ def __init__(self, specs=None, restrict=False):
         self.restrict = restrict
         self.providers = {}
 
+        #: Provided specs of each virtual, sorted by version (see
+        #: ``_candidates()``), computed lazily
+        self._buckets = {}
+
         for spec in specs:
             if not isinstance(spec, spack.spec.Spec):
                 spec = spack.spec.Spec(spec)
@@ -181,12 +302,13 @@ def update(self, spec):
                 # We want satisfaction other than flags
                 provider_spec.compiler_flags = spec.compiler_flags.copy()
 
-                if spec.satisfies(provider_spec, deps=False):
+                if _satisfies(spec, provider_spec):
                     provided_name = provided_spec.name
 
                     provider_map = self.providers.setdefault(provided_name, {})
                     if provided_spec not in provider_map:
                         provider_map[provided_spec] = set()
+                        self._buckets.pop(provided_name, None)
 
                     if self.restrict:
                         provider_set = provider_map[provided_spec]
@@ -227,6 +349,7 @@ def merge(self, other):
             other (ProviderIndex): provider index to be merged
         """
         other = other.copy()   # defensive copy.
+        self._buckets.clear()
 
         for pkg in other.providers:
             if pkg not in self.providers:
@@ -244,6 +367,7 @@ def merge(self, other):
 
     def remove_provider(self, pkg_name):
         """Remove a provider from the ProviderIndex."""
+        self._buckets.clear()
         empty_pkg_dict = []
         for pkg, pkg_dict in self.providers.items():
             empty_pset = []
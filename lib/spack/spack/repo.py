@@ -32,6 +32,7 @@
 import llnl.util.filesystem as fs
 import spack.config
 import spack.caches
+import spack.dependency
 import spack.error
 import spack.patch
 import spack.spec
@@ -40,6 +41,7 @@
 import spack.provider_index
 import spack.util.path
 import spack.util.naming as nm
+import spack.version
 
 #: Super-namespace for all packages.
 #: Package modules are imported as spack.pkg.<namespace>.<pkg-name>.
@@ -249,6 +251,280 @@ def update_package(self, pkg_name):
             self._tag_dict[tag].append(package.name)
 
 
+class DependencyIndex(Mapping):
+    """Maps package names to their possible dependencies, and back.
+
+    Each package is mapped to the names of the packages it can depend on
+    (virtuals are kept as such), each with the union of the dependency
+    types it has under any condition. The reverse graph maps the same
+    names to the packages that can depend on them, so that both
+    dependencies and dependents are dictionary lookups.
+    """
+
+    def __init__(self):
+        self._dependencies = {}
+        self._dependents = {}
+
+    @staticmethod
+    def dependency_types(pkg_cls):
+        """Possible dependencies of a package class, with their types.
+
+        Args:
+            pkg_cls (type): package class to inspect
+
+        Returns:
+            (dict): dependency names mapped to sorted lists of types
+        """
+        result = {}
+        for name, conditions in pkg_cls.dependencies.items():
+            deptypes = set()
+            for dep in conditions.values():
+                deptypes.update(dep.type)
+            result[name] = sorted(deptypes)
+        return result
+
+    def to_json(self, stream):
+        sjson.dump({'dependencies': self._dependencies,
+                    'dependents': self._dependents}, stream)
+
+    @staticmethod
+    def from_json(stream):
+        d = sjson.load(stream)
+
+        r = DependencyIndex()
+        r._dependencies = d['dependencies']
+        r._dependents = d['dependents']
+
+        return r
+
+    def __getitem__(self, pkg_name):
+        return self._dependencies[pkg_name]
+
+    def __iter__(self):
+        return iter(self._dependencies)
+
+    def __len__(self):
+        return len(self._dependencies)
+
+    def dependency_names(self):
+        """Names of all the packages that something can depend on."""
+        return self._dependents.keys()
+
+    def dependencies_of(self, pkg_name, deptype='all'):
+        """Names of the direct dependencies of a package.
+
+        Args:
+            pkg_name (str): name of the package
+            deptype (str or tuple): only consider dependencies that can be
+                of these types
+        """
+        deptype = spack.dependency.canonical_deptype(deptype)
+        return set(name for name, deptypes in self.get(pkg_name, {}).items()
+                   if any(t in deptypes for t in deptype))
+
+    def dependents_of(self, pkg_name, deptype='all'):
+        """Names of the packages that can depend directly on a package.
+
+        Args:
+            pkg_name (str): name of the (possibly virtual) package
+            deptype (str or tuple): only consider dependents that depend on
+                it with one of these types
+        """
+        deptype = spack.dependency.canonical_deptype(deptype)
+        dependents = self._dependents.get(pkg_name, {})
+        return set(name for name, deptypes in dependents.items()
+                   if any(t in deptypes for t in deptype))
+
+    def _remove(self, pkg_name):
+        for dep_name in self._dependencies.pop(pkg_name, {}):
+            dependents = self._dependents[dep_name]
+            del dependents[pkg_name]
+            if not dependents:
+                del self._dependents[dep_name]
+
+    def _add(self, pkg_name, dependencies):
+        self._dependencies[pkg_name] = dependencies
+        for dep_name, deptypes in dependencies.items():
+            self._dependents.setdefault(dep_name, {})[pkg_name] = deptypes
+
+    def update_package(self, pkg_fullname):
+        """Updates a package in the dependency index.
+
+        Args:
+            pkg_fullname (str): name of the package to be updated
+        """
+        pkg_name = pkg_fullname.split('.')[-1]
+        pkg_cls = path.get_pkg_class(pkg_fullname)
+        self._remove(pkg_name)
+        self._add(pkg_name, self.dependency_types(pkg_cls))
+
+    def merge(self, other, names=None):
+        """Merge another index into this one.
+
+        Packages in ``other`` replace the packages with the same names in
+        this index.
+
+        Args:
+            other (DependencyIndex): index to be merged
+            names (container): if given, only packages with these names
+                are merged
+        """
+        for pkg_name, dependencies in other.items():
+            if names is not None and pkg_name not in names:
+                continue
+            self._remove(pkg_name)
+            self._add(pkg_name, dependencies)
+
+
+class SearchIndex(Mapping):
+    """Maps package names to the metadata shown when listing packages,
+    with an inverted index of the words in it, so that packages can be
+    searched and listed without loading them.
+
+    Each package is mapped to its description, homepage, tags, variant
+    names, maintainers and versions. Words are the lowercased runs of
+    alphanumeric characters in the name, description, homepage, tags and
+    variant names of a package.
+    """
+
+    def __init__(self):
+        self._packages = {}
+        self._words = {}
+
+    @staticmethod
+    def package_record(pkg_cls):
+        """Metadata of a package class stored in the index.
+
+        Args:
+            pkg_cls (type): package class to inspect
+
+        Returns:
+            (dict): the description, homepage, tags, variant names,
+                maintainers, versions (newest first) and preferred version
+        """
+        versions = spack.version.VersionList(pkg_cls.versions)
+        return {
+            'description': pkg_cls.__doc__ or '',
+            'homepage': getattr(pkg_cls, 'homepage', None),
+            'tags': sorted(getattr(pkg_cls, 'tags', [])),
+            'variants': sorted(pkg_cls.variants),
+            'maintainers': list(pkg_cls.maintainers),
+            'versions': [str(v) for v in reversed(sorted(pkg_cls.versions))],
+            'preferred_version': str(versions.preferred())}
+
+    @staticmethod
+    def words(text):
+        """Lowercased words of a string, as they are indexed."""
+        return re.findall(r'\w+', text.lower())
+
+    def _package_words(self, pkg_name, record):
+        fields = [pkg_name, record['description'], record['homepage'] or '']
+        fields.extend(record['tags'])
+        fields.extend(record['variants'])
+        return set(w for f in fields for w in self.words(f))
+
+    def to_json(self, stream):
+        sjson.dump({'packages': self._packages,
+                    'words': dict((w, sorted(names))
+                                  for w, names in self._words.items())},
+                   stream)
+
+    @staticmethod
+    def from_json(stream):
+        d = sjson.load(stream)
+
+        r = SearchIndex()
+        r._packages = d['packages']
+        r._words = dict((w, set(names)) for w, names in d['words'].items())
+
+        return r
+
+    def __getitem__(self, pkg_name):
+        return self._packages[pkg_name]
+
+    def __iter__(self):
+        return iter(self._packages)
+
+    def __len__(self):
+        return len(self._packages)
+
+    def search(self, *texts):
+        """Names of the packages that contain all the words of the given
+        strings.
+
+        Args:
+            texts (str): strings whose words to look for, in any case
+        """
+        result = None
+        for word in set(w for t in texts for w in self.words(t)):
+            names = self._words.get(word, set())
+            result = names.copy() if result is None else result & names
+        return result if result is not None else set(self._packages)
+
+    def containing(self, text):
+        """Names of the packages that may contain a string.
+
+        Every run of alphanumeric characters in the string has to be part
+        of a word of the package, which is necessary for the package to
+        contain the string in any indexed field, in any case. Callers
+        should check the actual fields of the packages returned.
+
+        Args:
+            text (str): literal string to look for
+        """
+        result = None
+        for part in self.words(text):
+            names = set()
+            for word, packages in self._words.items():
+                if part in word:
+                    names.update(packages)
+            result = names if result is None else result & names
+        return result if result is not None else set(self._packages)
+
+    def _remove(self, pkg_name):
+        record = self._packages.pop(pkg_name, None)
+        if record is None:
+            return
+        for word in self._package_words(pkg_name, record):
+            names = self._words[word]
+            names.discard(pkg_name)
+            if not names:
+                del self._words[word]
+
+    def _add(self, pkg_name, record):
+        self._packages[pkg_name] = record
+        for word in self._package_words(pkg_name, record):
+            self._words.setdefault(word, set()).add(pkg_name)
+
+    def update_package(self, pkg_fullname):
+        """Updates a package in the search index.
+
+        Args:
+            pkg_fullname (str): name of the package to be updated
+        """
+        pkg_name = pkg_fullname.split('.')[-1]
+        pkg_cls = path.get_pkg_class(pkg_fullname)
+        self._remove(pkg_name)
+        self._add(pkg_name, self.package_record(pkg_cls))
+
+    def merge(self, other, names=None):
+        """Merge another index into this one.
+
+        Packages in ``other`` replace the packages with the same names in
+        this index.
+
+        Args:
+            other (SearchIndex): index to be merged
+            names (container): if given, only packages with these names
+                are merged
+        """
+        for pkg_name, record in other.items():
+            if names is not None and pkg_name not in names:
+                continue
+            self._remove(pkg_name)
+            self._add(pkg_name, record)
+
+
 @six.add_metaclass(abc.ABCMeta)
 class Indexer(object):
     """Adaptor for indexes that need to be generated when repos are updated."""
@@ -345,6 +621,36 @@ def update(self, pkg_fullname):
         self.index.update_package(pkg_fullname)
 
 
+class DependencyIndexer(Indexer):
+    """Lifecycle methods for a DependencyIndex on a Repo."""
+    def _create(self):
+        return DependencyIndex()
+
+    def read(self, stream):
+        self.index = DependencyIndex.from_json(stream)
+
+    def update(self, pkg_fullname):
+        self.index.update_package(pkg_fullname)
+
+    def write(self, stream):
+        self.index.to_json(stream)
+
+
+class SearchIndexer(Indexer):
+    """Lifecycle methods for a SearchIndex on a Repo."""
+    def _create(self):
+        return SearchIndex()
+
+    def read(self, stream):
+        self.index = SearchIndex.from_json(stream)
+
+    def update(self, pkg_fullname):
+        self.index.update_package(pkg_fullname)
+
+    def write(self, stream):
+        self.index.to_json(stream)
+
+
 class RepoIndex(object):
     """Container class that manages a set of Indexers for a Repo.
 
@@ -387,37 +693,52 @@ def __getitem__(self, name):
             raise KeyError('no such index: %s' % name)
 
         if name not in self.indexes:
-            self._build_all_indexes()
+            if self._is_up_to_date(name):
+                self.indexes[name] = self._build_index(name, indexer)
+            else:
+                self._build_all_indexes()
 
         return self.indexes[name]
 
     def _build_all_indexes(self):
-        """Build all the indexes at once.
+        """Build all the out-of-date indexes at once.
 
-        We regenerate *all* indexes whenever *any* index needs an update,
-        because the main bottleneck here is loading all the packages.  It
-        can take tens of seconds to regenerate sequentially, and we'd
-        rather only pay that cost once rather than on several
-        invocations.
+        We regenerate *all* stale indexes whenever *any* index needs an
+        update, because the main bottleneck here is loading all the
+        packages.  It can take tens of seconds to regenerate sequentially,
+        and we'd rather only pay that cost once rather than on several
+        invocations.  Indexes that are up to date are only read when they
+        are used.
 
         """
         for name, indexer in self.indexers.items():
-            self.indexes[name] = self._build_index(name, indexer)
+            if name not in self.indexes and not self._is_up_to_date(name):
+                self.indexes[name] = self._build_index(name, indexer)
+
+    def _cache_filename(self, name):
+        # Filename of the index cache (we assume they're all json)
+        return '{0}/{1}-index.json'.format(name, self.namespace)
+
+    def _packages_to_update(self, name):
+        """Names of the packages modified since the index was written."""
+        index_mtime = spack.caches.misc_cache.mtime(self._cache_filename(name))
+        return [
+            x for x, sinfo in self.checker.items()
+            if sinfo.st_mtime > index_mtime
+        ]
+
+    def _is_up_to_date(self, name):
+        """Whether the index exists and no package changed since."""
+        return (spack.caches.misc_cache.init_entry(self._cache_filename(name))
+                and not self._packages_to_update(name))
 
     def _build_index(self, name, indexer):
         """Determine which packages need an update, and update indexes."""
-
-        # Filename of the provider index cache (we assume they're all json)
-        cache_filename = '{0}/{1}-index.json'.format(name, self.namespace)
+        cache_filename = self._cache_filename(name)
 
         # Compute which packages needs to be updated in the cache
         misc_cache = spack.caches.misc_cache
-        index_mtime = misc_cache.mtime(cache_filename)
-
-        needs_update = [
-            x for x, sinfo in self.checker.items()
-            if sinfo.st_mtime > index_mtime
-        ]
+        needs_update = self._packages_to_update(name)
 
         index_existed = misc_cache.init_entry(cache_filename)
         if index_existed and not needs_update:
@@ -457,6 +778,8 @@ def __init__(self, *repos):
         self._all_package_names = None
         self._provider_index = None
         self._patch_index = None
+        self._dependency_index = None
+        self._search_index = None
 
         # Add each repo to this path.
         for repo in repos:
@@ -565,6 +888,30 @@ def patch_index(self):
 
         return self._patch_index
 
+    @property
+    def dependency_index(self):
+        """Merged DependencyIndex from all Repos in the RepoPath."""
+        if self._dependency_index is None:
+            self._dependency_index = DependencyIndex()
+            for repo in reversed(self.repos):
+                # leave out packages that were removed from the repo
+                self._dependency_index.merge(
+                    repo.dependency_index, repo._pkg_checker)
+
+        return self._dependency_index
+
+    @property
+    def search_index(self):
+        """Merged SearchIndex from all Repos in the RepoPath."""
+        if self._search_index is None:
+            self._search_index = SearchIndex()
+            for repo in reversed(self.repos):
+                # leave out packages that were removed from the repo
+                self._search_index.merge(
+                    repo.search_index, repo._pkg_checker)
+
+        return self._search_index
+
     @autospec
     def providers_for(self, vpkg_spec):
         providers = self.provider_index.providers_for(vpkg_spec)
@@ -952,6 +1299,9 @@ def index(self):
             self._repo_index.add_indexer('providers', ProviderIndexer())
             self._repo_index.add_indexer('tags', TagIndexer())
             self._repo_index.add_indexer('patches', PatchIndexer())
+            self._repo_index.add_indexer(
+                'dependencies', DependencyIndexer())
+            self._repo_index.add_indexer('search', SearchIndexer())
         return self._repo_index
 
     @property
@@ -969,6 +1319,16 @@ def patch_index(self):
         """Index of patches and packages they're defined on."""
         return self.index['patches']
 
+    @property
+    def dependency_index(self):
+        """Index of the dependencies and dependents of each package."""
+        return self.index['dependencies']
+
+    @property
+    def search_index(self):
+        """Index of the descriptions and metadata of each package."""
+        return self.index['search']
+
     @autospec
     def providers_for(self, vpkg_spec):
         providers = self.provider_index.providers_for(vpkg_spec)
@@ -57,12 +57,16 @@
             'source_cache': {'type': 'string'},
             'misc_cache': {'type': 'string'},
             'connect_timeout': {'type': 'integer', 'minimum': 0},
+            'url_fetch_connections': {'type': 'integer', 'minimum': 1},
             'verify_ssl': {'type': 'boolean'},
             'suppress_gpg_warnings': {'type': 'boolean'},
+            'buildcache_compression': {
+                'type': 'string', 'enum': ['gzip', 'bzip2', 'zstd']},
             'install_missing_compilers': {'type': 'boolean'},
             'debug': {'type': 'boolean'},
             'checksum': {'type': 'boolean'},
             'locks': {'type': 'boolean'},
+            'lock_wait': {'type': 'string', 'enum': ['poll', 'block']},
             'dirty': {'type': 'boolean'},
             'build_language': {'type': 'string'},
             'build_jobs': {'type': 'integer', 'minimum': 1},
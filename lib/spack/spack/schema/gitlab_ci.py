@@ -96,6 +96,10 @@
                     },
                 },
             },
+            'balance-stages': {
+                'type': 'boolean',
+                'default': False,
+            },
             'enable-artifacts-buildcache': {
                 'type': 'boolean',
                 'default': False,
@@ -194,6 +194,256 @@ def __call__(self, match):
     return clr.colorize(re.sub(_separators, insert_color(), str(spec)) + '@.')
 
 
+class _FormatField(object):
+    """An ``{attribute}`` of a format string, resolved once by
+    ``_compile_format()`` so that ``Spec.format()`` does not parse it again
+    for every spec it formats."""
+    __slots__ = ('dep', 'attribute', 'sig', 'parts', 'color',
+                 'special', 'hash_length')
+
+    def __init__(self, attribute):
+        self.dep = None
+        if attribute.startswith('^'):
+            attribute = attribute[1:]
+            self.dep, attribute = attribute.split('.', 1)
+
+        if attribute == '':
+            raise SpecFormatStringError(
+                'Format string attributes must be non-empty')
+        attribute = attribute.lower()
+
+        sig = ''
+        if attribute[0] in '@%/':
+            # color sigils that are inside braces
+            sig = attribute[0]
+            attribute = attribute[1:]
+        elif attribute.startswith('arch='):
+            sig = ' arch='  # include space as separator
+            attribute = attribute[5:]
+
+        parts = attribute.split('.')
+        assert parts
+
+        # check that the sigil is valid for the attribute.
+        if sig == '@' and parts[-1] not in ('versions', 'version'):
+            raise SpecFormatSigilError(sig, 'versions', attribute)
+        elif sig == '%' and attribute not in ('compiler', 'compiler.name'):
+            raise SpecFormatSigilError(sig, 'compilers', attribute)
+        elif sig == '/' and not re.match(r'hash(:\d+)?$', attribute):
+            raise SpecFormatSigilError(sig, 'DAG hashes', attribute)
+        elif sig == ' arch=' and attribute not in ('architecture', 'arch'):
+            raise SpecFormatSigilError(sig, 'the architecture', attribute)
+
+        self.attribute = attribute
+        self.sig = sig
+
+        # Special cases for non-spec attributes and hashes.
+        # These must be the only non-dep component of the format attribute
+        self.special = None
+        self.hash_length = None
+        if attribute in ('spack_root', 'spack_install'):
+            self.special = attribute
+        elif re.match(r'hash(:\d)?', attribute):
+            self.special = 'hash'
+            if ':' in attribute:
+                _, length = attribute.split(':')
+                self.hash_length = int(length)
+
+        # Each part with the attribute it aliases on objects other than
+        # variant maps. Version requires a concrete spec, versions does
+        # not: when concrete, they print the same thing.
+        aliases = {'arch': 'architecture', 'version': 'versions'}
+        self.parts = [(p, aliases.get(p, p)) for p in parts]
+
+        # Set color codes for various attributes
+        self.color = None
+        if self.special == 'hash':
+            self.color = '#'
+        elif 'variants' in parts:
+            self.color = '+'
+        elif 'architecture' in parts:
+            self.color = '='
+        elif 'compiler' in parts or 'compiler_flags' in parts:
+            self.color = '%'
+        elif 'version' in parts:
+            self.color = '@'
+
+    def expand(self, spec, transform):
+        """Return the text of this field for a spec, or None if there is
+        nothing to print."""
+        morph = transform.get(self.attribute) if transform else None
+        special = self.special
+        if special is not None:
+            if special == 'hash':
+                text = spec.dag_hash(self.hash_length)
+            elif special == 'spack_root':
+                text = spack.paths.spack_root
+            else:
+                text = spack.store.layout.root
+            if morph:
+                text = morph(spec, text)
+            return self.sig + text
+
+        current = spec if self.dep is None else spec[self.dep]
+        for idx, (part, alias) in enumerate(self.parts):
+            if not part:
+                raise SpecFormatStringError(
+                    'Format string attributes must be non-empty'
+                )
+            if part.startswith('_'):
+                raise SpecFormatStringError(
+                    'Attempted to format private attribute'
+                )
+            if isinstance(current, vt.VariantMap):
+                # subscript instead of getattr for variant names
+                current = current[part]
+            else:
+                try:
+                    current = getattr(current, alias)
+                except AttributeError:
+                    parent = '.'.join(p for p, _ in self.parts[:idx])
+                    m = 'Attempted to format attribute %s.' % self.attribute
+                    m += 'Spec.%s has no attribute %s' % (parent, alias)
+                    raise SpecFormatStringError(m)
+                if isinstance(current, vn.VersionList):
+                    if current == _any_version:
+                        # We don't print empty version lists
+                        return None
+
+            if callable(current):
+                raise SpecFormatStringError(
+                    'Attempted to format callable object'
+                )
+            if not current:
+                # We're not printing anything
+                return None
+
+        text = str(current)
+        if morph:
+            text = morph(spec, text)
+        return self.sig + text
+
+
+#: Compiled format strings, by string (see ``_compile_format()``)
+_format_templates = lang.LRUCache(256, name='format strings')
+
+
+def _compile_format(format_string):
+    """Split a format string into literal strings and ``_FormatField``
+    objects, or return None if it uses the deprecated ``$`` syntax.
+
+    Compiled format strings are cached, since the same few are used to
+    format every spec in ``spack find``, module files, views and
+    directory layouts.
+    """
+    template = _format_templates.get(format_string)
+    if template is not None:
+        return template[0]
+
+    # If we have an unescaped $ sigil, use the deprecated format strings
+    if re.search(r'[^\\]*\$', format_string):
+        _format_templates.put(format_string, (None,))
+        return None
+
+    template = []
+    literal = []
+    attribute = ''
+    in_attribute = False
+    escape = False
+
+    def flush():
+        if literal:
+            template.append(''.join(literal))
+            del literal[:]
+
+    for c in format_string:
+        if escape:
+            literal.append(c)
+            escape = False
+        elif c == '\\':
+            escape = True
+        elif in_attribute:
+            if c == '}':
+                flush()
+                template.append(_FormatField(attribute))
+                attribute = ''
+                in_attribute = False
+            else:
+                attribute += c
+        else:
+            if c == '}':
+                raise SpecFormatStringError(
+                    'Encountered closing } before opening {'
+                )
+            elif c == '{':
+                in_attribute = True
+            else:
+                literal.append(c)
+    if in_attribute:
+        raise SpecFormatStringError(
+            'Format string terminated while reading attribute.'
+            'Missing terminating }.'
+        )
+    flush()
+
+    _format_templates.put(format_string, (template,))
+    return template
+
+
+def format_specs(specs, format_string=default_format, **kwargs):
+    """Format many specs with the same format string.
+
+    This is equivalent to ``[s.format(format_string, **kwargs) for s in
+    specs]``, but looks up the compiled format string only once.
+
+    Args:
+        specs (list of Spec): specs to format
+        format_string (str): format string, as for ``Spec.format()``
+
+    Keyword Args:
+        color (bool): True if returned strings are colored
+        transform (dict): as for ``Spec.format()``
+
+    Returns:
+        (list of str): the formatted specs, in the same order as ``specs``
+    """
+    template = _compile_format(format_string)
+    if template is None:
+        return [s.old_format(format_string, **kwargs) for s in specs]
+
+    color = kwargs.get('color', False)
+    if color is None:
+        color = clr.get_color_when()
+    transform = kwargs.get('transform')
+
+    # Resolve the texts of literals and the coloring of fields once
+    pieces = []
+    for item in template:
+        if isinstance(item, _FormatField):
+            if color and item.color is not None:
+                pieces.append((item, color_formats[item.color], '@.'))
+            else:
+                pieces.append((item, '', ''))
+        else:
+            pieces.append((None, item, None))
+
+    result = []
+    for spec in specs:
+        out = []
+        for field, text, end in pieces:
+            if field is None:
+                out.append(text)
+                continue
+            s = field.expand(spec, transform)
+            if s is None:
+                continue
+            if color:
+                s = clr.colorize(text + clr.cescape(s) + end, color=True)
+            out.append(s)
+        result.append(''.join(out))
+    return result
+
+
 @lang.key_ordering
 class ArchSpec(object):
     def __init__(self, spec_or_platform_tuple=(None, None, None)):
@@ -679,8 +929,7 @@ def valid_compiler_flags():
 
     def copy(self):
         clone = FlagMap(None)
-        for name, value in self.items():
-            clone[name] = value
+        clone.dict.update(self.dict)
         return clone
 
     def _cmp_key(self):
@@ -699,6 +948,29 @@ class DependencyMap(lang.HashableMap):
     """Each spec has a DependencyMap containing specs for its dependencies.
        The DependencyMap is keyed by name. """
 
+    def __init__(self):
+        super(DependencyMap, self).__init__()
+        self._sorted_edges = None
+
+    def __setitem__(self, key, value):
+        self._sorted_edges = None
+        super(DependencyMap, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._sorted_edges = None
+        super(DependencyMap, self).__delitem__(key)
+
+    def sorted_edges(self):
+        """The ``DependencySpec`` objects in this map, sorted by name.
+
+        The list is computed on first use and kept until the map is
+        modified, so traversals of a DAG that does not change, e.g. a
+        concrete one, don't sort the same edges over and over.
+        """
+        if self._sorted_edges is None:
+            self._sorted_edges = [self.dict[k] for k in sorted(self.dict)]
+        return self._sorted_edges
+
     def __str__(self):
         return "{deps: %s}" % ', '.join(str(d) for d in sorted(self.values()))
 
@@ -984,7 +1256,7 @@ def __init__(self, spec_like=None,
 
         # init an empty spec that matches anything.
         self.name = None
-        self.versions = vn.VersionList(':')
+        self.versions = _any_version.copy()
         self.variants = vt.VariantMap(self)
         self.architecture = None
         self.compiler = None
@@ -1016,7 +1288,11 @@ def __init__(self, spec_like=None,
         self.extra_attributes = None
 
         if isinstance(spec_like, six.string_types):
-            spec_list = SpecParser(self).parse(spec_like)
+            if (normal or concrete or external_path or external_modules or
+                    full_hash):
+                spec_list = SpecParser(self).parse(spec_like)
+            else:
+                spec_list = _parse_with_cache(spec_like, self)
             if len(spec_list) > 1:
                 raise ValueError("More than one spec in string: " + spec_like)
             if len(spec_list) < 1:
@@ -1212,22 +1488,10 @@ def concrete(self):
         return self._concrete
 
     def traverse(self, **kwargs):
-        direction = kwargs.get('direction', 'children')
-        depth = kwargs.get('depth', False)
-
-        get_spec = lambda s: s.spec
-        if direction == 'parents':
-            get_spec = lambda s: s.parent
-
-        if depth:
-            for d, dspec in self.traverse_edges(**kwargs):
-                yield d, get_spec(dspec)
-        else:
-            for dspec in self.traverse_edges(**kwargs):
-                yield get_spec(dspec)
+        for item in self._traverse(False, **kwargs):
+            yield item
 
-    def traverse_edges(self, visited=None, d=0, deptype='all',
-                       dep_spec=None, **kwargs):
+    def traverse_edges(self, **kwargs):
         """Generic traversal of the DAG represented by this spec.
            This will yield each node in the spec.  Options:
 
@@ -1268,6 +1532,25 @@ def traverse_edges(self, visited=None, d=0, deptype='all',
                If 'children', does a traversal of this spec's children.  If
                'parents', traverses upwards in the DAG towards the root.
 
+        """
+        for item in self._traverse(True, **kwargs):
+            yield item
+
+    def _traverse(self, edges, visited=None, d=0, deptype='all',
+                  dep_spec=None, **kwargs):
+        """Iterative engine behind ``traverse()`` and ``traverse_edges()``.
+
+        Walks the DAG with an explicit stack of frames instead of one
+        nested generator per node, so the cost of yielding a node does not
+        grow with its depth and deep DAGs cannot hit the recursion limit.
+        Children are read from ``DependencyMap.sorted_edges()``, which is
+        computed once per map and kept until the map changes.  As in a
+        recursive traversal, the successors of a node are only looked up
+        after it has been yielded in pre-order, so callers may still modify
+        the DAG below the node they are looking at.
+
+        If ``edges`` is True this yields ``DependencySpec`` objects, as
+        ``traverse_edges()`` does, otherwise the specs themselves.
         """
         # get initial values for kwargs
         depth = kwargs.get('depth', False)
@@ -1291,53 +1574,73 @@ def validate(name, val, allowed_values):
 
         if visited is None:
             visited = set()
-        key = key_fun(self)
-
-        # Node traversal does not yield visited nodes.
-        if key in visited and cover == 'nodes':
-            return
 
-        def return_val(dspec):
-            if not dspec:
-                # make a fake dspec for the root.
-                if direction == 'parents':
-                    dspec = DependencySpec(self, None, ())
-                else:
-                    dspec = DependencySpec(None, self, ())
-            return (d, dspec) if depth else dspec
-
-        yield_me = yield_root or d > 0
-
-        # Preorder traversal yields before successors
-        if yield_me and order == 'pre':
-            yield return_val(dep_spec)
-
-        # Edge traversal yields but skips children of visited nodes
-        if not (key in visited and cover == 'edges'):
-            visited.add(key)
-
-            # This code determines direction and yields the children/parents
-            if direction == 'children':
-                where = self._dependencies
-                succ = lambda dspec: dspec.spec
-            elif direction == 'parents':
-                where = self._dependents
-                succ = lambda dspec: dspec.parent
-            else:
-                raise ValueError('Invalid traversal direction: %s' % direction)
+        children = direction == 'children'
+        pre, post = order == 'pre', order == 'post'
+        skip_nodes, skip_edges = cover == 'nodes', cover == 'edges'
+        all_deptypes = deptype == dp.all_deptypes
+
+        def successors(node):
+            where = node._dependencies if children else node._dependents
+            dspecs = where.sorted_edges()
+            if all_deptypes:
+                return dspecs
+            return [dspec for dspec in dspecs
+                    if not dspec.deptypes or
+                    any(t in deptype for t in dspec.deptypes)]
+
+        def return_val(node, d, dspec):
+            if edges:
+                if not dspec:
+                    # make a fake dspec for the root.
+                    if children:
+                        dspec = DependencySpec(None, node, ())
+                    else:
+                        dspec = DependencySpec(node, None, ())
+                return (d, dspec) if depth else dspec
+            return (d, node) if depth else node
+
+        # Each frame is [node, depth, dspec, yield_me, successors, index]
+        stack = []
+        node = self
+        while True:
+            if node is not None:
+                key = key_fun(node)
+
+                # Node traversal does not yield visited nodes.
+                if not (skip_nodes and key in visited):
+                    yield_me = yield_root or d > 0
+
+                    # Preorder traversal yields before successors
+                    if yield_me and pre:
+                        yield return_val(node, d, dep_spec)
+
+                    # Edge traversal yields but skips children of visited
+                    # nodes
+                    if skip_edges and key in visited:
+                        succ = ()
+                    else:
+                        visited.add(key)
+                        succ = successors(node)
+                    stack.append([node, d, dep_spec, yield_me, succ, 0])
 
-            for name, dspec in sorted(where.items()):
-                dt = dspec.deptypes
-                if dt and not any(d in deptype for d in dt):
-                    continue
+            if not stack:
+                return
 
-                for child in succ(dspec).traverse_edges(
-                        visited, d + 1, deptype, dspec, **kwargs):
-                    yield child
+            frame = stack[-1]
+            succ, i = frame[4], frame[5]
+            if i < len(succ):
+                frame[5] = i + 1
+                dep_spec = succ[i]
+                node = dep_spec.spec if children else dep_spec.parent
+                d = frame[1] + 1
+                continue
 
-        # Postorder traversal yields after successors
-        if yield_me and order == 'post':
-            yield return_val(dep_spec)
+            # Postorder traversal yields after successors
+            stack.pop()
+            node = None
+            if frame[3] and post:
+                yield return_val(frame[0], frame[1], frame[2])
 
     @property
     def short_spec(self):
@@ -2350,6 +2653,10 @@ def _mark_concrete(self, value=True):
         for s in self.traverse():
             if (not value) and s.concrete and s.package.installed:
                 continue
+            if (not value) and s._concrete:
+                # Stop sharing node attributes with other copies of
+                # this spec before they can be modified.
+                s._copy_node_attributes(s)
             s._normal = value
             s._concrete = value
 
@@ -3089,28 +3396,25 @@ def _dup(self, other, deps=True, cleardeps=True, caches=None):
 
         self._package = None
 
-        # Local node attributes get copied first.
+        # Local node attributes get copied first. Concrete specs are never
+        # modified in place, so a copy of one shares its versions,
+        # architecture, compiler and variant values instead of duplicating
+        # them. _mark_concrete(False) gives a spec its own copies before
+        # it can be modified again.
         self.name = other.name
-        self.versions = other.versions.copy()
-        self.architecture = other.architecture.copy() if other.architecture \
-            else None
-        self.compiler = other.compiler.copy() if other.compiler else None
+        if other._concrete:
+            self.versions = other.versions
+            self.architecture = other.architecture
+            self.compiler = other.compiler
+            self.variants = other.variants.copy(shallow=True)
+            self.variants.spec = self
+        else:
+            self._copy_node_attributes(other)
         if cleardeps:
             self._dependents = DependencyMap()
             self._dependencies = DependencyMap()
         self.compiler_flags = other.compiler_flags.copy()
         self.compiler_flags.spec = self
-        self.variants = other.variants.copy()
-
-        # FIXME: we manage _patches_in_order_of_appearance specially here
-        # to keep it from leaking out of spec.py, but we should figure
-        # out how to handle it more elegantly in the Variant classes.
-        for k, v in other.variants.items():
-            patches = getattr(v, '_patches_in_order_of_appearance', None)
-            if patches:
-                self.variants[k]._patches_in_order_of_appearance = patches
-
-        self.variants.spec = self
         self.external_path = other.external_path
         self.external_modules = other.external_modules
         self.extra_attributes = other.extra_attributes
@@ -3148,7 +3452,30 @@ def _dup(self, other, deps=True, cleardeps=True, caches=None):
 
         return changed
 
+    def _copy_node_attributes(self, other):
+        """Give self its own copies of the node attributes of other that
+        copies of concrete specs share (see ``_dup``)."""
+        self.versions = other.versions.copy()
+        self.architecture = other.architecture.copy() if other.architecture \
+            else None
+        self.compiler = other.compiler.copy() if other.compiler else None
+        variants = other.variants
+        self.variants = variants.copy()
+
+        # FIXME: we manage _patches_in_order_of_appearance specially here
+        # to keep it from leaking out of spec.py, but we should figure
+        # out how to handle it more elegantly in the Variant classes.
+        for k, v in variants.items():
+            patches = getattr(v, '_patches_in_order_of_appearance', None)
+            if patches:
+                self.variants[k]._patches_in_order_of_appearance = patches
+
+        self.variants.spec = self
+
     def _dup_deps(self, other, deptypes, caches):
+        if not other._dependencies:
+            return
+
         new_specs = {self.name: self}
         for dspec in other.traverse_edges(cover='edges',
                                           root=False):
@@ -3432,163 +3759,7 @@ def format(self, format_string=default_format, **kwargs):
                 that accepts a string and returns another one
 
         """
-        # If we have an unescaped $ sigil, use the deprecated format strings
-        if re.search(r'[^\\]*\$', format_string):
-            return self.old_format(format_string, **kwargs)
-
-        color = kwargs.get('color', False)
-        transform = kwargs.get('transform', {})
-
-        out = six.StringIO()
-
-        def write(s, c=None):
-            f = clr.cescape(s)
-            if c is not None:
-                f = color_formats[c] + f + '@.'
-            clr.cwrite(f, stream=out, color=color)
-
-        def write_attribute(spec, attribute, color):
-            current = spec
-            if attribute.startswith('^'):
-                attribute = attribute[1:]
-                dep, attribute = attribute.split('.', 1)
-                current = self[dep]
-
-            if attribute == '':
-                raise SpecFormatStringError(
-                    'Format string attributes must be non-empty')
-            attribute = attribute.lower()
-
-            sig = ''
-            if attribute[0] in '@%/':
-                # color sigils that are inside braces
-                sig = attribute[0]
-                attribute = attribute[1:]
-            elif attribute.startswith('arch='):
-                sig = ' arch='  # include space as separator
-                attribute = attribute[5:]
-
-            parts = attribute.split('.')
-            assert parts
-
-            # check that the sigil is valid for the attribute.
-            if sig == '@' and parts[-1] not in ('versions', 'version'):
-                raise SpecFormatSigilError(sig, 'versions', attribute)
-            elif sig == '%' and attribute not in ('compiler', 'compiler.name'):
-                raise SpecFormatSigilError(sig, 'compilers', attribute)
-            elif sig == '/' and not re.match(r'hash(:\d+)?$', attribute):
-                raise SpecFormatSigilError(sig, 'DAG hashes', attribute)
-            elif sig == ' arch=' and attribute not in ('architecture', 'arch'):
-                raise SpecFormatSigilError(sig, 'the architecture', attribute)
-
-            # find the morph function for our attribute
-            morph = transform.get(attribute, lambda s, x: x)
-
-            # Special cases for non-spec attributes and hashes.
-            # These must be the only non-dep component of the format attribute
-            if attribute == 'spack_root':
-                write(morph(spec, spack.paths.spack_root))
-                return
-            elif attribute == 'spack_install':
-                write(morph(spec, spack.store.layout.root))
-                return
-            elif re.match(r'hash(:\d)?', attribute):
-                col = '#'
-                if ':' in attribute:
-                    _, length = attribute.split(':')
-                    write(sig + morph(spec, spec.dag_hash(int(length))), col)
-                else:
-                    write(sig + morph(spec, spec.dag_hash()), col)
-                return
-
-            # Iterate over components using getattr to get next element
-            for idx, part in enumerate(parts):
-                if not part:
-                    raise SpecFormatStringError(
-                        'Format string attributes must be non-empty'
-                    )
-                if part.startswith('_'):
-                    raise SpecFormatStringError(
-                        'Attempted to format private attribute'
-                    )
-                else:
-                    if isinstance(current, vt.VariantMap):
-                        # subscript instead of getattr for variant names
-                        current = current[part]
-                    else:
-                        # aliases
-                        if part == 'arch':
-                            part = 'architecture'
-                        elif part == 'version':
-                            # Version requires concrete spec, versions does not
-                            # when concrete, they print the same thing
-                            part = 'versions'
-                        try:
-                            current = getattr(current, part)
-                        except AttributeError:
-                            parent = '.'.join(parts[:idx])
-                            m = 'Attempted to format attribute %s.' % attribute
-                            m += 'Spec.%s has no attribute %s' % (parent, part)
-                            raise SpecFormatStringError(m)
-                        if isinstance(current, vn.VersionList):
-                            if current == _any_version:
-                                # We don't print empty version lists
-                                return
-
-                    if callable(current):
-                        raise SpecFormatStringError(
-                            'Attempted to format callable object'
-                        )
-                    if not current:
-                        # We're not printing anything
-                        return
-
-            # Set color codes for various attributes
-            col = None
-            if 'variants' in parts:
-                col = '+'
-            elif 'architecture' in parts:
-                col = '='
-            elif 'compiler' in parts or 'compiler_flags' in parts:
-                col = '%'
-            elif 'version' in parts:
-                col = '@'
-
-            # Finally, write the ouptut
-            write(sig + morph(spec, str(current)), col)
-
-        attribute = ''
-        in_attribute = False
-        escape = False
-
-        for c in format_string:
-            if escape:
-                out.write(c)
-                escape = False
-            elif c == '\\':
-                escape = True
-            elif in_attribute:
-                if c == '}':
-                    write_attribute(self, attribute, color)
-                    attribute = ''
-                    in_attribute = False
-                else:
-                    attribute += c
-            else:
-                if c == '}':
-                    raise SpecFormatStringError(
-                        'Encountered closing } before opening {'
-                    )
-                elif c == '{':
-                    in_attribute = True
-                else:
-                    out.write(c)
-        if in_attribute:
-            raise SpecFormatStringError(
-                'Format string terminated while reading attribute.'
-                'Missing terminating }.'
-            )
-        return out.getvalue()
+        return format_specs([self], format_string, **kwargs)[0]
 
     def old_format(self, format_string='$_$@$%@+$+$=', **kwargs):
         """
@@ -4016,6 +4187,9 @@ def __init__(self):
 # Lexer is always the same for every parser.
 _lexer = SpecLexer()
 
+#: Abstract specs parsed from strings, by string
+_parsed_specs = lang.LRUCache(4096, name='parsed specs')
+
 
 class SpecParser(spack.parse.Parser):
 
@@ -4321,7 +4495,35 @@ def parse(string):
     """Returns a list of specs from an input string.
        For creating one spec, see Spec() constructor.
     """
-    return SpecParser().parse(string)
+    return _parse_with_cache(string)
+
+
+def _parse_with_cache(string, initial_spec=None):
+    """Parse a string into a list of specs, like ``SpecParser.parse()``.
+
+    The same strings are parsed over and over, e.g. the ``when=`` specs
+    of directives and specs in configuration files, so parsed specs are
+    kept in a bounded cache, and copies of them are returned.  Strings
+    with hashes or spec files are not cached, because what they parse to
+    depends on the database and the filesystem.
+    """
+    if '/' in string:
+        return SpecParser(initial_spec).parse(string)
+
+    cached = _parsed_specs.get(string)
+    if cached is None:
+        specs = SpecParser(initial_spec).parse(string)
+        _parsed_specs.put(string, [s.copy() for s in specs])
+        return specs
+
+    if not cached:
+        return []
+
+    specs = [s.copy() for s in cached[1:]]
+    if initial_spec is None:
+        initial_spec = Spec.__new__(Spec)
+    initial_spec._dup(cached[0])
+    return [initial_spec] + specs
 
 
 def save_dependency_spec_yamls(
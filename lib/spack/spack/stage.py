@@ -832,9 +832,10 @@ def get_checksums_for_versions(
                     # no need to run it every time
                     first_stage_function(stage, url)
 
-                # Checksum the archive and add it to the list
-                version_hashes.append((version, spack.util.crypto.checksum(
-                    hashlib.sha256, stage.archive_file)))
+                # Checksum the archive and add it to the list. The archive
+                # was usually already checksummed while it was downloaded.
+                version_hashes.append(
+                    (version, stage.fetcher.archive_checksum('sha256')))
                 i += 1
         except FailedDownloadError:
             errors.append('Failed to fetch {0}'.format(url))
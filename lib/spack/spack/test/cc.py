@@ -10,6 +10,7 @@
 import os
 import pytest
 
+from spack.build_environment import wrapper_cache_contents
 from spack.paths import build_env_path
 from spack.util.environment import system_dirs, set_env
 from spack.util.executable import Executable
@@ -619,3 +620,50 @@ def test_filter_enable_new_dtags(wrapper_flags):
         result = cc(*(test_args + ['-Wl,--enable-new-dtags']), output=str)
         result = result.strip().split('\n')
         assert '-Wl,--enable-new-dtags' not in result
+
+
+def dump_args(cc, args):
+    """Return the command line cc produces when called with args."""
+    with set_env(SPACK_TEST_COMMAND='dump-args'):
+        return cc(*args, output=str).strip().split('\n')
+
+
+@pytest.fixture()
+def wrapper_dirs():
+    with set_env(SPACK_INCLUDE_DIRS='xinc:yinc',
+                 SPACK_RPATH_DIRS='xlib::/usr/lib:',
+                 SPACK_LINK_DIRS='xlib:ylib',
+                 SPACK_COMPILER_EXTRA_RPATHS='extra',
+                 SPACK_COMPILER_IMPLICIT_RPATHS='implicit',
+                 SPACK_LDFLAGS='  -L  foo '):
+        yield
+
+
+@pytest.mark.parametrize('wrapper', [cc, cxx, fc, ld, cpp])
+def test_wrapper_cache(tmpdir, wrapper_flags, wrapper_dirs, wrapper):
+    """The precomputed argument lists give the same command line."""
+    expected = dump_args(wrapper, test_args)
+
+    cache = tmpdir.join('spack-cc-cache.sh')
+    cache.write(wrapper_cache_contents(os.environ))
+    with set_env(SPACK_CC_CACHE_FILE=str(cache)):
+        assert dump_args(wrapper, test_args) == expected
+
+        # check that the cached lists are actually the ones being used
+        cache.write(cache.read().replace(
+            'spack_include_dirs=(xinc', 'spack_include_dirs=(cached-inc'))
+        result = dump_args(wrapper, test_args)
+        if wrapper is not ld:
+            assert '-Icached-inc' in result
+
+
+def test_wrapper_cache_out_of_date(tmpdir, wrapper_flags, wrapper_dirs):
+    """The cached lists are ignored once the environment changes."""
+    cache = tmpdir.join('spack-cc-cache.sh')
+    cache.write(wrapper_cache_contents(os.environ))
+
+    with set_env(SPACK_CC_CACHE_FILE=str(cache),
+                 SPACK_INCLUDE_DIRS='zinc'):
+        result = dump_args(cc, test_args)
+        assert '-Izinc' in result
+        assert '-Ixinc' not in result
@@ -179,6 +179,57 @@ def test_read_write_cdash_ids(config, tmp_scope, tmpdir, mock_packages):
     assert(str(read_cdashid) == orig_cdashid)
 
 
+@pytest.mark.parametrize('balance,expected', [
+    (False, [set(['a', 'b', 'c', 'd', 'e', 'f', 'x']), set(['y']),
+             set(['z'])]),
+    (True, [set(['a', 'b', 'x']), set(['d', 'f', 'y']),
+            set(['c', 'e', 'z'])]),
+])
+def test_compute_stages(balance, expected):
+    """Jobs off the critical path x -> y -> z can be spread evenly."""
+    deps = {'y': set(['x']), 'z': set(['y', 'x'])}
+    labels = ['a', 'b', 'c', 'd', 'e', 'f', 'x', 'y', 'z']
+    assert ci.compute_stages(labels, deps, balance) == expected
+    assert ci.compute_stages([], {}, balance) == []
+
+
+def test_compute_stages_cycle():
+    with pytest.raises(ci.SpackError, match='circular'):
+        ci.compute_stages(['a', 'b'], {'a': set(['b']), 'b': set(['a'])})
+
+
+def test_ci_opt_fingerprint():
+    a = {'x': [1, 'b', {'y': None}], 'z': True}
+    b = {'z': True, 'x': [1, 'b', {'y': None}]}
+    assert ci_opt.fingerprint(a) == ci_opt.fingerprint(b)
+    assert ci_opt.fingerprint([1]) != ci_opt.fingerprint(['1'])
+    assert ci_opt.fingerprint([1]) != ci_opt.fingerprint([True])
+    assert ci_opt.fingerprint({'x': [1]}) != ci_opt.fingerprint({'x': 1})
+
+
+def test_ci_opt_common_subobject():
+    """Only the jobs the prototype is factored out of are copied."""
+    yaml = {
+        'a': {'tags': ['t'], 'script': ['a']},
+        'b': {'tags': ['t'], 'script': ['b']},
+        'c': {'tags': ['u'], 'script': ['c']},
+    }
+    new_yaml, key = ci_opt.common_subobject(yaml, {'tags': ['t']})
+
+    assert key == '.c0'
+    assert new_yaml == {
+        '.c0': {'tags': ['t']},
+        'a': {'script': ['a'], 'extends': '.c0'},
+        'b': {'script': ['b'], 'extends': '.c0'},
+        'c': {'tags': ['u'], 'script': ['c']},
+    }
+    assert new_yaml['c'] is yaml['c']
+    assert yaml['a'] == {'tags': ['t'], 'script': ['a']}
+
+    # Jobs this small are not worth factoring
+    assert ci_opt.document_size(new_yaml) > ci_opt.document_size(yaml)
+
+
 def test_ci_workarounds():
     fake_root_spec = 'x' * 544
     fake_spack_ref = 'x' * 40
@@ -10,6 +10,8 @@
 from jsonschema import validate
 
 import spack
+import spack.binary_distribution
+import spack.caches
 import spack.ci as ci
 import spack.config
 import spack.environment as ev
@@ -22,6 +24,7 @@
 from spack.spec import Spec
 from spack.util.mock_package import MockPackageMultiRepo
 import spack.util.executable as exe
+import spack.util.file_cache
 import spack.util.spack_yaml as syaml
 import spack.util.gpg
 
@@ -446,6 +449,98 @@ def test_ci_generate_pkg_with_deps(tmpdir, mutable_mock_env_path,
             assert('dependency-install' in found)
 
 
+def test_ci_generate_reuses_staged_jobs(tmpdir, mutable_mock_env_path,
+                                        env_deactivate, install_mockery,
+                                        mock_packages, monkeypatch):
+    """Generating the pipeline again reuses the concrete specs and the
+    staged jobs."""
+    monkeypatch.setattr(spack.caches, 'misc_cache', spack.util.file_cache.
+                        FileCache(str(tmpdir.join('cache'))))
+    filename = str(tmpdir.join('spack.yaml'))
+    with open(filename, 'w') as f:
+        f.write("""\
+spack:
+  specs:
+    - flatten-deps
+  mirrors:
+    some-mirror: https://my.fake.mirror
+  gitlab-ci:
+    mappings:
+      - match:
+          - arch=test-debian6-x86_64
+        runner-attributes:
+          tags:
+            - donotcare
+""")
+
+    with tmpdir.as_cwd():
+        env_cmd('create', 'test', './spack.yaml')
+        outputfile = str(tmpdir.join('.gitlab-ci.yml'))
+
+        with ev.read('test') as env:
+            ci_cmd('generate', '--output-file', outputfile)
+            assert os.path.exists(env.lock_path)
+        with open(outputfile) as f:
+            contents = f.read()
+
+        def _fail(*args, **kwargs):
+            raise AssertionError('specs should not be concretized or staged')
+
+        monkeypatch.setattr(ci, 'stage_spec_jobs', _fail)
+        monkeypatch.setattr(spack.spec.Spec, 'concretize', _fail)
+        with ev.read('test'):
+            ci_cmd('generate', '--output-file', outputfile)
+        with open(outputfile) as f:
+            assert f.read() == contents
+
+
+def test_ci_generate_prune_dag(tmpdir, mutable_mock_env_path,
+                               env_deactivate, install_mockery,
+                               mock_packages, monkeypatch):
+    """No jobs are generated for specs that are up to date on the mirror."""
+    checked = []
+
+    def _specs_needing_rebuild(specs, mirror_url, rebuild_on_errors=False):
+        checked.append(mirror_url)
+        return [s for s in specs if s.name != 'dependency-install']
+
+    monkeypatch.setattr(
+        spack.binary_distribution, 'specs_needing_rebuild',
+        _specs_needing_rebuild)
+    filename = str(tmpdir.join('spack.yaml'))
+    with open(filename, 'w') as f:
+        f.write("""\
+spack:
+  specs:
+    - flatten-deps
+  mirrors:
+    some-mirror: https://my.fake.mirror
+  gitlab-ci:
+    mappings:
+      - match:
+          - arch=test-debian6-x86_64
+        runner-attributes:
+          tags:
+            - donotcare
+""")
+
+    with tmpdir.as_cwd():
+        env_cmd('create', 'test', './spack.yaml')
+        outputfile = str(tmpdir.join('.gitlab-ci.yml'))
+
+        with ev.read('test'):
+            ci_cmd('generate', '--prune-dag', '--output-file', outputfile)
+
+        with open(outputfile) as f:
+            yaml_contents = syaml.load(f)
+
+    assert checked == ['https://my.fake.mirror']
+    jobs = [k for k in yaml_contents if k.startswith('(specs)')]
+    assert len(jobs) == 1
+    assert 'flatten-deps' in jobs[0]
+    assert yaml_contents[jobs[0]]['needs'] == []
+
+
 def test_ci_generate_for_pr_pipeline(tmpdir, mutable_mock_env_path,
                                      env_deactivate, install_mockery,
                                      mock_packages):
@@ -29,6 +29,18 @@ def test_packages_are_removed(config, mutable_database, capsys):
     assert 'Successfully uninstalled cmake' in output
 
 
+@pytest.mark.db
+def test_gc_dry_run(config, mutable_database, capsys):
+    s = spack.spec.Spec('simple-inheritance')
+    s.concretize()
+    s.package.do_install(fake=True, explicit=True)
+    with capsys.disabled():
+        output = gc('--dry-run')
+    assert 'cmake' in output
+    assert '1 packages' in output and 'reclaimable' in output
+    assert spack.spec.Spec('cmake').concretized().package.installed
+
+
 @pytest.mark.db
 def test_gc_with_environment(
         config, mutable_database, mutable_mock_env_path, capsys
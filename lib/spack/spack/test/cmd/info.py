@@ -7,6 +7,7 @@
 
 import pytest
 import spack.cmd.info
+import spack.repo
 
 from spack.main import SpackCommand
 
@@ -48,6 +49,17 @@ def test_it_just_runs(pkg):
     info(pkg)
 
 
+def test_info_suggests_packages(mock_packages, parser, capfd):
+    with pytest.raises(spack.repo.UnknownPackageError):
+        spack.cmd.info.info(parser, parser.parse_args(['mpilea']))
+
+    with pytest.raises(SystemExit):
+        spack.cmd.info.info(parser, parser.parse_args(['fake-boost']))
+    out, err = capfd.readouterr()
+    assert "Package 'fake-boost' not found" in err
+    assert 'Packages that mention "fake-boost": boost' in err
+
+
 @pytest.mark.parametrize('pkg_query', [
     'hdf5',
     'cloverleaf3d',
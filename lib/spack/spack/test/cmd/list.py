@@ -32,6 +32,16 @@ def test_list_search_description():
     assert 'expat' in output
 
 
+def test_list_search_description_patterns(mock_packages):
+    # the description of boost is "Fake boost package."
+    for pattern in ('fake boost', 'FAKE BOO', 'fa?e b*', 'boost package.',
+                    '[bf]ake'):
+        assert 'boost' in list('-d', pattern).split()
+
+    for pattern in ('fake  boost', 'fake boost packages', 'package.?'):
+        assert 'boost' not in list('-d', pattern).split()
+
+
 def test_list_tags():
     output = list('--tags', 'proxy-app')
     assert 'cloverleaf3d' in output
@@ -13,6 +13,8 @@
 
 import spack.main
 import spack.cmd.pkg
+import spack.store
+import spack.util.spack_json as sjson
 from spack.util.executable import which
 
 pytestmark = pytest.mark.skipif(not which('git'),
@@ -231,3 +233,40 @@ def test_pkg_fails_when_not_git_repo(monkeypatch):
     monkeypatch.setattr(spack.cmd, 'spack_is_git_repo', lambda: False)
     with pytest.raises(spack.main.SpackCommandError):
         pkg('added')
+
+
+def test_pkg_affected(mock_pkg_git_repo):
+    out = split(pkg('affected', 'HEAD^', 'HEAD'))
+    assert out == ['pkg-b', 'pkg-c', 'pkg-d']
+
+    result = sjson.load(pkg('affected', '--json', 'HEAD^', 'HEAD'))
+    assert result == {'added': ['pkg-d'],
+                      'removed': ['pkg-c'],
+                      'changed': ['pkg-b'],
+                      'affected': ['pkg-b', 'pkg-c', 'pkg-d']}
+
+
+def test_affected_packages(mock_packages):
+    # dependents are transitive, and dependents of a virtual are
+    # dependents of its providers
+    affected = spack.cmd.pkg.affected_packages(['libelf'])
+    assert set(['libelf', 'libdwarf', 'dyninst', 'callpath',
+                'mpileaks']) <= affected
+    assert 'mpich' not in affected
+
+    affected = spack.cmd.pkg.affected_packages(['mpich'])
+    assert set(['mpich', 'callpath', 'mpileaks']) <= affected
+    assert 'libelf' not in affected
+
+
+def test_pkg_affected_installed(database, monkeypatch):
+    monkeypatch.setattr(spack.cmd.pkg, 'diff_package_files',
+                        lambda rev1, rev2: (set(), set(), set(['libelf'])))
+
+    result = sjson.load(pkg('affected', '--installed', '--json'))
+    names = set(s['name'] for s in result['installed'])
+    assert names == set(['libelf', 'libdwarf', 'dyninst', 'callpath',
+                         'mpileaks'])
+    for s in result['installed']:
+        spec = spack.store.db.get_by_hash(s['hash'])[0]
+        assert s['spec'] == spec.format()
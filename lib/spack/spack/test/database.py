@@ -764,6 +764,40 @@ def test_query_unused_specs(mutable_database):
     assert unused[0].name == 'cmake'
 
 
+def test_remove_specs(mutable_database, monkeypatch):
+    specs = [mutable_database.get_record(s).spec
+             for s in ('callpath ^mpich', 'dyninst', 'mpileaks ^mpich')]
+
+    writes = []
+    write = mutable_database._write
+    monkeypatch.setattr(mutable_database, '_write',
+                        lambda *args: writes.append(args) or write(*args))
+    assert mutable_database.remove_specs(specs) == specs
+    assert len(writes) == 1
+
+    # Whatever the order, the result is the same as removing one by one
+    assert not mutable_database.query('callpath ^mpich', installed=any)
+    assert not mutable_database.query('mpileaks ^mpich', installed=any)
+    assert not mutable_database.query('dyninst')
+    assert mutable_database.get_record('dyninst', installed=any).ref_count
+
+
+def test_installed_dependents(mutable_database):
+    dyninst = mutable_database.get_record('dyninst').spec
+    mpich = mutable_database.get_record('mpich').spec
+    dependents = mutable_database.installed_dependents([dyninst, mpich])
+
+    names = sorted(s.name for s in dependents[dyninst.dag_hash()])
+    assert names == ['callpath'] * 3 + ['mpileaks'] * 3
+    assert all('mpich' in s for s in dependents[mpich.dag_hash()])
+    assert len(dependents[mpich.dag_hash()]) == 2
+
+    # Dependents that are not installed anymore are not reported
+    mutable_database.remove('mpileaks ^mpich')
+    dependents = mutable_database.installed_dependents([mpich])
+    assert [s.name for s in dependents[mpich.dag_hash()]] == ['callpath']
+
+
 @pytest.mark.regression('10019')
 def test_query_spec_with_conditional_dependency(mutable_database):
     # The issue is triggered by having dependencies that are
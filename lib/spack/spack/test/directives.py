@@ -3,7 +3,9 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import spack.directives
 import spack.repo
+from spack.directives import DirectiveMeta
 from spack.spec import Spec
 
 
@@ -32,3 +34,25 @@ def test_true_directives_exist(mock_packages):
 
     assert cls.patches
     assert Spec() in cls.patches
+
+
+def test_nested_directives_do_not_leak_into_other_packages():
+    """Directives queued while a directive executes are dropped, and not
+       added to a package loaded by a later directive.
+    """
+    loaded = {}
+
+    def define_package(name, *directives):
+        DirectiveMeta._directives_to_be_executed.extend(directives)
+        return DirectiveMeta(name, (object,), {'__module__': 'spack.pkg.x'})
+
+    def nested_directive(pkg):
+        spack.directives.version('1.0', '0123456789abcdef0123456789abcdef')
+
+    def load_other_package(pkg):
+        loaded['other'] = define_package('Other')
+
+    cls = define_package('Pkg', nested_directive, load_other_package)
+    assert not cls.versions
+    assert not loaded['other'].versions
+    assert not DirectiveMeta._directives_to_be_executed
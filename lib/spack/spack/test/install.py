@@ -6,11 +6,15 @@
 import os
 import pytest
 import shutil
+import types
 
 import llnl.util.filesystem as fs
 
-from spack.package import InstallError, PackageBase, PackageStillNeededError
+from spack.package import (
+    InstallError, PackageBase, PackageStillNeededError, dependents_first)
+import spack.directory_layout
 import spack.error
+import spack.hooks
 import spack.patch
 import spack.repo
 import spack.store
@@ -335,6 +339,96 @@ def test_uninstall_by_spec_errors(mutable_database):
         PackageBase.uninstall_by_spec(rec.spec)
 
 
+def test_uninstall_specs(mutable_database):
+    """Uninstall a spec together with all of its dependents."""
+    mpich = mutable_database.get_record('mpich').spec
+    dependents = [s for s in mutable_database.query() if 'mpich' in s]
+
+    # Some of its dependents are not being uninstalled
+    with pytest.raises(PackageStillNeededError, match="Cannot uninstall"):
+        PackageBase.uninstall_specs([mpich] + dependents[:1])
+    assert mpich.package.installed
+
+    PackageBase.uninstall_specs([mpich] + dependents)
+    assert not mutable_database.query('mpich', installed=any)
+    assert not any(os.path.exists(s.prefix) for s in dependents)
+
+    spec = Spec('dependent-install')
+    spec.concretize()
+    with pytest.raises(InstallError, match="is not installed"):
+        PackageBase.uninstall_specs([spec])
+
+
+def test_uninstall_specs_keeps_dependencies_of_failures(
+        mutable_database, monkeypatch):
+    """If a prefix cannot be removed, its dependencies are not removed."""
+    mpileaks = mutable_database.query_one('mpileaks ^mpich')
+    # mpich and all its dependents
+    specs = [s for s in mutable_database.query() if 'mpich' in s]
+
+    layout_class = spack.directory_layout.YamlDirectoryLayout
+    remove_install_directory = layout_class.remove_install_directory
+
+    def fail_for_mpileaks(layout, spec, deprecated=False):
+        if spec.dag_hash() == mpileaks.dag_hash():
+            raise spack.directory_layout.RemoveFailedError(
+                spec, spec.prefix, OSError('busy'))
+        remove_install_directory(layout, spec, deprecated)
+
+    # spack.store.layout is a lazy reference to the current layout, so
+    # the method is patched on its class
+    monkeypatch.setattr(layout_class, 'remove_install_directory',
+                        fail_for_mpileaks)
+    with pytest.raises(spack.directory_layout.RemoveFailedError):
+        PackageBase.uninstall_specs(specs)
+
+    kept = [s for s in specs if s in mpileaks]
+    assert sorted(s.name for s in kept) == ['callpath', 'mpich', 'mpileaks']
+    for spec in specs:
+        assert bool(mutable_database.query(spec)) == (spec in kept)
+        assert os.path.isdir(spec.prefix) == (spec in kept)
+
+
+def test_hooks_for_specs_isolate_errors(monkeypatch, capfd):
+    """A failing hook does not prevent the others from running."""
+    called = []
+
+    def fail(arg):
+        raise MockInstallError('hook failed')
+
+    def record_and_fail(spec):
+        called.append(spec)
+        fail(spec)
+
+    batch = types.ModuleType('batch')
+    batch.post_uninstall_specs = fail
+    single = types.ModuleType('single')
+    single.post_uninstall = record_and_fail
+    last = types.ModuleType('last')
+    last.post_uninstall = called.append
+    monkeypatch.setattr(spack.hooks, 'all_hook_modules',
+                        lambda: [batch, single, last])
+
+    assert not spack.hooks.post_uninstall.for_specs(['a', 'b'])
+    assert called == ['a', 'b', 'a', 'b']
+    err = capfd.readouterr()[1]
+    assert 'failed for all specs' in err
+    assert 'failed for a' in err and 'failed for b' in err
+
+    monkeypatch.setattr(spack.hooks, 'all_hook_modules', lambda: [last])
+    assert spack.hooks.post_uninstall.for_specs(['c'])
+
+
+def test_dependents_first(mutable_database):
+    specs = mutable_database.query('mpileaks ^mpich')[0].traverse()
+    specs = list(specs)
+    for order in (specs, list(reversed(specs))):
+        ordered = dependents_first(order)
+        assert sorted(ordered) == sorted(specs)
+        for i, spec in enumerate(ordered):
+            assert not any(spec in s for s in ordered[i + 1:])
+
+
 @pytest.mark.disable_clean_stage_check
 def test_nosource_pkg_install(
         install_mockery, mock_fetch, mock_packages, capfd):
@@ -13,6 +13,7 @@
 
 import spack.binary_distribution
 import spack.compilers
+import spack.config
 import spack.directory_layout as dl
 import spack.installer as inst
 import spack.package_prefs as prefs
@@ -960,3 +961,53 @@ def test_install_skip_patch(install_mockery, mock_fetch):
     installer.install(fake=False, skip_patch=True)
 
     assert 'b' in installer.installed
+
+
+def _mock_binary_cache(monkeypatch, missing=()):
+    """Serve every package but the ``missing`` ones from a mock binary cache
+    whose tarballs extract to an empty install directory."""
+    def _get_spec(spec, force):
+        return [spec]
+
+    def _download(spec):
+        return None if spec.name in missing else spec.name
+
+    def _extract(spec, filename, allow_root, unsigned, force):
+        assert filename == spec.name
+        spack.store.layout.create_install_directory(spec)
+
+    monkeypatch.setattr(spack.binary_distribution, 'get_spec', _get_spec)
+    monkeypatch.setattr(
+        spack.binary_distribution, 'download_tarball', _download)
+    monkeypatch.setattr(
+        spack.binary_distribution, 'extract_tarball', _extract)
+
+
+def test_install_binaries(install_mockery, monkeypatch):
+    """Cache-only installs extract all the binary packages up front."""
+    _mock_binary_cache(monkeypatch)
+    monkeypatch.setattr(inst, '_install_from_cache', _none)
+    monkeypatch.setattr(inst.multiprocessing, 'cpu_count', lambda: 2)
+
+    spec, installer = create_installer('libdwarf')
+    with spack.config.override('config:build_jobs', 2):
+        installer.install(cache_only=True)
+
+    for s in spec.traverse():
+        rec = spack.store.db.get_record(s)
+        assert rec.installed
+        assert rec.explicit == (s.name == 'libdwarf')
+        assert s.package.installed_from_binary_cache
+    assert installer.installed == set(['libelf', 'libdwarf'])
+
+
+def test_install_binaries_missing_dependency(install_mockery, monkeypatch):
+    """Packages are not installed before their dependencies."""
+    _mock_binary_cache(monkeypatch, missing=['libelf'])
+
+    spec, installer = create_installer('libdwarf')
+    installer._init_queue(True, True)
+    installer._install_binaries()
+
+    assert not any(s.package.installed for s in spec.traverse())
+    assert not os.path.exists(spec.prefix)
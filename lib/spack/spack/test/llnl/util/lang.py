@@ -137,3 +137,25 @@ def test_uniq():
     assert [1, 2, 3] == llnl.util.lang.uniq([1, 1, 1, 1, 2, 2, 2, 3, 3])
     assert [1, 2, 1] == llnl.util.lang.uniq([1, 1, 1, 1, 2, 2, 2, 1, 1])
     assert [] == llnl.util.lang.uniq([])
+
+
+def test_lru_cache():
+    cache = llnl.util.lang.LRUCache(2, name='test')
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+
+    # 'b' is the least recently used entry
+    cache.put('c', 3)
+    assert 'b' not in cache
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert len(cache) == 2
+
+    assert (cache.hits, cache.misses) == (3, 1)
+    assert cache.hit_rate == 0.75
+    assert cache in llnl.util.lang.lru_cache_statistics()
+    assert str(cache) == 'test: 3 hits, 1 misses (75.0% hits), 2/2 entries'
+
+    cache.clear()
+    assert not len(cache) and cache.hit_rate is None
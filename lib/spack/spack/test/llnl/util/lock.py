@@ -43,10 +43,13 @@
 
 """
 import collections
+import errno
 import os
 import socket
 import shutil
+import sys
 import tempfile
+import time
 import traceback
 import glob
 import getpass
@@ -313,6 +316,16 @@ def fn(barrier):
     return fn
 
 
+def timeout_write_blocking(lock_path, start=0, length=0):
+    def fn(barrier):
+        lock = lk.Lock(lock_path, start, length, blocking=True)
+        barrier.wait()  # wait for lock acquire in first process
+        with pytest.raises(lk.LockTimeoutError):
+            lock.acquire_write(lock_fail_timeout)
+        barrier.wait()
+    return fn
+
+
 #
 # Test that exclusive locks on other processes time out when an
 # exclusive lock is held.
@@ -338,6 +351,12 @@ def test_write_lock_timeout_on_write_3(lock_path):
         timeout_write(lock_path))
 
 
+def test_write_lock_timeout_on_write_blocking(lock_path):
+    multiproc_test(
+        acquire_write(lock_path),
+        timeout_write_blocking(lock_path))
+
+
 def test_write_lock_timeout_on_write_ranges(lock_path):
     multiproc_test(
         acquire_write(lock_path, 0, 1),
@@ -1294,3 +1313,84 @@ def test_upgrade_read_fails(tmpdir):
         msg = 'Cannot upgrade lock from read to write on file: lockfile'
         with pytest.raises(lk.LockUpgradeError, match=msg):
             lock.upgrade_read_to_write()
+
+
+def test_blocking_lock_waits_for_release(lock_path):
+    """A blocking lock is acquired once the holder releases it, and the
+    contention is recorded in the lock statistics."""
+    def p1(barrier, q):
+        lock = lk.Lock(lock_path)
+        lock.acquire_write()
+        q.put(os.getpid())
+        barrier.wait()  # ---------------------------------------- 1
+        time.sleep(0.2)  # let p2 block on the lock
+        lock.release_write()
+        barrier.wait()  # ---------------------------------------- 2
+
+    def p2(barrier, q):
+        p1_pid = q.get()
+        lock = lk.Lock(lock_path, blocking=True)
+        lk.reset_lock_statistics()
+        barrier.wait()  # ---------------------------------------- 1
+        wait_time, nattempts = lock._lock(lk.fcntl.LOCK_EX, timeout=5)
+        assert nattempts == 2
+        assert wait_time < 5
+        lock._unlock()
+
+        stats = lk.lock_statistics(contended_only=True)
+        assert len(stats) == 1
+        assert stats[0].contended == 1
+        if sys.platform.startswith('linux'):
+            assert stats[0].holder_pid == p1_pid
+        barrier.wait()  # ---------------------------------------- 2
+
+    local_multiproc_test(p1, p2, extra_args=(Queue(),))
+
+
+def test_lock_statistics(tmpdir):
+    """Uncontended acquisitions are counted but not reported as contended.
+    """
+    lk.reset_lock_statistics()
+    with tmpdir.as_cwd():
+        lock = lk.Lock('lockfile', desc='test')
+        for i in range(3):
+            with lk.WriteTransaction(lock):
+                pass
+
+    assert not lk.lock_statistics(contended_only=True)
+    stats = lk.lock_statistics()
+    assert len(stats) == 1
+    assert stats[0].acquisitions == 3
+    assert stats[0].attempts == 3
+    assert stats[0].contended == 0
+    assert 'lockfile[0:0] (test): 3 acquired' in str(stats[0])
+
+
+def test_blocking_lock_falls_back_to_polling_on_deadlock(
+        tmpdir, monkeypatch):
+    """If the kernel refuses a blocking lockf() with EDEADLK, the lock is
+    taken by polling instead."""
+    lockf = lk.fcntl.lockf
+
+    def deadlocking_lockf(f, op, *args):
+        if op in (lk.fcntl.LOCK_SH, lk.fcntl.LOCK_EX):
+            raise IOError(errno.EDEADLK, os.strerror(errno.EDEADLK))
+        return lockf(f, op, *args)
+
+    monkeypatch.setattr(lk.fcntl, 'lockf', deadlocking_lockf)
+    with tmpdir.as_cwd():
+        lock = lk.Lock('lockfile', blocking=True)
+
+        # Fail the first nonblocking attempt so that the lock blocks
+        poll_lock = lock._poll_lock
+        calls = []
+
+        def contended_poll_lock(op):
+            calls.append(op)
+            return len(calls) > 1 and poll_lock(op)
+
+        monkeypatch.setattr(lock, '_poll_lock', contended_poll_lock)
+
+        wait_time, nattempts = lock._lock(lk.fcntl.LOCK_EX, timeout=5)
+        assert nattempts == 3
+        lock._unlock()
@@ -3,6 +3,12 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import shutil
+
+import spack.caches
+import spack.repo
+import spack.util.file_cache
+import spack.util.package_hash as ph
 from spack.util.package_hash import package_hash, package_content
 from spack.spec import Spec
 
@@ -63,3 +69,52 @@ def compare_sans_name(eq, spec1, spec2):
         assert content1 == content2
     else:
         assert content1 != content2
+
+
+def test_package_hash_cache(tmpdir, mock_packages, config, monkeypatch):
+    monkeypatch.setattr(spack.caches, 'misc_cache',
+                        spack.util.file_cache.FileCache(str(tmpdir.join('c'))))
+    monkeypatch.setattr(ph, '_package_hashes', {})
+
+    # Hash a copy of the package, so that it can be modified
+    original = spack.repo.path.filename_for_package_name('hash-test1')
+    filename = str(tmpdir.join('package.py'))
+    shutil.copy(original, filename)
+    monkeypatch.setattr(spack.repo.RepoPath, 'filename_for_package_name',
+                        lambda self, name: filename)
+
+    parsed = []
+    parse_package = ph._parse_package
+    monkeypatch.setattr(
+        ph, '_parse_package',
+        lambda spec: parsed.append(spec) or parse_package(spec))
+
+    def check(spec_str, parses):
+        del parsed[:]
+        expected = package_hash(spec_str, package_content(spec_str))
+        del parsed[:]
+        assert package_hash(spec_str) == expected
+        assert len(parsed) == parses
+
+    # Each package file is parsed once per combination of the @when
+    # conditions its multimethods use, also by other Spack processes
+    check('hash-test1@1.2', 1)
+    check('hash-test1@1.2', 0)
+    check('hash-test1@1.1+variantx', 0)
+    check('hash-test1@1.5', 1)
+    ph._package_hashes.clear()
+    check('hash-test1@1.2', 0)
+    check('hash-test1@1.5', 0)
+
+    # Hashes are invalidated when the file changes
+    with open(filename, 'a') as f:
+        f.write('\n')
+    check('hash-test1@1.5', 1)
+    check('hash-test1@1.5', 0)
+    check('hash-test1@1.2', 1)
+
+    # Other Python or Spack versions do not share the cached hashes
+    ph._package_hashes.clear()
+    monkeypatch.setattr(ph, '_hashing_environment', lambda: 'other')
+    check('hash-test1@1.2', 1)
+    check('hash-test1@1.2', 0)
@@ -13,6 +13,8 @@
 import argparse
 import re
 import platform
+import tarfile
+from contextlib import closing
 
 from llnl.util.filesystem import mkdirp
 
@@ -20,7 +22,10 @@
 import spack.store
 import spack.binary_distribution as bindist
 import spack.cmd.buildcache as buildcache
+import spack.util.compression
+import spack.util.spack_yaml as syaml
 from spack.spec import Spec
+from spack.util.executable import which
 from spack.paths import mock_gpg_keys_path
 from spack.fetch_strategy import URLFetchStrategy, FetchStrategyComposite
 from spack.relocate import needs_binary_relocation, needs_text_relocation
@@ -250,6 +255,112 @@ def test_relocate_links(tmpdir):
         assert os.readlink(new_linkname2) == '/usr/lib/libc.so'
 
 
+@pytest.mark.skipif(not which('zstd'), reason='This test requires zstd')
+@pytest.mark.parametrize('compress', ['gzip', 'zstd'])
+@pytest.mark.usefixtures('install_mockery')
+def test_buildcache_compression(compress, tmpdir):
+    """Binary packages can be created with either compression, and are
+    installed whatever the current setting is."""
+    spec = Spec('trivial-install-test-package')
+    spec.concretize()
+    spec.package.do_install(fake=True)
+    mirror = str(tmpdir.join('mirror'))
+
+    with spack.config.override('config:buildcache_compression', compress):
+        bindist.build_tarball(spec, 'file://' + mirror, unsigned=True)
+    spackfile = os.path.join(
+        bindist.build_cache_prefix(mirror),
+        bindist.tarball_path_name(spec, '.spack'))
+    tarball = bindist.tarball_name(
+        spec, '.tar.gz' if compress == 'gzip' else '.tar.zst')
+    with closing(tarfile.open(spackfile)) as tar:
+        assert tarball in tar.getnames()
+
+    spec.package.do_uninstall(force=True)
+    bindist.extract_tarball(spec, spackfile, unsigned=True)
+    assert os.path.isfile(
+        os.path.join(spec.prefix, '.spack', 'binary_distribution'))
+
+
+@pytest.mark.usefixtures('config', 'mock_packages')
+def test_specs_needing_rebuild(tmpdir, monkeypatch):
+    """Specs up to date according to the mirror index are not checked
+    individually."""
+    specs = [Spec(name) for name in ('libelf', 'libdwarf', 'callpath')]
+    for spec in specs:
+        spec.concretize()
+    libelf, libdwarf, callpath = specs
+
+    mirror_url = 'file://' + str(tmpdir)
+    cache_prefix = bindist.build_cache_prefix(str(tmpdir))
+    mkdirp(cache_prefix)
+    for spec, full_hash in [(libelf, libelf.full_hash()),
+                            (libdwarf, 'outdated')]:
+        spec_dict = spec.to_dict()
+        spec_dict['full_hash'] = full_hash
+        with open(os.path.join(cache_prefix, bindist.tarball_name(
+                spec, '.spec.yaml')), 'w') as f:
+            f.write(syaml.dump(spec_dict))
+
+    checked = []
+    needs_rebuild = bindist.needs_rebuild
+
+    def _needs_rebuild(spec, *args):
+        checked.append(spec.name)
+        return needs_rebuild(spec, *args)
+    monkeypatch.setattr(bindist, 'needs_rebuild', _needs_rebuild)
+
+    # without an index, every spec.yaml is read
+    assert bindist.specs_needing_rebuild(
+        specs, mirror_url, True) == [libdwarf, callpath]
+    assert sorted(checked) == ['callpath', 'libdwarf', 'libelf']
+
+    bindist.generate_package_index('file://' + cache_prefix)
+    assert bindist.read_index_full_hashes(mirror_url) == {
+        libelf.dag_hash(): libelf.full_hash(),
+        libdwarf.dag_hash(): 'outdated'}
+
+    del checked[:]
+    assert bindist.specs_needing_rebuild(
+        specs, mirror_url, True) == [libdwarf, callpath]
+    assert sorted(checked) == ['callpath', 'libdwarf']
+
+
+def test_add_prefix_to_tarball(tmpdir):
+    """Tarballs are written from the prefix, with the files in workdir
+    taking precedence."""
+    prefix = tmpdir.join('prefix')
+    prefix.ensure('bin', 'exe').write('original')
+    prefix.ensure('lib', 'libfoo.so').write('library')
+    prefix.ensure('.spack', 'spec.yaml').write('spec')
+    os.link(str(prefix.join('lib', 'libfoo.so')),
+            str(prefix.join('lib', 'libfoo.so.1')))
+    os.symlink('libfoo.so', str(prefix.join('lib', 'libbar.so')))
+
+    workdir = tmpdir.join('workdir')
+    workdir.ensure('bin', 'exe').write('relocated')
+    workdir.ensure('.spack', 'binary_distribution').write('buildinfo')
+
+    tarball = str(tmpdir.join('prefix.tar.gz'))
+    with open(tarball, 'wb') as f:
+        with spack.util.compression.compressing_writer(f) as stream:
+            with closing(tarfile.open(fileobj=stream, mode='w|')) as tar:
+                bindist.add_prefix_to_tarball(
+                    tar, str(prefix), str(workdir), 'pkg')
+
+    with closing(tarfile.open(tarball, 'r:gz')) as tar:
+        members = dict((m.name, m) for m in tar.getmembers())
+        assert sorted(members) == [
+            'pkg', 'pkg/.spack', 'pkg/.spack/binary_distribution',
+            'pkg/.spack/spec.yaml', 'pkg/bin', 'pkg/bin/exe', 'pkg/lib',
+            'pkg/lib/libbar.so', 'pkg/lib/libfoo.so', 'pkg/lib/libfoo.so.1']
+        assert tar.extractfile('pkg/bin/exe').read() == b'relocated'
+        assert members['pkg/lib/libbar.so'].issym()
+        links = [members[n] for n in ('pkg/lib/libfoo.so',
+                                      'pkg/lib/libfoo.so.1')]
+        assert any(m.islnk() for m in links)
+
+
 def test_needs_relocation():
 
     assert needs_binary_relocation('application', 'x-sharedlib')
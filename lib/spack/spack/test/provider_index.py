@@ -18,6 +18,7 @@
                     mpi@:10.0: set([zmpi])},
     'stuff': {stuff: set([externalvirtual])}}
 """
+import pytest
 from six import StringIO
 
 import spack.repo
@@ -73,3 +74,46 @@ def test_copy(mock_packages):
     p = ProviderIndex(spack.repo.all_package_names())
     q = p.copy()
     assert p == q
+
+
+@pytest.mark.parametrize('virtual', [
+    'mpi', 'mpi@:1', 'mpi@1.5', 'mpi@2:', 'mpi@2.1:2.2', 'mpi@3:',
+    'mpi@10.1:', 'blas', 'lapack@3'
+])
+def test_providers_for_matches_all_provided(mock_packages, virtual):
+    """Bucketed and memoized lookups find the same providers as checking
+    every provided spec."""
+    p = ProviderIndex(spack.repo.all_package_names())
+    virtual_spec = Spec(virtual)
+
+    expected = set()
+    for p_spec, spec_set in p.providers[virtual_spec.name].items():
+        if p_spec.satisfies(virtual_spec, deps=False):
+            expected.update(spec_set)
+
+    for _ in range(2):
+        assert p.providers_for(virtual_spec) == sorted(expected)
+
+
+def test_bucket_invalidation(mock_packages):
+    p = ProviderIndex(['mpich2'])
+    assert p.providers_for('mpi@3') == []
+
+    p.update('mpich')
+    assert p.providers_for('mpi@3') == [Spec('mpich@3:')]
+
+    p.remove_provider('mpich')
+    assert p.providers_for('mpi@3') == []
+
+
+def test_provider_index_satisfies(mock_packages):
+    mpich = ProviderIndex([Spec('mpich@3')], restrict=True)
+    mpich_3 = ProviderIndex([Spec('mpich@3:3.1')], restrict=True)
+    mpich_1 = ProviderIndex([Spec('mpich@1')], restrict=True)
+    zmpi = ProviderIndex([Spec('zmpi')], restrict=True)
+    blas = ProviderIndex([Spec('openblas')], restrict=True)
+
+    assert mpich.satisfies(mpich_3)
+    assert not mpich.satisfies(mpich_1)
+    assert not mpich.satisfies(zmpi)
+    assert mpich.satisfies(blas)
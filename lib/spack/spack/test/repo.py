@@ -4,10 +4,16 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import os
+import time
+
 import pytest
 
-import spack.repo
+import llnl.util.filesystem as fs
+
+import spack.caches
 import spack.paths
+import spack.repo
+import spack.util.file_cache
 
 
 @pytest.fixture()
@@ -67,3 +73,110 @@ def test_repo_invisibles(mutable_mock_repo, extra_repo):
     with open(os.path.join(extra_repo.root, 'packages', '.invisible'), 'w'):
         pass
     extra_repo.all_package_names()
+
+
+def test_dependency_index(mock_packages):
+    index = spack.repo.path.dependency_index
+    for pkg_name in spack.repo.path.all_package_names():
+        pkg_cls = spack.repo.path.get_pkg_class(pkg_name)
+        dependencies = spack.repo.DependencyIndex.dependency_types(pkg_cls)
+        assert index[pkg_name] == dependencies
+        for name, types in dependencies.items():
+            assert pkg_name in index.dependents_of(name, types)
+
+    assert index.dependencies_of('dyninst', 'link') == set(['libdwarf',
+                                                            'libelf'])
+    assert 'mpileaks' in index.dependents_of('mpi')
+    assert 'mpileaks' not in index.dependents_of('mpi', 'test')
+
+
+def test_search_index(mock_packages):
+    index = spack.repo.path.search_index
+    for pkg_name in spack.repo.path.all_package_names():
+        pkg_cls = spack.repo.path.get_pkg_class(pkg_name)
+        record = spack.repo.SearchIndex.package_record(pkg_cls)
+        assert index[pkg_name] == record
+        assert pkg_name in index.search(pkg_name)
+        for word in index.words(record['description']):
+            assert pkg_name in index.search(word)
+            assert pkg_name in index.containing(word[1:])
+
+    assert index.search('MPILEAKS') == set(['mpileaks'])
+    assert 'boost' in index.search('fake boost', 'Package')
+    assert 'mpileaks' in index.search('opt', 'debug')
+    assert 'libelf' not in index.search('opt', 'debug')
+    assert 'libelf' not in index.containing('mpileaks')
+    assert index.containing('*') == index.search('') == set(index)
+
+
+def test_indexes_are_read_when_used(mock_packages, monkeypatch, tmpdir):
+    """Indexes that are up to date are not read with the other ones."""
+    monkeypatch.setattr(spack.caches, 'misc_cache',
+                        spack.util.file_cache.FileCache(str(tmpdir)))
+    repo = spack.repo.Repo(spack.paths.mock_packages_path)
+    repo.provider_index
+
+    read = []
+
+    def record_read(name):
+        def read_index(indexer, stream):
+            read.append(name)
+            indexer.index = None
+        return read_index
+
+    for name, indexer in repo.index.indexers.items():
+        monkeypatch.setattr(type(indexer), 'read', record_read(name))
+
+    repo._repo_index = None
+    repo.provider_index
+    assert read == ['providers']
+    repo.dependency_index
+    assert read == ['providers', 'dependencies']
+    repo.search_index
+    assert read == ['providers', 'dependencies', 'search']
+
+
+def test_dependency_index_update(mutable_mock_repo, extra_repo,
+                                 monkeypatch, tmpdir):
+    """Packages in a repo earlier in the path replace those later on, and
+    indexes are updated when package files change."""
+    monkeypatch.setattr(spack.caches, 'misc_cache',
+                        spack.util.file_cache.FileCache(str(tmpdir)))
+    package_py = extra_repo.root + '/packages/mpileaks/package.py'
+
+    def write_package(dependency):
+        fs.mkdirp(os.path.dirname(package_py))
+        with open(package_py, 'w') as f:
+            f.write("""\
+from spack import *
+
+
+class Mpileaks(Package):
+    url = 'http://www.example.com/mpileaks-1.0.tar.gz'
+
+    version('1.0', '0123456789abcdef0123456789abcdef')
+
+    depends_on('{0}', type='build')
+""".format(dependency))
+
+    write_package('zmpi')
+    mutable_mock_repo.put_first(extra_repo)
+    index = mutable_mock_repo.dependency_index
+    assert index['mpileaks'] == {'zmpi': ['build']}
+    assert 'mpileaks' in index.dependents_of('zmpi', 'build')
+    assert 'mpileaks' not in index.dependents_of('callpath')
+
+    # the index of the extra repo is read back, and updated
+    write_package('fake')
+    os.utime(package_py, (time.time() + 10, time.time() + 10))
+    extra_repo._pkg_checker.invalidate()
+    extra_repo._repo_index = None
+    extra_repo._instances.clear()
+    extra_repo._modules.clear()
+    index = extra_repo.dependency_index
+    assert index['mpileaks'] == {'fake': ['build']}
+    assert index.dependents_of('zmpi') == set()
+
+    # and so is the search index
+    assert extra_repo.search_index.search('mpileaks') == set(['mpileaks'])
+    assert extra_repo.search_index.search('mpileaks', 'mpi') == set()
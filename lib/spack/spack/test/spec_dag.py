@@ -6,6 +6,8 @@
 """
 These tests check Spec DAG operations using dummy packages.
 """
+import sys
+
 import pytest
 import spack.architecture
 import spack.package
@@ -618,6 +620,37 @@ def test_copy_concretized(self):
         copy_ids = set(id(s) for s in copy.traverse())
         assert not orig_ids.intersection(copy_ids)
 
+    def test_copy_concretized_shares_node_attributes(self):
+        orig = Spec('mpileaks')
+        orig.concretize()
+        copy = orig.copy()
+        nodes = dict((s.name, s) for s in copy.traverse())
+
+        for s in orig.traverse():
+            c = nodes[s.name]
+            assert c.versions is s.versions
+            assert c.architecture is s.architecture
+            assert c.compiler is s.compiler
+            assert c.variants is not s.variants
+            assert c.variants.spec is c
+            assert all(c.variants[v] is s.variants[v] for v in s.variants)
+
+        # Specs that are no longer concrete stop sharing, so modifying
+        # them leaves the original untouched.
+        copy._mark_concrete(False)
+        for s in orig.traverse():
+            c = nodes[s.name]
+            assert c.versions is not s.versions
+            assert c.versions == s.versions
+            assert c.architecture is not s.architecture
+            assert c.compiler is not s.compiler
+            assert all(c.variants[v] is not s.variants[v]
+                       for v in s.variants)
+
+        copy.versions = spack.version.ver('1.0')
+        copy.architecture.target = 'x86_64'
+        assert orig.satisfies('mpileaks@2.3') and orig.concrete
+
     """
     Here is the graph with deptypes labeled (assume all packages have a 'dt'
     prefix). Arrows are marked with the deptypes ('b' for 'build', 'l' for
@@ -772,6 +805,30 @@ def test_edge_traversals(self):
             ['d', 'c', 'b', 'a', 'g', 'f'] ==
             [s.name for s in spec['d'].traverse(direction='parents')])
 
+    def test_deep_traversal(self):
+        """Traversals of long chains must not hit the recursion limit."""
+        n = 3 * sys.getrecursionlimit()
+        specs = [Spec('pkg%d' % i) for i in range(n)]
+        for parent, child in zip(specs, specs[1:]):
+            parent._add_dependency(child, ('build', 'link'))
+
+        assert [s.name for s in specs[0].traverse()] == [
+            s.name for s in specs]
+        assert [d for d, _ in specs[0].traverse(order='post', depth=True)] == (
+            list(range(n - 1, -1, -1)))
+        assert len(list(specs[-1].traverse(direction='parents'))) == n
+
+    def test_traversal_sees_new_dependencies(self):
+        """Cached child lists must be dropped when dependencies change."""
+        spec = Spec.from_literal({'a': {'c': None, 'd': None}})
+        assert [s.name for s in spec.traverse()] == ['a', 'c', 'd']
+
+        spec._add_dependency(Spec('b'), ('build', 'link'))
+        assert [s.name for s in spec.traverse()] == ['a', 'b', 'c', 'd']
+
+        del spec._dependencies['c']
+        assert [s.name for s in spec.traverse()] == ['a', 'b', 'd']
+
     def test_copy_dependencies(self):
         s1 = Spec('mpileaks ^mpich2@1.1')
         s2 = s1.copy()
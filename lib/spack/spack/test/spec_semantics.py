@@ -15,6 +15,7 @@
 import spack.architecture
 import spack.directives
 import spack.error
+import spack.spec
 
 
 def make_spec(spec_like, concrete):
@@ -837,6 +838,32 @@ def test_spec_formatting_escapes(self):
             with pytest.raises(SpecFormatStringError):
                 spec.format(fmt_str)
 
+    def test_format_specs(self):
+        specs = [Spec('mpileaks').concretized(),
+                 Spec('libelf cflags=-O2').concretized()]
+
+        # Format strings are compiled once, and formatting many specs at
+        # once gives the same result as formatting them one by one
+        for fmt_str in ['{/hash:7} {name}{@version}{%compiler}{variants}',
+                        r'\{{name}\} {^libelf.name}{arch=architecture}',
+                        '$_$@']:
+            actual = spack.spec.format_specs(specs[:1], fmt_str)
+            assert actual == [specs[0].format(fmt_str)]
+            assert fmt_str in spack.spec._format_templates
+        assert specs[0].format(r'\{{name}\} {^libelf.name}') == \
+            '{mpileaks} libelf'
+
+        transform = {'name': lambda s, x: x.upper()}
+        actual = spack.spec.format_specs(
+            specs, '{name}{@version}', transform=transform)
+        assert actual == ['MPILEAKS@2.3', 'LIBELF@0.8.13']
+
+        actual = spack.spec.format_specs(
+            specs[1:], '{name}{@version}', color=True)
+        assert actual == ['libelf\x1b[0;36m@0.8.13\x1b[0m']
+
+        assert spack.spec.format_specs([], '{name}') == []
+
     def test_spec_deprecated_formatting(self):
         spec = Spec("libelf cflags=-O2")
         spec.concretize()
@@ -8,6 +8,7 @@
 import shlex
 
 import llnl.util.filesystem as fs
+import llnl.util.lang
 
 import spack.hash_types as ht
 import spack.repo
@@ -805,3 +806,25 @@ def test_kv_with_spaces(self):
     ])
     def test_target_tokenization(self, expected_tokens, spec_string):
         self.check_lex(expected_tokens, spec_string)
+
+    def test_parse_cache(self, monkeypatch):
+        """Specs parsed from the same string are equal, but independent."""
+        monkeypatch.setattr(sp, '_parsed_specs',
+                            llnl.util.lang.LRUCache(16))
+        string = 'mvapich_foo@1.2:1.4 +debug ^_openmpi%intel@12.1'
+
+        first = Spec(string)
+        second, = sp.parse(string)
+        third = Spec(string)
+        assert first == second == third
+        assert sp._parsed_specs.hits == 2
+
+        second.versions = sp.vn.VersionList(['1.3'])
+        second['_openmpi'].variants['debug'] = sp.vt.BoolValuedVariant(
+            'debug', True)
+        assert Spec(string) == first == third
+        assert str(second) != str(first)
+
+        # Strings that may contain hashes or files are not cached
+        Spec('mvapich_foo cflags=-I/usr/include')
+        assert 'mvapich_foo cflags=-I/usr/include' not in sp._parsed_specs
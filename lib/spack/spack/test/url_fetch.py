@@ -4,9 +4,14 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import collections
+import hashlib
 import os
 import pytest
+import re
 import sys
+import threading
+
+from six.moves import BaseHTTPServer, socketserver
 
 from llnl.util.filesystem import working_dir, is_exe
 import llnl.util.tty as tty
@@ -175,6 +180,24 @@ def test_unknown_hash(checksum_type):
         crypto.Checker('a')
 
 
+def test_checker_updates(checksum_type):
+    data = b'spack' * 1000
+    hasher = crypto.hash_fun_for_algo(checksum_type)()
+    hasher.update(data)
+    digest = hasher.hexdigest()
+
+    checker = crypto.Checker(digest)
+    for i in range(0, len(data), 64):
+        checker.update(data[i:i + 64])
+    assert checker.check_updates()
+    assert checker.sum == digest
+
+    checker = crypto.Checker(None, algorithm=checksum_type)
+    checker.update(data)
+    assert not checker.check_updates()
+    assert checker.sum == digest
+
+
 def test_url_with_status_bar(tmpdir, mock_archive, monkeypatch, capfd):
     """Ensure fetch with status bar option succeeds."""
     def is_true():
@@ -225,3 +248,171 @@ def test_candidate_urls(pkg_factory, url, urls, version, expected):
     pkg = pkg_factory(url, urls, fetch_options={'timeout': 60})
     f = fs._from_merged_attrs(fs.URLFetchStrategy, pkg, version)
     assert f.extra_options == {'timeout': 60}
+
+
+class RangeRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Serve ``server.data`` with support for HTTP range requests.
+
+    If ``server.drop_after`` is set, the first response longer than that is
+    cut after that many bytes, as if the connection had been lost.
+    """
+    def do_HEAD(self):  # noqa: N802
+        self._respond(body=False)
+
+    def do_GET(self):  # noqa: N802
+        self._respond(body=True)
+
+    def _respond(self, body):
+        data = self.server.data
+        first, last = 0, len(data) - 1
+        byte_range = self.headers.get('Range')
+        self.server.ranges.append(byte_range)
+        if byte_range:
+            match = re.match(r'bytes=(\d+)-(\d*)', byte_range)
+            first = int(match.group(1))
+            last = int(match.group(2) or last)
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes {0}-{1}/{2}'.format(
+                first, last, len(data)))
+        else:
+            self.send_response(200)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(last - first + 1))
+        self.end_headers()
+
+        if body:
+            content = data[first:last + 1]
+            drop_after = self.server.drop_after
+            if drop_after and len(content) > drop_after:
+                content = content[:drop_after]
+                self.server.drop_after = None
+                self.close_connection = True
+            self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class RangeRequestServer(socketserver.ThreadingMixIn,
+                         BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture()
+def range_server():
+    """Local HTTP server for an archive, returns the server and the URL."""
+    server = RangeRequestServer(('127.0.0.1', 0), RangeRequestHandler)
+    server.data = os.urandom(100000)
+    server.ranges = []
+    server.drop_after = None
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    url = 'http://127.0.0.1:{0}/archive.tar.gz'.format(server.server_port)
+    yield server, url
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_resumes_interrupted_download(tmpdir, range_server, config):
+    """A download cut by a network error is resumed where it stopped, and
+    checksummed while it is written."""
+    server, url = range_server
+    server.drop_after = 30000
+    digest = hashlib.sha256(server.data).hexdigest()
+
+    fetcher = fs.URLFetchStrategy(url, digest)
+    with Stage(fetcher, path=str(tmpdir)) as stage:
+        stage.fetch()
+        with open(fetcher.archive_file, 'rb') as f:
+            assert f.read() == server.data
+        # the first request checks that the URL exists
+        assert server.ranges == ['bytes=0-0', None, 'bytes=30000-']
+        assert fetcher._fetched_checksum == ('sha256', digest)
+        stage.check()
+
+
+def test_fetch_keeps_partial_download(
+        tmpdir, range_server, config, monkeypatch):
+    """A failed download is resumed by the next fetch."""
+    server, url = range_server
+    server.drop_after = 30000
+    monkeypatch.setattr(fs, 'resume_attempts', 0)
+
+    fetcher = fs.URLFetchStrategy(url)
+    with Stage(fetcher, path=str(tmpdir)) as stage:
+        with pytest.raises(fs.FailedDownloadError):
+            fetcher.fetch()
+        partial_file = stage.save_filename + '.part'
+        assert os.path.getsize(partial_file) == 30000
+
+        stage.fetch()
+        with open(fetcher.archive_file, 'rb') as f:
+            assert f.read() == server.data
+        assert server.ranges[-1] == 'bytes=30000-'
+
+
+@pytest.mark.parametrize('drop_after', [None, 1000])
+def test_fetch_with_range_requests(
+        tmpdir, range_server, mutable_config, monkeypatch, drop_after):
+    """Large archives are downloaded over several connections."""
+    server, url = range_server
+    server.drop_after = drop_after
+    monkeypatch.setattr(fs, 'range_request_threshold', 0)
+    digest = hashlib.sha256(server.data).hexdigest()
+
+    spack.config.set('config:url_fetch_connections', 4)
+    fetcher = fs.URLFetchStrategy(url, digest)
+    with Stage(fetcher, path=str(tmpdir)) as stage:
+        stage.fetch()
+        with open(fetcher.archive_file, 'rb') as f:
+            assert f.read() == server.data
+        assert fetcher._fetched_checksum == ('sha256', digest)
+        stage.check()
+
+    assert set(server.ranges) >= set([
+        'bytes=0-24999', 'bytes=25000-49999',
+        'bytes=50000-74999', 'bytes=75000-99999'])
+
+
+def test_check_trusts_verified_marker(tmpdir, mock_archive, monkeypatch):
+    """A verified archive is not hashed again until it changes."""
+    digest = crypto.checksum(hashlib.sha256, mock_archive.archive_file)
+    stage_path = str(tmpdir)
+
+    fetcher = fs.URLFetchStrategy(mock_archive.url, digest)
+    with Stage(fetcher, path=stage_path, keep=True) as stage:
+        stage.fetch()
+        stage.check()
+        assert os.path.exists(stage.archive_file + '.verified')
+
+    def _fail(*args, **kwargs):
+        raise AssertionError('archive was hashed again')
+
+    # A new fetcher for the kept stage trusts the marker...
+    fetcher = fs.URLFetchStrategy(mock_archive.url, digest)
+    with Stage(fetcher, path=stage_path, keep=True) as stage:
+        monkeypatch.setattr(crypto, 'checksum', _fail)
+        stage.check()
+        monkeypatch.undo()
+
+        # ...but not once the archive was modified
+        with open(stage.archive_file, 'ab') as f:
+            f.write(b'garbage')
+        with pytest.raises(fs.ChecksumError):
+            stage.check()
+
+
+def test_archive_checksum_from_download(tmpdir, range_server, monkeypatch):
+    """The sha256 reported by ``spack checksum`` comes from the download."""
+    server, url = range_server
+
+    fetcher = fs.URLFetchStrategy(url)
+    with Stage(fetcher, path=str(tmpdir)):
+        fetcher.fetch()
+        monkeypatch.setattr(crypto, 'checksum', None)
+        assert (fetcher.archive_checksum('sha256') ==
+                hashlib.sha256(server.data).hexdigest())
@@ -0,0 +1,155 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Test Spack's archive decompression."""
+import gzip
+import hashlib
+import io
+import os
+import tarfile
+from contextlib import closing
+
+import pytest
+
+import spack.util.compression as compression
+from spack.util.executable import ProcessError, which
+
+
+@pytest.fixture(params=['', 'gz', 'bz2'])
+def tarball(request, tmpdir):
+    """A tarball with a directory, a file and a hard link."""
+    src = tmpdir.join('src').ensure(dir=True)
+    src.ensure('dir', 'file').write('contents')
+    os.link(str(src.join('dir', 'file')), str(src.join('dir', 'link')))
+
+    path = str(tmpdir.join('archive.tar'))
+    if request.param:
+        path += '.' + request.param
+    with closing(tarfile.open(path, 'w:' + request.param)) as tar:
+        tar.add(str(src.join('dir')), arcname='dir')
+    return path, request.param or None
+
+
+def check_extracted(dest):
+    assert dest.join('dir', 'file').read() == 'contents'
+    assert dest.join('dir', 'link').samefile(dest.join('dir', 'file'))
+
+
+def test_compression_of(tarball):
+    path, expected = tarball
+    assert compression.compression_of(path) == expected
+
+
+def test_untar(tarball, tmpdir):
+    path, _ = tarball
+    dest = tmpdir.ensure('dest', dir=True)
+    with dest.as_cwd():
+        compression.decompressor_for(path, 'tar.gz')(path)
+    check_extracted(dest)
+
+
+def test_untar_in_python(tarball, tmpdir, monkeypatch):
+    """Without tar, archives are extracted in-process."""
+    path, _ = tarball
+    monkeypatch.setattr(compression, 'which', lambda name: None)
+    dest = tmpdir.ensure('dest', dir=True)
+    compression.untar(path, str(dest))
+    check_extracted(dest)
+
+
+@pytest.mark.parametrize('native', [True, False])
+def test_untar_stream(tarball, tmpdir, monkeypatch, native):
+    """Streams are extracted in one pass, and read to the end."""
+    path, kind = tarball
+    if not native:
+        monkeypatch.setattr(
+            compression, 'decompression_command', lambda c: None)
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not kind:
+        # tar stops reading at the end-of-archive marker
+        data += b'\0' * 100000
+    stream = io.BytesIO(data)
+
+    dest = tmpdir.ensure('dest', dir=True)
+    compression.untar_stream(stream, kind, str(dest))
+    check_extracted(dest)
+    assert stream.read() == b''
+
+
+@pytest.mark.parametrize('name', ['../escape', '/tmp/escape', 'a/../../b'])
+def test_untar_in_python_unsafe_member(tmpdir, name):
+    """Members that would land outside of the destination are refused."""
+    data = io.BytesIO()
+    with closing(tarfile.open(fileobj=data, mode='w')) as tar:
+        member = tarfile.TarInfo(name)
+        member.size = 4
+        tar.addfile(member, io.BytesIO(b'evil'))
+    data.seek(0)
+
+    dest = tmpdir.ensure('dest', dir=True)
+    with pytest.raises(tarfile.ExtractError, match='unsafe'):
+        compression._untar_in_python(data, str(dest))
+    assert not tmpdir.join('escape').exists()
+
+
+def test_untar_stream_error(tmpdir):
+    stream = io.BytesIO(hashlib.sha256(b'garbage').digest() * 1000)
+    with pytest.raises(ProcessError):
+        compression.untar_stream(stream, 'gz', str(tmpdir))
+
+
+@pytest.mark.parametrize('native', [True, False])
+def test_compressing_writer(tmpdir, monkeypatch, native):
+    if not native:
+        monkeypatch.setattr(
+            compression, 'compression_command', lambda c: None)
+    data = hashlib.sha256(b'data').digest() * 10000
+    path = str(tmpdir.join('data.gz'))
+    with open(path, 'wb') as f:
+        with compression.compressing_writer(f, 'gz') as stream:
+            stream.write(data)
+
+    assert compression.compression_of(path) == 'gz'
+    with closing(gzip.open(path, 'rb')) as f:
+        assert f.read() == data
+
+
+@pytest.mark.skipif(not which('zstd'), reason='This test requires zstd')
+@pytest.mark.parametrize('framed', [True, False])
+def test_untar_zstd(tmpdir, monkeypatch, framed):
+    """zstd streams written by Spack are split into independent frames,
+    others are decompressed as a whole."""
+    monkeypatch.setattr(compression, 'zstd_frame_size', 4096)
+    data = b''.join(hashlib.sha256(str(i).encode()).digest()
+                    for i in range(2000))
+    tmpdir.ensure('src', 'dir', 'file').write_binary(data)
+
+    path = str(tmpdir.join('archive.tar.zst'))
+    if framed:
+        with open(path, 'wb') as f:
+            with compression.compressing_writer(f, 'zst') as stream:
+                with closing(tarfile.open(fileobj=stream, mode='w|')) as tar:
+                    tar.add(str(tmpdir.join('src', 'dir')), arcname='dir')
+    else:
+        with closing(tarfile.open(path + '.tmp', 'w')) as tar:
+            tar.add(str(tmpdir.join('src', 'dir')), arcname='dir')
+        which('zstd')('-q', path + '.tmp', '-o', path)
+
+    assert compression.compression_of(path) == 'zst'
+    with open(path, 'rb') as f:
+        frames = list(compression._zstd_frames(f))
+    assert (len(frames) > 1) == framed
+
+    dest = tmpdir.ensure('dest', dir=True)
+    compression.untar(path, str(dest))
+    assert dest.join('dir', 'file').read_binary() == data
+
+    dest = tmpdir.ensure('dest2', dir=True)
+    with open(path, 'rb') as f:
+        stream = io.BytesIO(f.read())
+    compression.untar_stream(stream, 'zst', str(dest))
+    assert dest.join('dir', 'file').read_binary() == data
+    assert stream.read() == b''
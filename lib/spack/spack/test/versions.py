@@ -562,3 +562,60 @@ def test_list_highest():
     assert vl2.highest_numeric() is None
     assert vl2.preferred() == Version('develop')
     assert vl2.lowest() == Version('master')
+
+
+def test_version_sort_keys():
+    """Comparison keys order infinity versions above numbers, and numbers
+    above letters."""
+    versions = [Version(v) for v in [
+        'a', '1', '1.a', '1.0', '1.2.3', '1.10', '2.b', '2.b.1', '10',
+        'trunk', 'head', 'master', 'main', 'develop', 'develop.1']]
+    for i, a in enumerate(versions):
+        for b in versions[i + 1:]:
+            assert_ver_lt(a, b)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_list_operations_match_pairwise(seed):
+    """Looking up elements by bisection finds the same results as
+    checking all pairs of elements."""
+    import random
+    rng = random.Random(seed)
+    components = ['1', '2', '3', 'a', 'develop']
+
+    def random_version():
+        return '.'.join(rng.choice(components)
+                        for _ in range(rng.randint(1, 3)))
+
+    def random_list():
+        vlist = []
+        for _ in range(rng.randint(1, 6)):
+            if rng.random() < 0.5:
+                vlist.append(random_version())
+            else:
+                start, end = sorted([Version(random_version()),
+                                     Version(random_version())])
+                vlist.append('{0}:{1}'.format(
+                    start if rng.random() < 0.8 else '',
+                    end if rng.random() < 0.8 else ''))
+        return VersionList(vlist)
+
+    for _ in range(200):
+        a, b = random_list(), random_list()
+        assert a.overlaps(b) == any(
+            x.overlaps(y) for x in a for y in b)
+        assert a.satisfies(b) == any(
+            x.satisfies(y) for x in a for y in b)
+        for x in a:
+            assert (x in b) == any(x in y for y in b)
+
+        pairwise = VersionList()
+        try:
+            for x in a:
+                for y in b:
+                    pairwise.add(x.intersection(y))
+        except ValueError:
+            # Intersecting ranges with common prefixes can yield invalid
+            # ranges, e.g. 1.1.3:2 and :1
+            continue
+        assert a.intersection(b) == pairwise
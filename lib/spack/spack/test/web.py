@@ -3,10 +3,15 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 import os
+import threading
 
 import ordereddict_backport
 import pytest
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+import spack.caches
 import spack.paths
+import spack.util.file_cache
 import spack.util.web
 from spack.version import ver
 
@@ -167,3 +172,95 @@ def test_get_header():
     # If there isn't even a fuzzy match, raise KeyError
     with pytest.raises(KeyError):
         spack.util.web.get_header(headers, 'ContentLength')
+
+
+def test_find_versions_of_archives():
+    """Queries spidered in one run find the same versions as alone."""
+    queries = [(root_tarball, root, 0), (root_tarball, root, 3),
+               ([root_tarball], None, 1)]
+    batch = spack.util.web.find_versions_of_archives(queries)
+    assert batch == [spack.util.web.find_versions_of_archive(*q)
+                     for q in queries]
+    assert ver('1.0.0') not in batch[0]
+    assert ver('4.5') in batch[1]
+
+
+@pytest.fixture()
+def http_server(tmpdir, monkeypatch):
+    """A local web server serving index.html with an ETag, which counts
+    requests and connections."""
+    monkeypatch.setattr(spack.caches, 'misc_cache',
+                        spack.util.file_cache.FileCache(str(tmpdir)))
+    monkeypatch.setattr(spack.util.web, 'getproxies', lambda: {})
+
+    stats = {'requests': [], 'connections': 0}
+    pages = {
+        '/index.html': ('text/html', '<a href="1.html">1</a>'
+                        '<a href="foo-1.0.tar.gz">foo</a>'),
+        '/1.html': ('text/html', '<a href="foo-2.0.tar.gz">foo</a>'),
+        '/foo-1.0.tar.gz': ('application/x-gzip', 'not html'),
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            stats['connections'] += 1
+            BaseHTTPRequestHandler.setup(self)
+
+        def do_GET(self):  # noqa: N802
+            stats['requests'].append(
+                (self.path, self.headers.get('If-None-Match')))
+            if self.path not in pages:
+                self.send_error(404)
+                return
+            content_type, body = pages[self.path]
+            etag = '"{0}"'.format(len(body))
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield 'http://127.0.0.1:{0}/'.format(server.server_port), stats
+    server.shutdown()
+    server.server_close()
+
+
+def test_spider_http(http_server):
+    """Pages from a host share a connection, and cached pages are
+    revalidated."""
+    url, stats = http_server
+    index = url + 'index.html'
+
+    pages, links = spack.util.web.spider(index, depth=1, concurrency=1)
+    assert sorted(pages) == [url + '1.html', index]
+    assert url + 'foo-2.0.tar.gz' in links
+    assert stats['connections'] == 1
+    assert all(etag is None for _, etag in stats['requests'])
+
+    del stats['requests'][:]
+    assert spack.util.web.spider(index, depth=1, concurrency=1) == (
+        pages, links)
+    assert stats['requests'] == [
+        ('/index.html', '"54"'), ('/1.html', '"32"')]
+
+
+def test_spider_http_not_html(http_server):
+    url, stats = http_server
+    assert spack.util.web.spider(url + 'foo-1.0.tar.gz') == ({}, set())
+    assert spack.util.web.spider(url + 'missing.html') == ({}, set())
@@ -3,14 +3,25 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import collections
+import gzip
+import multiprocessing
+import multiprocessing.pool
 import re
 import os
+import shutil
+import signal
+import struct
+import subprocess
+import tarfile
+import threading
+from contextlib import closing, contextmanager
 from itertools import product
-from spack.util.executable import which
+from spack.util.executable import which, ProcessError
 
 # Supported archive extensions.
 PRE_EXTS   = ["tar", "TAR"]
-EXTS       = ["gz", "bz2", "xz", "Z"]
+EXTS       = ["gz", "bz2", "xz", "Z", "zst"]
 NOTAR_EXTS = ["zip", "tgz", "tbz2", "txz"]
 
 # Add PRE_EXTS and EXTS last so that .tar.gz is matched *before* .tar or .gz
@@ -18,6 +29,54 @@
     PRE_EXTS, EXTS)] + PRE_EXTS + EXTS + NOTAR_EXTS
 
 
+# zstd streams written by Spack are split into frames compressed
+# independently from each other, so they can also be decompressed in
+# parallel. Such streams start with this skippable frame.
+_zstd_frames_header = struct.pack('<II', 0x184D2A5E, 12) + b'spack-frames'
+
+# Amount of uncompressed data in each of these frames.
+zstd_frame_size = 32 * 1024 * 1024
+
+# Leading bytes of each supported compression format.
+_magic_numbers = [
+    (_zstd_frames_header, 'zst'),
+    (b'\x1f\x8b', 'gz'),
+    (b'\x1f\x9d', 'Z'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zst'),
+]
+
+# Commands that decompress each format to stdout, in order of preference.
+# The parallel implementations come first and are used when installed.
+_decompressors = {
+    'gz': [['pigz', '-dc'], ['gzip', '-dc']],
+    'Z': [['gzip', '-dc']],
+    'bz2': [['pbzip2', '-dc'], ['lbzip2', '-dc'], ['bzip2', '-dc']],
+    'xz': [['xz', '-T0', '-dc']],
+    'zst': [['zstd', '-T0', '-dc']],
+}
+
+# Formats tarfile can decompress when no program is found.
+_python_formats = ('gz', 'bz2', 'xz')
+
+# Commands that compress stdin to stdout, in order of preference.
+_compressors = {
+    'gz': [['pigz', '-c'], ['gzip', '-c']],
+    'bz2': [['pbzip2', '-c'], ['lbzip2', '-c'], ['bzip2', '-c']],
+    'xz': [['xz', '-T0', '-c']],
+    'zst': [['zstd', '-T0', '-q', '-c']],
+}
+
+# Programs that decompress a single file in place, as gunzip does.
+_in_place_decompressors = {
+    'gz': [['pigz', '-d'], ['gunzip']],
+    'bz2': [['pbzip2', '-d'], ['lbzip2', '-d'], ['bunzip2']],
+}
+
+_block_size = 1024 * 1024
+
+
 def allowed_archive(path):
     return any(path.endswith(t) for t in ALLOWED_ARCHIVE_TYPES)
 
@@ -29,15 +88,385 @@ def decompressor_for(path, extension=None):
         unzip = which('unzip', required=True)
         unzip.add_default_arg('-q')
         return unzip
-    if extension and re.match(r'gz', extension):
-        gunzip = which('gunzip', required=True)
-        return gunzip
-    if extension and re.match(r'bz2', extension):
-        bunzip2 = which('bunzip2', required=True)
-        return bunzip2
-    tar = which('tar', required=True)
-    tar.add_default_arg('-oxf')
-    return tar
+    for ext in ('gz', 'bz2'):
+        if extension and re.match(ext, extension):
+            return _first_available(_in_place_decompressors[ext])
+    return untar
+
+
+def _first_available(commands, required=True):
+    """Return an Executable for the first of ``commands`` that is found."""
+    for command in commands:
+        exe = which(command[0])
+        if exe:
+            for arg in command[1:]:
+                exe.add_default_arg(arg)
+            return exe
+    if required:
+        # Fails with the same error as a single missing program would
+        return which(commands[-1][0], required=True)
+    return None
+
+
+def compression_of(path):
+    """Get the compression format of a file from its leading bytes.
+
+    Returns:
+        (str or None): one of the keys of ``EXTS``, or None if the file is
+            not compressed in a format Spack knows about
+    """
+    with open(path, 'rb') as f:
+        head = f.read(len(_zstd_frames_header))
+    for magic, compression in _magic_numbers:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def decompression_command(compression):
+    """Get the fastest available command decompressing ``compression``.
+
+    The command reads from stdin and writes to stdout. Returns None if no
+    program for the format is installed.
+    """
+    exe = _first_available(_decompressors.get(compression, []),
+                           required=False)
+    return exe.exe if exe else None
+
+
+def compression_command(compression):
+    """Get the fastest available command compressing to ``compression``.
+
+    The command reads from stdin and writes to stdout. Returns None if no
+    program for the format is installed.
+    """
+    exe = _first_available(_compressors.get(compression, []),
+                           required=False)
+    return exe.exe if exe else None
+
+
+@contextmanager
+def compressing_writer(fileobj, compression='gz'):
+    """Context manager yielding a binary stream that compresses the data
+    written to it into ``fileobj``.
+
+    The data is compressed by a separate process, using a parallel
+    implementation (pigz, pbzip2, ``xz -T0``, ``zstd -T0``) when one is
+    available. gzip falls back to compressing in-process.
+    """
+    command = compression_command(compression)
+    if command is None:
+        if compression != 'gz':
+            _first_available(_compressors[compression])  # raises
+        with closing(gzip.GzipFile(
+                filename='', mode='wb', fileobj=fileobj)) as stream:
+            yield stream
+        return
+
+    if compression == 'zst':
+        fileobj.write(_zstd_frames_header)
+        stream = _FramedCompressor(fileobj, command)
+        try:
+            yield stream
+        finally:
+            stream.close()
+        return
+
+    process = subprocess.Popen(
+        command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    errors = []
+
+    def copy_output():
+        try:
+            shutil.copyfileobj(process.stdout, fileobj, _block_size)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            # the compressor dies of SIGPIPE instead of blocking forever
+            process.stdout.close()
+
+    writer = threading.Thread(target=copy_output)
+    writer.daemon = True
+    writer.start()
+    try:
+        yield process.stdin
+    finally:
+        try:
+            process.stdin.close()
+        except (IOError, OSError):
+            pass
+        writer.join()
+        status = process.wait()
+    if errors:
+        raise errors[0]
+    if status != 0:
+        raise ProcessError('Command exited with status %d:' % status,
+                           "'%s'" % ' '.join(command))
+
+
+def untar(path, dest='.'):
+    """Extract a tarball into ``dest``.
+
+    Compressed tarballs are decompressed by a separate process, using a
+    parallel implementation (pigz, pbzip2, ``xz -T0``, ``zstd -T0``) when
+    one is available, and piped to ``tar``. Without ``tar`` the archive
+    is extracted in-process with ``tarfile``.
+    """
+    compression = compression_of(path)
+    tar = which('tar')
+    if tar and not compression:
+        # Plain tarballs, or formats only tar itself recognizes
+        tar('-oxf', path, '-C', dest)
+        return
+    # unbuffered, so the file offset is where reads from Python left it
+    with open(path, 'rb', 0) as f:
+        untar_stream(f, compression, dest, is_file=True)
+
+
+def untar_stream(fileobj, compression, dest='.', is_file=False):
+    """Extract a tarball read from a binary file object into ``dest``.
+
+    Args:
+        fileobj: file object the (possibly compressed) tarball is read from
+        compression (str or None): compression of the data, as returned by
+            ``compression_of()``
+        dest (str): directory to extract to
+        is_file (bool): whether ``fileobj`` is a regular file, which can
+            then be handed directly to the subprocesses
+    """
+    tar = which('tar')
+    command = decompression_command(compression) if compression else []
+    if command is None and compression not in _python_formats:
+        _first_available(_decompressors[compression])  # raises
+
+    head, framed = b'', False
+    if compression == 'zst' and command and tar:
+        head = fileobj.read(len(_zstd_frames_header))
+        framed = head == _zstd_frames_header
+        if is_file and not framed:
+            fileobj.seek(0)
+            head = b''
+
+    if framed:
+        _untar_zstd_frames(fileobj, command, tar, dest)
+    elif tar is None or command is None:
+        _untar_in_python(fileobj, dest)
+    else:
+        _untar_with_pipeline(fileobj, command, tar, dest, is_file, head)
+
+    # Consume the rest of the data so readers wrapping the stream (e.g. to
+    # hash it) see all of it.
+    if not is_file:
+        while fileobj.read(_block_size):
+            pass
+
+
+def _untar_with_pipeline(fileobj, command, tar, dest, is_file, head=b''):
+    """Run ``<command> | tar -x``, feeding it ``head`` and then the data
+    from ``fileobj``."""
+    stdin = fileobj if is_file else subprocess.PIPE
+    commands = [c for c in (command, tar.exe + ['-oxf', '-', '-C', dest])
+                if c]
+    processes = []
+    for i, c in enumerate(commands):
+        last = i == len(commands) - 1
+        processes.append(subprocess.Popen(
+            c, stdin=processes[-1].stdout if processes else stdin,
+            stdout=None if last else subprocess.PIPE))
+    if len(processes) > 1:
+        processes[0].stdout.close()
+
+    if not is_file:
+        sink = processes[0].stdin
+        try:
+            sink.write(head)
+            shutil.copyfileobj(fileobj, sink, _block_size)
+        except (IOError, OSError):
+            # tar stopped reading; its exit status tells whether it failed
+            pass
+        finally:
+            try:
+                sink.close()
+            except (IOError, OSError):
+                pass
+
+    _check_pipeline(commands, processes)
+
+
+def _check_pipeline(commands, processes):
+    """Wait for a decompressor | tar pipeline and raise if it failed."""
+    status = [p.wait() for p in processes]
+    # tar may exit once it reads the end-of-archive marker, killing the
+    # decompressor with SIGPIPE before it wrote trailing padding.
+    if status[-1] == 0 and all(s in (0, -signal.SIGPIPE) for s in status):
+        return
+    raise ProcessError('Command exited with status %s:' % status,
+                       "'%s'" % ' | '.join(' '.join(c) for c in commands))
+
+
+def _untar_zstd_frames(fileobj, command, tar, dest):
+    """Extract a tarball compressed in independent zstd frames, running
+    a decompressor on several frames at a time."""
+    tar_command = tar.exe + ['-oxf', '-', '-C', dest]
+    process = subprocess.Popen(tar_command, stdin=subprocess.PIPE)
+    # each frame is decompressed by its own single-threaded process
+    frames = _ParallelFilter(
+        [arg for arg in command if arg != '-T0'], process.stdin.write)
+    try:
+        for frame in _zstd_frames(fileobj):
+            frames.submit(frame)
+        frames.close()
+    except (IOError, OSError):
+        # tar stopped reading; its exit status tells whether it failed
+        pass
+    finally:
+        frames.terminate()
+        try:
+            process.stdin.close()
+        except (IOError, OSError):
+            pass
+        process.wait()
+    _check_pipeline([tar_command], [process])
+
+
+def _zstd_frames(fileobj):
+    """Split a zstd stream into its frames, without decompressing them.
+
+    Skippable frames are dropped.
+    """
+    def read(size):
+        data = fileobj.read(size)
+        if len(data) != size:
+            raise ProcessError('Truncated zstd stream')
+        return data
+
+    while True:
+        magic = fileobj.read(4)
+        if not magic:
+            return
+        if len(magic) != 4:
+            raise ProcessError('Truncated zstd stream')
+        number = struct.unpack('<I', magic)[0]
+        if 0x184D2A50 <= number <= 0x184D2A5F:
+            size = struct.unpack('<I', read(4))[0]
+            read(size)
+            continue
+        if number != 0xFD2FB528:
+            raise ProcessError('Invalid zstd frame')
+
+        frame = [magic, read(1)]
+        descriptor = bytearray(frame[-1])[0]
+        single_segment = descriptor >> 5 & 1
+        header_size = (
+            (0 if single_segment else 1) +
+            (0, 1, 2, 4)[descriptor & 3] +
+            (single_segment, 2, 4, 8)[descriptor >> 6])
+        frame.append(read(header_size))
+
+        last = False
+        while not last:
+            block = bytearray(read(3))
+            block = block[0] | block[1] << 8 | block[2] << 16
+            last = block & 1
+            rle = (block >> 1 & 3) == 1
+            frame.append(struct.pack('<I', block)[:3])
+            frame.append(read(1 if rle else block >> 3))
+        if descriptor >> 2 & 1:
+            frame.append(read(4))  # content checksum
+        yield b''.join(frame)
+
+
+def _filter(command, data):
+    """Run ``command`` with ``data`` on stdin and return its output."""
+    process = subprocess.Popen(
+        command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    output = process.communicate(data)[0]
+    if process.returncode != 0:
+        raise ProcessError('Command exited with status %d:' %
+                           process.returncode, "'%s'" % ' '.join(command))
+    return output
+
+
+class _ParallelFilter(object):
+    """Runs a command on chunks of data, several at a time, and passes the
+    outputs to ``write`` in the order the chunks were submitted."""
+
+    def __init__(self, command, write, jobs=None):
+        self.command = command
+        self.write = write
+        self.jobs = jobs or multiprocessing.cpu_count()
+        self.pool = multiprocessing.pool.ThreadPool(self.jobs)
+        self.pending = collections.deque()
+
+    def submit(self, chunk):
+        self.pending.append(
+            self.pool.apply_async(_filter, (self.command, chunk)))
+        # bound the amount of data in memory
+        if len(self.pending) > self.jobs:
+            self.write(self.pending.popleft().get())
+
+    def close(self):
+        """Write the remaining outputs."""
+        try:
+            while self.pending:
+                self.write(self.pending.popleft().get())
+        finally:
+            self.terminate()
+
+    def terminate(self):
+        self.pending.clear()
+        self.pool.terminate()
+        self.pool.join()
+
+
+class _FramedCompressor(object):
+    """Writable stream compressing every ``zstd_frame_size`` bytes written
+    to it independently, several chunks at a time."""
+
+    def __init__(self, fileobj, command):
+        # each frame is compressed by its own single-threaded process
+        self.filter = _ParallelFilter(
+            [arg for arg in command if arg != '-T0'], fileobj.write)
+        self.buffer = []
+        self.buffered = 0
+
+    def write(self, data):
+        self.buffer.append(data)
+        self.buffered += len(data)
+        if self.buffered >= zstd_frame_size:
+            data = b''.join(self.buffer)
+            while len(data) >= zstd_frame_size:
+                self.filter.submit(data[:zstd_frame_size])
+                data = data[zstd_frame_size:]
+            self.buffer = [data]
+            self.buffered = len(data)
+
+    def close(self):
+        if self.buffered:
+            self.filter.submit(b''.join(self.buffer))
+            self.buffer = []
+            self.buffered = 0
+        self.filter.close()
+
+
+def _safe_members(tar):
+    """Members of ``tar``, refusing those that would be extracted outside
+    of the destination directory, like ``tar`` does by default."""
+    for member in tar:
+        names = [member.name]
+        if member.islnk():
+            names.append(member.linkname)
+        for name in names:
+            if os.path.isabs(name) or '..' in name.split('/'):
+                raise tarfile.ExtractError(
+                    'Refusing to extract unsafe tarball member: %s' % name)
+        yield member
+
+
+def _untar_in_python(fileobj, dest):
+    """Extract a tarball with ``tarfile``, reading it as a stream."""
+    with closing(tarfile.open(fileobj=fileobj, mode='r|*')) as tar:
+        tar.extractall(dest, members=_safe_members(tar))
 
 
 def strip_extension(path):
@@ -122,13 +122,23 @@ class Checker(object):
        You can trade read performance and memory usage by
        adjusting the block_size optional arg.  By default it's
        a 1MB (2**20 bytes) buffer.
+
+       Data can also be checked incrementally, e.g. while it is being
+       downloaded, by passing it to ``update()`` and then calling
+       ``check_updates()``.  Pass the ``algorithm`` optional arg to
+       compute a checksum when no digest is known yet.
     """
 
     def __init__(self, hexdigest, **kwargs):
         self.block_size = kwargs.get('block_size', 2**20)
         self.hexdigest = hexdigest
         self.sum = None
-        self.hash_fun = hash_fun_for_digest(hexdigest)
+        algorithm = kwargs.get('algorithm')
+        if algorithm:
+            self.hash_fun = hash_fun_for_algo(algorithm)
+        else:
+            self.hash_fun = hash_fun_for_digest(hexdigest)
+        self._hasher = None
 
     @property
     def hash_name(self):
@@ -144,6 +154,22 @@ def check(self, filename):
             self.hash_fun, filename, block_size=self.block_size)
         return self.sum == self.hexdigest
 
+    def update(self, data):
+        """Add a chunk of data to the checksum computed incrementally."""
+        if self._hasher is None:
+            self._hasher = self.hash_fun()
+        self._hasher.update(data)
+
+    def check_updates(self):
+        """Check the checksum of all the data passed to ``update()`` so far
+           against self.hexdigest.  Return True if they match, False
+           otherwise.  Actual checksum is stored in self.sum.
+        """
+        if self._hasher is None:
+            self._hasher = self.hash_fun()
+        self.sum = self._hasher.hexdigest()
+        return self.sum == self.hexdigest
+
 
 def prefix_bits(byte_array, bits):
     """Return the first <bits> bits of a byte array as an integer."""
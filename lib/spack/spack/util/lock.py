@@ -21,8 +21,15 @@ class Lock(llnl.util.lock.Lock):
     This overrides the ``_lock()`` and ``_unlock()`` methods from
     ``llnl.util.lock`` so that all the lock API calls will succeed, but
     the actual locking mechanism can be disabled via ``_enable_locks``.
+
+    Unless ``blocking`` is passed explicitly, the ``config:lock_wait``
+    setting decides whether contended locks are polled or waited for with
+    blocking calls.
     """
     def __init__(self, *args, **kwargs):
+        if 'blocking' not in kwargs:
+            wait = spack.config.get('config:lock_wait', 'poll')
+            kwargs['blocking'] = (wait == 'block')
         super(Lock, self).__init__(*args, **kwargs)
         self._enable = spack.config.get('config:locks', True)
 
@@ -4,8 +4,17 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import ast
+import binascii
 import hashlib
+import json
+import os
+import sys
 
+import llnl.util.tty as tty
+from llnl.util.lang import memoized
+
+import spack
+import spack.caches
 import spack.repo
 import spack.package
 import spack.directives
@@ -124,24 +133,54 @@ def visit_FunctionDef(self, node):  # noqa
         return None
 
 
+class MultiMethodConditions(ast.NodeVisitor):
+    """Collect the conditions of @when-decorated methods, in the order in
+    which ``TagMultiMethods`` evaluates them.
+
+    Conditions that are not string literals are collected as ``None``.
+    """
+    def __init__(self):
+        self.conditions = []
+
+    def visit_FunctionDef(self, node):  # noqa
+        if node.decorator_list:
+            dec = node.decorator_list[0]
+            if isinstance(dec, ast.Call) and dec.func.id == 'when':
+                try:
+                    self.conditions.append(dec.args[0].s)
+                except AttributeError:
+                    self.conditions.append(None)
+
+
 def package_content(spec):
     return ast.dump(package_ast(spec))
 
 
 def package_hash(spec, content=None):
+    """Hash of the source of the package of a spec, without docstrings,
+    directives and the methods whose @when does not apply to the spec.
+
+    Unless ``content`` is given, hashes are cached (see
+    ``_cached_package_hash()``).
+    """
     if content is None:
-        content = package_content(spec)
+        return _cached_package_hash(spack.spec.Spec(spec))
     return hashlib.sha256(content.encode('utf-8')).digest().lower()
 
 
 def package_ast(spec):
     spec = spack.spec.Spec(spec)
+    return _resolve_package_ast(spec, _parse_package(spec))
 
+
+def _parse_package(spec):
     filename = spack.repo.path.filename_for_package_name(spec.name)
     with open(filename) as f:
         text = f.read()
-        root = ast.parse(text)
+        return ast.parse(text)
+
 
+def _resolve_package_ast(spec, root):
     root = RemoveDocstrings().visit(root)
 
     RemoveDirectives(spec).visit(root)
@@ -153,5 +192,105 @@ def package_ast(spec):
     return root
 
 
+#: Version of the format of package hash cache entries
+_cache_version = 1
+
+#: Package hash cache entries, by package file name
+_package_hashes = {}
+
+
+@memoized
+def _hashing_environment():
+    """Digest of what package hashes depend on besides the package file.
+
+    The AST dump differs between Python versions, and the directives and
+    metadata attributes removed from it can change between Spack versions,
+    while the ``misc_cache`` is shared by all of them.
+    """
+    environment = [list(sys.version_info[:2]), spack.spack_version,
+                   sorted(spack.directives.__all__),
+                   sorted(spack.package.Package.metadata_attrs)]
+    return hashlib.sha256(
+        json.dumps(environment).encode('utf-8')).hexdigest()
+
+
+def _cache_key(filename):
+    key = filename + _hashing_environment()
+    return 'package-hashes/{0}.json'.format(
+        hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+
+def _cached_package_hash(spec):
+    """Return ``package_hash(spec)``, parsing the package file only if it
+    changed, or if the spec satisfies a combination of its @when conditions
+    that was not hashed before.
+
+    Hashes are cached in memory and in the ``misc_cache``, by the path,
+    modification time and size of the package file.  The ``misc_cache``
+    has separate entries for each Python and Spack version.  Each entry
+    records the conditions of the multimethods of the package, and maps
+    the conditions a spec satisfies to the hash of the package for that
+    spec.
+    """
+    filename = spack.repo.path.filename_for_package_name(spec.name)
+    st = os.stat(filename)
+    stamp = [_cache_version, st.st_mtime, st.st_size]
+
+    entry = _package_hashes.get(filename)
+    if entry is None or entry['stamp'] != stamp:
+        entry = _read_cache_entry(filename)
+        if entry is None or entry['stamp'] != stamp:
+            entry = None
+        _package_hashes[filename] = entry
+
+    root = None
+    if entry is None:
+        root = _parse_package(spec)
+        mmc = MultiMethodConditions()
+        mmc.visit(root)
+        entry = {'stamp': stamp, 'conditions': mmc.conditions, 'hashes': {}}
+        _package_hashes[filename] = entry
+
+    key = ''.join(
+        '-' if c is None else '1' if spec.satisfies(c, strict=True) else '0'
+        for c in entry['conditions'])
+    digest = entry['hashes'].get(key)
+    if digest is None:
+        if root is None:
+            root = _parse_package(spec)
+        content = ast.dump(_resolve_package_ast(spec, root))
+        digest = hashlib.sha256(content.encode('utf-8')).digest().lower()
+        entry['hashes'][key] = binascii.hexlify(digest).decode('ascii')
+        _write_cache_entry(filename, entry)
+        return digest
+    return binascii.unhexlify(digest)
+
+
+def _read_cache_entry(filename):
+    """Return the cached package hashes of a package file, or None."""
+    misc_cache = spack.caches.misc_cache
+    key = _cache_key(filename)
+    try:
+        if not misc_cache.init_entry(key):
+            return None
+        with misc_cache.read_transaction(key) as f:
+            return json.load(f)
+    except (ValueError, IOError, OSError, spack.error.SpackError) as e:
+        tty.debug("Ignoring cached hashes of {0}: {1}".format(filename, e))
+        return None
+
+
+def _write_cache_entry(filename, entry):
+    """Store the package hashes of a package file in the ``misc_cache``."""
+    misc_cache = spack.caches.misc_cache
+    key = _cache_key(filename)
+    try:
+        misc_cache.init_entry(key)
+        with misc_cache.write_transaction(key) as (old, new):
+            json.dump(entry, new)
+    except (IOError, OSError, spack.error.SpackError) as e:
+        tty.debug("Could not cache hashes of {0}: {1}".format(filename, e))
+
+
 class PackageHashError(spack.error.SpackError):
     """Raised for all errors encountered during package hashing."""
@@ -3,6 +3,9 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import re
+import textwrap
+
 
 def comma_list(sequence, article=''):
     if type(sequence) != list:
@@ -55,3 +58,22 @@ def plural(n, singular, plural=None, show_n=True):
         return "%s%s" % (number, plural)
     else:
         return "%s%ss" % (number, singular)
+
+
+def format_doc(doc, indent=0):
+    """Wrap a docstring at 72 characters and indent each of its lines.
+
+    Arguments:
+        doc (str or None): docstring to format
+        indent (int): number of spaces to indent each line with
+
+    Returns:
+        (str): the formatted lines, each ending with a newline, or an empty
+            string if there is no docstring
+    """
+    if not doc:
+        return ""
+
+    doc = re.sub(r'\s+', ' ', doc)
+    return ''.join((" " * indent) + line + "\n"
+                   for line in textwrap.wrap(doc, 72))
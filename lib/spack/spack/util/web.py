@@ -6,19 +6,27 @@
 from __future__ import print_function
 
 import codecs
+import collections
 import errno
+import hashlib
+import json
 import multiprocessing.pool
 import os
 import os.path
 import re
 import shutil
+import socket
 import ssl
 import sys
+import threading
 import traceback
 
 import six
-from six.moves.urllib.error import URLError
-from six.moves.urllib.request import urlopen, Request
+from six.moves import http_client
+from six.moves import queue
+from six.moves.urllib.error import HTTPError, URLError
+from six.moves.urllib.parse import urljoin
+from six.moves.urllib.request import getproxies, urlopen, Request
 
 try:
     # Python 2 had these in the HTMLParser package.
@@ -48,6 +56,9 @@ class HTMLParseError(Exception):
 # Timeout in seconds for web requests
 _timeout = 10
 
+# Maximum number of redirects followed when fetching a page
+_max_redirects = 10
+
 
 class LinkParser(HTMLParser):
     """This parser just takes an HTML page and strips out the hrefs on the
@@ -86,26 +97,29 @@ def uses_ssl(parsed_url):
     ))(sys.version_info)
 
 
-def read_from_url(url, accept_content_type=None):
-    url = url_util.parse(url)
-    context = None
-
-    verify_ssl = spack.config.get('config:verify_ssl')
-
+def _ssl_context(url):
+    """Return the SSL context to use for a parsed URL, or None."""
     # Don't even bother with a context unless the URL scheme is one that uses
     # SSL certs.
-    if uses_ssl(url):
-        if verify_ssl:
-            if __UNABLE_TO_VERIFY_SSL:
-                # User wants SSL verification, but it cannot be provided.
-                warn_no_ssl_cert_checking()
-            else:
-                # User wants SSL verification, and it *can* be provided.
-                context = ssl.create_default_context()  # novm
-        else:
-            # User has explicitly indicated that they do not want SSL
-            # verification.
-            context = ssl._create_unverified_context()
+    if not uses_ssl(url):
+        return None
+
+    if spack.config.get('config:verify_ssl'):
+        if __UNABLE_TO_VERIFY_SSL:
+            # User wants SSL verification, but it cannot be provided.
+            warn_no_ssl_cert_checking()
+            return None
+        # User wants SSL verification, and it *can* be provided.
+        return ssl.create_default_context()  # novm
+
+    # User has explicitly indicated that they do not want SSL
+    # verification.
+    return ssl._create_unverified_context()
+
+
+def read_from_url(url, accept_content_type=None):
+    url = url_util.parse(url)
+    context = _ssl_context(url)
 
     req = Request(url_util.format(url))
     content_type = None
@@ -309,152 +323,409 @@ def list_url(url):
             for key in _iter_s3_prefix(s3, url)))
 
 
-def spider(root_urls, depth=0, concurrency=32):
-    """Get web pages from root URLs.
+class _ConnectionPool(object):
+    """Idle keep-alive HTTP connections, by scheme, host and port.
 
-    If depth is specified (e.g., depth=2), then this will also follow
-    up to <depth> levels of links from each root.
+    Spidering a site fetches many pages from the same host; reusing a
+    connection saves the TCP and TLS handshakes of each new request.
+    """
 
-    Args:
-        root_urls (str or list of str): root urls used as a starting point
-            for spidering
-        depth (int): level of recursion into links
-        concurrency (int): number of simultaneous requests that can be sent
+    def __init__(self, max_idle=8):
+        self.max_idle = max_idle
+        self._idle = collections.defaultdict(list)
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """Return an ``(HTTPConnection, reused)`` tuple for a parsed URL."""
+        key = (url.scheme, url.netloc)
+        with self._lock:
+            if self._idle[key]:
+                return self._idle[key].pop(), True
+
+        if url.scheme == 'https':
+            context = _ssl_context(url)
+            if context is None:
+                connection = http_client.HTTPSConnection(
+                    url.netloc, timeout=_timeout)
+            else:
+                connection = http_client.HTTPSConnection(
+                    url.netloc, timeout=_timeout, context=context)
+        else:
+            connection = http_client.HTTPConnection(
+                url.netloc, timeout=_timeout)
+        return connection, False
+
+    def put(self, url, connection):
+        """Keep a connection whose last response was read to the end."""
+        key = (url.scheme, url.netloc)
+        with self._lock:
+            if len(self._idle[key]) < self.max_idle:
+                self._idle[key].append(connection)
+                return
+        connection.close()
+
+    def clear(self):
+        """Close all idle connections."""
+        with self._lock:
+            for connections in self._idle.values():
+                for connection in connections:
+                    connection.close()
+            self._idle.clear()
+
+
+#: Keep-alive connections used by the spider
+_connections = _ConnectionPool()
+
+
+def _uses_connection_pool(url):
+    """Whether a page can be fetched with a pooled connection.
+
+    Proxied requests are left to ``urlopen``, which knows how to route
+    them.
+    """
+    return (url.scheme in ('http', 'https') and
+            url.scheme not in getproxies())
+
+
+def _request_page(url, headers):
+    """Send a GET request for a parsed URL over a pooled connection.
+
+    A reused connection may have been closed by the server in the
+    meantime, so requests on reused connections are retried once on a
+    new one.
 
     Returns:
-        A dict of pages visited (URL) mapped to their full text and the
-        set of visited links.
+        A tuple of the connection and the response.
     """
-    # Cache of visited links, meant to be captured by the closure below
-    _visited = set()
-
-    def _spider(url, collect_nested):
-        """Fetches URL and any pages it links to.
-
-        Prints out a warning only if the root can't be fetched; it ignores
-        errors with pages that the root links to.
-
-        Args:
-            url (str): url being fetched and searched for links
-            collect_nested (bool): whether we want to collect arguments
-                for nested spidering on the links found in this url
-
-        Returns:
-            A tuple of:
-            - pages: dict of pages visited (URL) mapped to their full text.
-            - links: set of links encountered while visiting the pages.
-            - spider_args: argument for subsequent call to spider
-        """
-        pages = {}  # dict from page URL -> text content.
-        links = set()  # set of all links seen on visited pages.
-        subcalls = []
+    path = url.path or '/'
+    if url.query:
+        path += '?' + url.query
 
+    while True:
+        connection, reused = _connections.get(url)
         try:
-            response_url, _, response = read_from_url(url, 'text/html')
-            if not response_url or not response:
-                return pages, links, subcalls
+            connection.request('GET', path, headers=headers)
+            return connection, connection.getresponse()
+        except ssl.SSLError as e:
+            connection.close()
+            raise URLError(e)
+        except (http_client.HTTPException, socket.error):
+            connection.close()
+            if not reused:
+                raise
+
+
+def _fetch_page(url, cached=None):
+    """Fetch an HTML page with a pooled keep-alive connection.
+
+    Redirects are followed. If a cached response is given, the request
+    is conditional on its ``ETag`` and ``Last-Modified`` validators, and
+    the cached page is used if the server reports it as not modified.
+
+    Args:
+        url (str): http or https URL of the page
+        cached (dict or None): cache entry of a previous response, as
+            returned by this function
 
-            page = codecs.getreader('utf-8')(response).read()
-            pages[response_url] = page
+    Returns:
+        A tuple of the URL of the page after redirects, the text of the
+        page (None if it is not HTML) and the cache entry for the
+        response (None if the response has no validators).
+    """
+    headers = {'User-Agent': 'Spack/' + spack.spack_version}
+    for _ in range(_max_redirects + 1):
+        parsed = url_util.parse(url)
+        request_headers = dict(headers)
+        if cached and cached['url'] == url:
+            if cached.get('etag'):
+                request_headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                request_headers['If-Modified-Since'] = cached['last_modified']
+
+        connection, response = _request_page(parsed, request_headers)
+        content_type = response.getheader('Content-Type')
+        if response.status == 200 and not (
+                content_type and content_type.startswith('text/html')):
+            # Don't download tarballs and other large files
+            tty.debug("ignoring page {0}{1}{2}".format(
+                url, " with content type " if content_type else "",
+                content_type or ""))
+            connection.close()
+            return None, None, None
+
+        body = response.read()
+        if response.will_close:
+            connection.close()
+        else:
+            _connections.put(parsed, connection)
 
-            # Parse out the links in the page
-            link_parser = LinkParser()
-            link_parser.feed(page)
+        location = response.getheader('Location')
+        if response.status in (301, 302, 303, 307, 308) and location:
+            url = urljoin(url, location)
+            continue
 
-            while link_parser.links:
-                raw_link = link_parser.links.pop()
-                abs_link = url_util.join(
-                    response_url,
-                    raw_link.strip(),
-                    resolve_href=True)
-                links.add(abs_link)
+        if response.status == 304 and cached and cached['url'] == url:
+            tty.debug("SPIDER: [cached={0}]".format(url))
+            return url, cached['page'], cached
 
-                # Skip stuff that looks like an archive
-                if any(raw_link.endswith(s) for s in ALLOWED_ARCHIVE_TYPES):
-                    continue
+        if response.status != 200:
+            raise HTTPError(url, response.status, response.reason,
+                            response.msg, None)
 
-                # Skip already-visited links
-                if abs_link in _visited:
-                    continue
+        page = body.decode('utf-8')
+        etag = response.getheader('ETag')
+        last_modified = response.getheader('Last-Modified')
+        entry = None
+        if etag or last_modified:
+            entry = {'url': url, 'page': page, 'etag': etag,
+                     'last_modified': last_modified}
+        return url, page, entry
 
-                # If we're not at max depth, follow links.
-                if collect_nested:
-                    subcalls.append((abs_link,))
-                    _visited.add(abs_link)
+    raise URLError('Too many redirects: {0}'.format(url))
 
-        except URLError as e:
-            tty.debug(str(e))
 
-            if hasattr(e, 'reason') and isinstance(e.reason, ssl.SSLError):
-                tty.warn("Spack was unable to fetch url list due to a "
-                         "certificate verification problem. You can try "
-                         "running spack -k, which will not check SSL "
-                         "certificates. Use this at your own risk.")
+def _response_cache_key(url):
+    return 'web/{0}.json'.format(
+        hashlib.sha256(url.encode('utf-8')).hexdigest())
 
-        except HTMLParseError as e:
-            # This error indicates that Python's HTML parser sucks.
-            msg = "Got an error parsing HTML."
 
-            # Pre-2.7.3 Pythons in particular have rather prickly HTML parsing.
-            if sys.version_info[:3] < (2, 7, 3):
-                msg += " Use Python 2.7.3 or newer for better HTML parsing."
+def _read_cached_response(url):
+    """Return the cached response for a URL, or None."""
+    import spack.caches
+    misc_cache = spack.caches.misc_cache
+    key = _response_cache_key(url)
+    try:
+        if not misc_cache.init_entry(key):
+            return None
+        with misc_cache.read_transaction(key) as f:
+            return json.load(f)
+    except (ValueError, IOError, OSError, spack.error.SpackError) as e:
+        tty.debug("Ignoring cached response for {0}: {1}".format(url, e))
+        return None
+
+
+def _write_cached_response(url, entry):
+    """Store the response for a URL in the ``misc_cache``."""
+    import spack.caches
+    misc_cache = spack.caches.misc_cache
+    key = _response_cache_key(url)
+    try:
+        misc_cache.init_entry(key)
+        with misc_cache.write_transaction(key) as (old, new):
+            json.dump(entry, new)
+    except (IOError, OSError, spack.error.SpackError) as e:
+        tty.debug("Could not cache response for {0}: {1}".format(url, e))
 
-            tty.warn(msg, url, "HTMLParseError: " + str(e))
 
-        except Exception as e:
-            # Other types of errors are completely ignored,
-            # except in debug mode
-            tty.debug("Error in _spider: %s:%s" % (type(e), str(e)),
-                      traceback.format_exc())
+def _spider(url, cached):
+    """Fetches a URL and parses the links in it.
 
-        finally:
-            tty.debug("SPIDER: [url={0}]".format(url))
+    Prints out a warning only for errors the user can act upon; other
+    errors are ignored, except in debug mode.
 
-        return pages, links, subcalls
+    Args:
+        url (str): url being fetched and searched for links
+        cached (dict or None): cached response for the url, if any
 
-    # TODO: Needed until we drop support for Python 2.X
-    def star(func):
-        def _wrapper(args):
-            return func(*args)
-        return _wrapper
+    Returns:
+        A tuple of:
+        - the url of the page after redirects, or None
+        - the full text of the page, or None
+        - the list of links in the page
+        - the list of links in the page that may be spidered further
+        - the new cache entry for the url, or None
+    """
+    response_url, page, links, subpages, entry = None, None, [], [], None
 
-    if isinstance(root_urls, six.string_types):
-        root_urls = [root_urls]
+    try:
+        parsed = url_util.parse(url)
+        if _uses_connection_pool(parsed):
+            response_url, page, entry = _fetch_page(url, cached)
+            if entry is cached:
+                entry = None
+        else:
+            response_url, _, response = read_from_url(url, 'text/html')
+            if response_url and response:
+                page = codecs.getreader('utf-8')(response).read()
+        if not response_url or page is None:
+            return None, None, [], [], None
+
+        # Parse out the links in the page
+        link_parser = LinkParser()
+        link_parser.feed(page)
+
+        for raw_link in reversed(link_parser.links):
+            abs_link = url_util.join(
+                response_url,
+                raw_link.strip(),
+                resolve_href=True)
+            links.append(abs_link)
+
+            # Skip stuff that looks like an archive
+            if not any(raw_link.endswith(s) for s in ALLOWED_ARCHIVE_TYPES):
+                subpages.append(abs_link)
+
+    except URLError as e:
+        tty.debug(str(e))
+
+        if hasattr(e, 'reason') and isinstance(e.reason, ssl.SSLError):
+            tty.warn("Spack was unable to fetch url list due to a "
+                     "certificate verification problem. You can try "
+                     "running spack -k, which will not check SSL "
+                     "certificates. Use this at your own risk.")
+
+    except HTMLParseError as e:
+        # This error indicates that Python's HTML parser sucks.
+        msg = "Got an error parsing HTML."
+
+        # Pre-2.7.3 Pythons in particular have rather prickly HTML parsing.
+        if sys.version_info[:3] < (2, 7, 3):
+            msg += " Use Python 2.7.3 or newer for better HTML parsing."
+
+        tty.warn(msg, url, "HTMLParseError: " + str(e))
+
+    except Exception as e:
+        # Other types of errors are completely ignored,
+        # except in debug mode
+        tty.debug("Error in _spider: %s:%s" % (type(e), str(e)),
+                  traceback.format_exc())
 
-    # Clear the local cache of visited pages before starting the search
-    _visited.clear()
+    finally:
+        tty.debug("SPIDER: [url={0}]".format(url))
+
+    return response_url, page, links, subpages, entry
+
+
+def _crawl(roots, concurrency=32):
+    """Fetch web pages and follow their links, each one only once.
 
-    current_depth = 0
-    pages, links, spider_args = {}, set(), []
+    Pages are fetched as soon as the page linking to them is parsed, so
+    that one slow page does not hold back the others.  Responses of web
+    servers are cached in the ``misc_cache`` and revalidated on the next
+    crawl.
 
-    collect = current_depth < depth
-    for root in root_urls:
-        root = url_util.parse(root)
-        spider_args.append((root, collect))
+    Args:
+        roots (dict): maps the root URLs to the levels of links to follow
+            from them
+        concurrency (int): number of simultaneous requests that can be sent
+
+    Returns:
+        A dict mapping each URL fetched to the tuple returned by
+        ``_spider()`` for it, less the cache entry.
+    """
+    fetched = {}
+    depths = {}  # URL -> levels of links still to follow from it
+    results = queue.Queue()
+    pending = [0]
 
     tp = multiprocessing.pool.ThreadPool(processes=concurrency)
+
+    def submit(url):
+        cached = None
+        if _uses_connection_pool(url_util.parse(url)):
+            cached = _read_cached_response(url)
+        pending[0] += 1
+        tp.apply_async(_spider, (url, cached),
+                       callback=lambda result: results.put((url, result)))
+
+    def visit(url, depth):
+        stack = [(url, depth)]
+        while stack:
+            url, depth = stack.pop()
+            if depth <= depths.get(url, -1):
+                continue
+
+            first_visit = url not in depths
+            depths[url] = depth
+            if url in fetched:
+                # Reached again with more levels left to follow
+                if depth > 0:
+                    stack.extend((link, depth - 1)
+                                 for link in fetched[url][3])
+            elif first_visit:
+                submit(url)
+
     try:
-        while current_depth <= depth:
-            tty.debug("SPIDER: [depth={0}, max_depth={1}, urls={2}]".format(
-                current_depth, depth, len(spider_args))
-            )
-            results = tp.map(star(_spider), spider_args)
-            spider_args = []
-            collect = current_depth < depth
-            for sub_pages, sub_links, sub_spider_args in results:
-                sub_spider_args = [x + (collect,) for x in sub_spider_args]
-                pages.update(sub_pages)
-                links.update(sub_links)
-                spider_args.extend(sub_spider_args)
-
-            current_depth += 1
+        for url, depth in roots.items():
+            visit(url, depth)
+
+        while pending[0]:
+            url, result = results.get()
+            pending[0] -= 1
+
+            if result[4] is not None:
+                _write_cached_response(url, result[4])
+            fetched[url] = result[:4]
+
+            depth = depths[url]
+            if depth > 0:
+                for link in result[3]:
+                    visit(link, depth - 1)
+
+            tty.debug("SPIDER: [fetched={0}, pending={1}]".format(
+                len(fetched), pending[0]))
     finally:
         tp.terminate()
         tp.join()
+        _connections.clear()
+
+    return fetched
+
+
+def _collect(fetched, roots):
+    """Collect the pages and links reachable from some roots of a crawl.
+
+    Args:
+        fetched (dict): result of ``_crawl()``
+        roots (dict): maps root URLs to the levels of links to follow
+
+    Returns:
+        A dict of pages visited (URL) mapped to their full text and the
+        set of visited links.
+    """
+    pages, links = {}, set()
+    depths = {}
+    stack = list(roots.items())
+    while stack:
+        url, depth = stack.pop()
+        if depth <= depths.get(url, -1) or url not in fetched:
+            continue
+        depths[url] = depth
+
+        response_url, page, page_links, subpages = fetched[url]
+        if page is None:
+            continue
+        pages[response_url] = page
+        links.update(page_links)
+        if depth > 0:
+            stack.extend((link, depth - 1) for link in subpages)
 
     return pages, links
 
 
+def spider(root_urls, depth=0, concurrency=32):
+    """Get web pages from root URLs.
+
+    If depth is specified (e.g., depth=2), then this will also follow
+    up to <depth> levels of links from each root.
+
+    Args:
+        root_urls (str or list of str): root urls used as a starting point
+            for spidering
+        depth (int): level of recursion into links
+        concurrency (int): number of simultaneous requests that can be sent
+
+    Returns:
+        A dict of pages visited (URL) mapped to their full text and the
+        set of visited links.
+    """
+    if isinstance(root_urls, six.string_types):
+        root_urls = [root_urls]
+
+    roots = dict((url_util.format(root), depth) for root in root_urls)
+    return _collect(_crawl(roots, concurrency), roots)
+
+
 def _urlopen(req, *args, **kwargs):
     """Wrapper for compatibility with old versions of Python."""
     url = req
@@ -493,9 +764,50 @@ def find_versions_of_archive(
             Defaults to 0.
         concurrency (int): maximum number of concurrent requests
     """
-    if not isinstance(archive_urls, (list, tuple)):
-        archive_urls = [archive_urls]
+    return find_versions_of_archives(
+        [(archive_urls, list_url, list_depth)], concurrency)[0]
+
+
+def find_versions_of_archives(queries, concurrency=32):
+    """Scrape web pages for new versions of many tarballs at once.
 
+    The list pages of all the queries are spidered in a single run, so
+    that pages shared by several queries are fetched only once and no
+    query waits for the others to start.
+
+    Args:
+        queries (list): ``(archive_urls, list_url, list_depth)`` tuples,
+            with the same meaning as the arguments of
+            ``find_versions_of_archive()``
+        concurrency (int): maximum number of concurrent requests
+
+    Returns:
+        A list with the dict of versions to URLs found for each query.
+    """
+    queries = [
+        (list(archive_urls) if isinstance(archive_urls, (list, tuple))
+         else [archive_urls], list_url, list_depth)
+        for archive_urls, list_url, list_depth in queries]
+
+    roots = []
+    for archive_urls, list_url, list_depth in queries:
+        roots.append(dict(
+            (lurl, list_depth)
+            for lurl in _find_list_urls(archive_urls, list_url)))
+
+    # Grab all the web pages to scrape.
+    all_roots = {}
+    for query_roots in roots:
+        for lurl, depth in query_roots.items():
+            all_roots[lurl] = max(depth, all_roots.get(lurl, depth))
+    fetched = _crawl(all_roots, concurrency)
+
+    return [_find_versions_in_links(archive_urls, _collect(fetched, r)[1])
+            for (archive_urls, _, _), r in zip(queries, roots)]
+
+
+def _find_list_urls(archive_urls, list_url):
+    """Return the set of URLs to spider for versions of some archives."""
     # Generate a list of list_urls based on archive urls and any
     # explicitly listed list_url in the package
     list_urls = set()
@@ -511,9 +823,11 @@ def find_versions_of_archive(
             additional_list_urls.add(lurl + '/')
     list_urls |= additional_list_urls
 
-    # Grab some web pages to scrape.
-    pages, links = spider(list_urls, depth=list_depth, concurrency=concurrency)
+    return set(url_util.format(lurl) for lurl in list_urls)
+
 
+def _find_versions_in_links(archive_urls, links):
+    """Return a dict of versions to URLs among links to some archives."""
     # Scrape them for archive URLs
     regexes = []
     for aurl in archive_urls:
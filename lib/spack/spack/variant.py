@@ -552,13 +552,21 @@ def concrete(self):
             v in self for v in self.spec.package_class.variants
         )
 
-    def copy(self):
+    def copy(self, shallow=False):
         """Return an instance of VariantMap equivalent to self.
 
+        Args:
+            shallow (bool): if True the copy holds the same variant
+                instances as self instead of copies of them, so neither
+                map must be modified afterwards
+
         Returns:
             VariantMap: a copy of self
         """
         clone = VariantMap(self.spec)
+        if shallow:
+            clone.dict.update(self.dict)
+            return clone
         for name, variant in self.items():
             clone[name] = variant.copy()
         return clone
@@ -26,9 +26,9 @@
 """
 import re
 import numbers
-from bisect import bisect_left
+from bisect import bisect_left, bisect_right
 from functools import wraps
-from six import string_types
+from six import integer_types, string_types
 
 import spack.error
 from spack.util.spack_yaml import syaml_dict
@@ -42,6 +42,25 @@
 # Infinity-like versions. The order in the list implies the comparison rules
 infinity_versions = ['develop', 'main', 'master', 'head', 'trunk']
 
+# Sort keys of the version components. Letters sort before numbers, which
+# sort before infinity-like versions.
+_letters, _numbers, _infinity = 0, 1, 2
+
+#: Sort key of a component greater than any version component; appended to
+#: a version's key, it is greater than the key of any version it contains
+_beyond = (3,)
+
+#: Sort keys of the ends of open version ranges
+_open_start, _open_end = (0,), (2,)
+
+
+def _component_key(component):
+    if isinstance(component, integer_types):
+        return (_numbers, component)
+    if component in infinity_versions:
+        return (_infinity, -infinity_versions.index(component))
+    return (_letters, component)
+
 
 def int_if_int(string):
     """Convert a string to int if possible.  Otherwise, return a string."""
@@ -114,6 +133,12 @@ def __init__(self, string):
         # Store the separators from the original version string as well.
         self.separators = tuple(re.split(segment_regex, string)[1:])
 
+        # Precompute the keys used to compare and sort versions, so that
+        # comparisons are simple tuple comparisons.
+        self._cmp_key = tuple(_component_key(c) for c in self.version)
+        self._sort_key = ((1, self._cmp_key), (1, self._cmp_key))
+        self._upper_key = (1, self._cmp_key + (_beyond,))
+
     @property
     def dotted(self):
         """The dotted representation of the version.
@@ -264,55 +289,35 @@ def __format__(self, format_spec):
     def concrete(self):
         return self
 
-    @coerced
     def __lt__(self, other):
         """Version comparison is designed for consistency with the way RPM
            does things.  If you need more complicated versions in installed
            packages, you should override your package's version string to
            express it more sensibly.
         """
-        if other is None:
-            return False
-
-        # Coerce if other is not a Version
-        # simple equality test first.
-        if self.version == other.version:
-            return False
-
-        # Standard comparison of two numeric versions
-        for a, b in zip(self.version, other.version):
-            if a == b:
-                continue
-            else:
-                if a in infinity_versions:
-                    if b in infinity_versions:
-                        return (infinity_versions.index(a) >
-                                infinity_versions.index(b))
-                    else:
-                        return False
-                if b in infinity_versions:
-                    return True
-
-                # Neither a nor b is infinity
-                # Numbers are always "newer" than letters.
-                # This is for consistency with RPM.  See patch
-                # #60884 (and details) from bugzilla #50977 in
-                # the RPM project at rpm.org.  Or look at
-                # rpmvercmp.c if you want to see how this is
-                # implemented there.
-                if type(a) != type(b):
-                    return type(b) == int
-                else:
-                    return a < b
-
-        # If the common prefix is equal, the one
-        # with more segments is bigger.
-        return len(self.version) < len(other.version)
+        if type(other) != Version:
+            if other is None:
+                return False
+            a, b = coerce_versions(self, other)
+            return a < b
+
+        # Versions are compared component by component, and if the common
+        # prefix is equal, the one with more segments is bigger.  Infinity
+        # versions are bigger than numbers.  Numbers are always "newer"
+        # than letters.  This is for consistency with RPM.  See patch
+        # #60884 (and details) from bugzilla #50977 in the RPM project at
+        # rpm.org.  Or look at rpmvercmp.c if you want to see how this is
+        # implemented there.  All of this is encoded in the comparison key
+        # computed in the constructor.
+        return self._cmp_key < other._cmp_key
 
-    @coerced
     def __eq__(self, other):
-        return (other is not None and
-                type(other) == Version and self.version == other.version)
+        if type(other) != Version:
+            if other is None:
+                return False
+            a, b = coerce_versions(self, other)
+            return a == b
+        return self._cmp_key == other._cmp_key
 
     @coerced
     def __ne__(self, other):
@@ -328,7 +333,7 @@ def __ge__(self, other):
 
     @coerced
     def __gt__(self, other):
-        return not (self == other) and not (self < other)
+        return other is None or self._cmp_key > other._cmp_key
 
     def __hash__(self):
         return hash(self.version)
@@ -388,6 +393,17 @@ def __init__(self, start, end):
         if start and end and end < start:
             raise ValueError("Invalid Version range: %s" % self)
 
+        # Ranges sort by start, then by end; an open start is lower and an
+        # open end is greater than any version.  The upper key is greater
+        # than the key of any version the range contains.
+        start_key = _open_start if start is None else (1, start._cmp_key)
+        if end is None:
+            self._sort_key = (start_key, _open_end)
+            self._upper_key = _open_end
+        else:
+            self._sort_key = (start_key, (1, end._cmp_key))
+            self._upper_key = end._upper_key
+
     def lowest(self):
         return self.start
 
@@ -404,12 +420,7 @@ def __lt__(self, other):
         if other is None:
             return False
 
-        s, o = self, other
-        if s.start != o.start:
-            return s.start is None or (
-                o.start is not None and s.start < o.start)
-        return (s.end != o.end and
-                o.end is None or (s.end is not None and s.end < o.end))
+        return self._sort_key < other._sort_key
 
     @coerced
     def __eq__(self, other):
@@ -578,40 +589,68 @@ def __str__(self):
 
 
 class VersionList(object):
-    """Sorted, non-redundant list of Versions and VersionRanges."""
+    """Sorted, non-redundant list of Versions and VersionRanges.
+
+    The sort keys of the elements are kept alongside them, so that
+    elements can be looked up by bisection.  Elements are disjoint, so
+    the elements that may overlap a version or range are the ones between
+    its start and its upper key (see ``_candidates()``).
+    """
 
     def __init__(self, vlist=None):
         self.versions = []
+        self._keys = []
         if vlist is not None:
             if isinstance(vlist, string_types):
                 vlist = _string_to_version(vlist)
                 if type(vlist) == VersionList:
-                    self.versions = vlist.versions
+                    self._set(vlist.versions)
                 else:
-                    self.versions = [vlist]
+                    self._set([vlist])
             else:
                 vlist = list(vlist)
                 for v in vlist:
                     self.add(ver(v))
 
+    def _set(self, versions):
+        self.versions = versions
+        self._keys = [v._sort_key for v in versions]
+
+    def _candidates(self, version):
+        """Elements of this list that may overlap a Version or VersionRange.
+
+        Overlapping elements start at or before the upper key of the
+        version and end at or after its start.
+        """
+        versions = self.versions
+        start = version._sort_key[0]
+        i = bisect_left(self._keys, (start,))
+        while i > 0 and versions[i - 1]._upper_key >= start:
+            i -= 1
+        j = bisect_right(self._keys, (version._upper_key, _beyond), i)
+        return versions[i:j]
+
     def add(self, version):
         if type(version) in (Version, VersionRange):
             # This normalizes single-value version ranges.
             if version.concrete:
                 version = version.concrete
 
-            i = bisect_left(self, version)
+            i = bisect_left(self._keys, version._sort_key)
 
             while i - 1 >= 0 and version.overlaps(self[i - 1]):
                 version = version.union(self[i - 1])
                 del self.versions[i - 1]
+                del self._keys[i - 1]
                 i -= 1
 
             while i < len(self) and version.overlaps(self[i]):
                 version = version.union(self[i])
                 del self.versions[i]
+                del self._keys[i]
 
             self.versions.insert(i, version)
+            self._keys.insert(i, version._sort_key)
 
         elif type(version) == VersionList:
             for v in version:
@@ -628,7 +667,10 @@ def concrete(self):
             return None
 
     def copy(self):
-        return VersionList(self)
+        clone = VersionList()
+        clone.versions = list(self.versions)
+        clone._keys = list(self._keys)
+        return clone
 
     def lowest(self):
         """Get the lowest version in the list."""
@@ -661,20 +703,26 @@ def preferred(self):
             latest = self.highest()
         return latest
 
+    def _pairs(self, other):
+        """Pairs of elements of this list and the other that may overlap.
+
+        The elements of the shorter list are looked up in the longer one.
+        """
+        if len(self) <= len(other):
+            for s in self:
+                for o in other._candidates(s):
+                    yield s, o
+        else:
+            for o in other:
+                for s in self._candidates(o):
+                    yield s, o
+
     @coerced
     def overlaps(self, other):
         if not other or not self:
             return False
 
-        s = o = 0
-        while s < len(self) and o < len(other):
-            if self[s].overlaps(other[o]):
-                return True
-            elif self[s] < other[o]:
-                s += 1
-            else:
-                o += 1
-        return False
+        return any(s.overlaps(o) for s, o in self._pairs(other))
 
     def to_dict(self):
         """Generate human-readable dict for YAML."""
@@ -714,15 +762,7 @@ def satisfies(self, other, strict=False):
         if strict:
             return self in other
 
-        s = o = 0
-        while s < len(self) and o < len(other):
-            if self[s].satisfies(other[o]):
-                return True
-            elif self[s] < other[o]:
-                s += 1
-            else:
-                o += 1
-        return False
+        return any(s.satisfies(o) for s, o in self._pairs(other))
 
     @coerced
     def update(self, other):
@@ -737,11 +777,9 @@ def union(self, other):
 
     @coerced
     def intersection(self, other):
-        # TODO: make this faster.  This is O(n^2).
         result = VersionList()
-        for s in self:
-            for o in other:
-                result.add(s.intersection(o))
+        for s, o in self._pairs(other):
+            result.add(s.intersection(o))
         return result
 
     @coerced
@@ -752,7 +790,7 @@ def intersect(self, other):
         """
         isection = self.intersection(other)
         changed = (isection.versions != self.versions)
-        self.versions = isection.versions
+        self._set(isection.versions)
         return changed
 
     @coerced
@@ -761,11 +799,7 @@ def __contains__(self, other):
             return False
 
         for version in other:
-            i = bisect_left(self, other)
-            if i == 0:
-                if version not in self[0]:
-                    return False
-            elif all(version not in v for v in self[i - 1:]):
+            if all(version not in v for v in self._candidates(version)):
                 return False
 
         return True
@@ -0,0 +1,89 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Compare the buildcache payload formats on a synthetic install prefix.
+
+Usage:
+    spack python share/spack/qa/benchmarks/buildcache_compression.py [MB]
+
+Creates a prefix of about MB megabytes (default 5120), half text and half
+incompressible data, in files of 1 to 64 MB. For each format it times
+creating the compressed tarball (as ``spack buildcache create`` does) and
+extracting it while checksumming it (as ``spack buildcache install``
+does), and reports the archive size and install throughput.
+"""
+from __future__ import division
+from __future__ import print_function
+
+import hashlib
+import os
+import random
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+from contextlib import closing
+
+import spack.binary_distribution as bindist
+import spack.util.compression as compression
+
+size = int(sys.argv[1]) if len(sys.argv) > 1 else 5120
+formats = [('gzip', 'gz'), ('zstd', 'zst')]
+mb = 1024 * 1024
+
+root = tempfile.mkdtemp()
+prefix = os.path.join(root, 'prefix')
+workdir = os.path.join(root, 'workdir')
+os.makedirs(workdir)
+
+rng = random.Random(0)
+text = b''.join(b'libfoo.so.%d /opt/spack/linux/gcc/foo-%d\n' % (i, i)
+                for i in range(100000))
+written = 0
+while written < size * mb:
+    n = rng.randint(1, 64) * mb
+    directory = os.path.join(prefix, 'lib%d' % (written // (512 * mb)))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(os.path.join(directory, 'file%d' % written), 'wb') as f:
+        if rng.random() < 0.5:
+            f.write((text * (n // len(text) + 1))[:n])
+        else:
+            f.write(os.urandom(n))
+    written += n
+
+print('{0} MB prefix'.format(written // mb))
+print('{0:<8}{1:>12}{2:>12}{3:>12}{4:>16}'.format(
+    'format', 'size (MB)', 'create (s)', 'install (s)', 'install (MB/s)'))
+try:
+    for name, ext in formats:
+        if compression.compression_command(ext) is None:
+            print('{0:<8}  not available'.format(name))
+            continue
+        archive = os.path.join(root, 'payload.tar.' + ext)
+
+        start = time.time()
+        with open(archive, 'wb') as f:
+            with compression.compressing_writer(f, ext) as stream:
+                with closing(tarfile.open(fileobj=stream, mode='w|')) as tar:
+                    bindist.add_prefix_to_tarball(tar, prefix, workdir, 'pkg')
+        create = time.time() - start
+
+        dest = os.path.join(root, 'dest')
+        os.makedirs(dest)
+        start = time.time()
+        with open(archive, 'rb') as f:
+            compression.untar_stream(
+                bindist._HashingReader(f, hashlib.sha256()), ext, dest)
+        install = time.time() - start
+        shutil.rmtree(dest)
+
+        print('{0:<8}{1:>12.0f}{2:>12.1f}{3:>12.1f}{4:>16.0f}'.format(
+            name, os.path.getsize(archive) / mb, create, install,
+            written / mb / install))
+        os.remove(archive)
+finally:
+    shutil.rmtree(root)
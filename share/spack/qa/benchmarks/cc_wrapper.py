@@ -0,0 +1,89 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Measure the per-invocation overhead of Spack's compiler wrapper.
+
+Usage:
+    spack python share/spack/qa/benchmarks/cc_wrapper.py [N [DEPS]]
+
+Runs a no-op "compiler" N times (default 500) directly, through the
+``cc`` wrapper, and through the wrapper with precomputed argument lists
+(``SPACK_CC_CACHE_FILE``), in an environment that mimics a build with
+DEPS dependencies (default 100).
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import spack.build_environment
+import spack.paths
+from spack.util.environment import system_dirs
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+ndeps = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+true = '/bin/true' if os.path.exists('/bin/true') else '/usr/bin/true'
+prefixes = ['/opt/spack/dep{0}-abcdefghijklmnop'.format(i)
+            for i in range(ndeps)]
+
+env = dict(os.environ)
+env.update({
+    'SPACK_CC': true,
+    'SPACK_CXX': true,
+    'SPACK_FC': true,
+    'SPACK_F77': true,
+    'SPACK_ENV_PATH': spack.paths.build_env_path,
+    'SPACK_DEBUG_LOG_DIR': '.',
+    'SPACK_DEBUG_LOG_ID': 'foo-hashabc',
+    'SPACK_COMPILER_SPEC': 'gcc@9.3.0',
+    'SPACK_SHORT_SPEC': 'foo@1.2 arch=linux-rhel7-x86_64 /hashabc',
+    'SPACK_SYSTEM_DIRS': ':'.join(system_dirs),
+    'SPACK_CC_RPATH_ARG': '-Wl,-rpath,',
+    'SPACK_CXX_RPATH_ARG': '-Wl,-rpath,',
+    'SPACK_F77_RPATH_ARG': '-Wl,-rpath,',
+    'SPACK_FC_RPATH_ARG': '-Wl,-rpath,',
+    'SPACK_TARGET_ARGS': '-march=haswell -mtune=haswell',
+    'SPACK_LINKER_ARG': '-Wl,',
+    'SPACK_DTAGS_TO_ADD': '--disable-new-dtags',
+    'SPACK_DTAGS_TO_STRIP': '--enable-new-dtags',
+    'SPACK_CFLAGS': '-O2 -g',
+    'SPACK_INCLUDE_DIRS': ':'.join(p + '/include' for p in prefixes),
+    'SPACK_LINK_DIRS': ':'.join(p + '/lib' for p in prefixes),
+    'SPACK_RPATH_DIRS': ':'.join(p + '/lib' for p in prefixes),
+    'PATH': ':'.join([spack.paths.build_env_path] +
+                     [p + '/bin' for p in prefixes] +
+                     [os.environ.get('PATH', '')]),
+})
+env.pop('SPACK_CC_CACHE_FILE', None)
+
+compile_args = ['-c', 'foo.c', '-o', 'foo.o', '-I.', '-DNDEBUG']
+wrapper = os.path.join(spack.paths.build_env_path, 'cc')
+
+
+def run(command, environ):
+    start = time.time()
+    for _ in range(n):
+        subprocess.check_call(command + compile_args, env=environ)
+    return (time.time() - start) / n
+
+
+with tempfile.NamedTemporaryFile('w', suffix='.sh') as cache:
+    cache.write(spack.build_environment.wrapper_cache_contents(env))
+    cache.flush()
+    cached_env = dict(env, SPACK_CC_CACHE_FILE=cache.name)
+
+    direct = run([true], env)
+    plain = run([wrapper], env)
+    cached = run([wrapper], cached_env)
+
+print('{0} invocations, {1} dependencies'.format(n, ndeps))
+print('{0:<24}{1:>10.3f} ms'.format('direct compiler', direct * 1e3))
+for name, t in [('wrapper', plain), ('wrapper, cached lists', cached)]:
+    print('{0:<24}{1:>10.3f} ms   (+{2:.3f} ms overhead)'.format(
+        name, t * 1e3, (t - direct) * 1e3))
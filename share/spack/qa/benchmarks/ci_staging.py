@@ -0,0 +1,90 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Time the staging of pipeline jobs on synthetic dependency DAGs.
+
+Usage:
+    spack python share/spack/qa/benchmarks/ci_staging.py [N [DEPS]]
+
+Builds two random DAGs of N jobs (default 10000), where each job depends
+on up to DEPS (default 8) earlier jobs: a "wide" one, where dependencies
+are picked among all earlier jobs, and a "deep" one, where they are picked
+among the few jobs just before, so there are many stages.  For each it
+times the previous staging algorithm, which rescans the remaining jobs
+once per stage, and ``spack.ci.compute_stages`` with and without
+balancing, and reports the number of stages and the largest stage.
+"""
+from __future__ import print_function
+
+import random
+import sys
+import time
+
+from six import iteritems
+
+import spack.ci
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+ndeps = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+
+def make_dag(window):
+    rng = random.Random(0)
+    labels = ['pkg{0}/abcdefg'.format(i) for i in range(n)]
+    deps = {}
+    for i in range(1, n):
+        first = max(0, i - window)
+        picks = rng.sample(range(first, i), min(i - first, ndeps))
+        deps[labels[i]] = set(labels[j] for j in picks)
+    return labels, deps
+
+
+def rescan_stages(labels, deps):
+    """The staging algorithm ``compute_stages()`` replaced."""
+    def remove_satisfied_deps(deps, satisfied_list):
+        new_deps = {}
+        for key, value in iteritems(deps):
+            new_value = set([v for v in value if v not in satisfied_list])
+            if new_value:
+                new_deps[key] = new_value
+        return new_deps
+
+    dependencies = deps
+    unstaged = set(labels)
+    stages = []
+    while dependencies:
+        next_stage = unstaged.difference(set(dependencies.keys()))
+        stages.append(next_stage)
+        unstaged.difference_update(next_stage)
+        dependencies = remove_satisfied_deps(dependencies, next_stage)
+    if unstaged:
+        stages.append(unstaged.copy())
+    return stages
+
+
+def timed(function, *args):
+    start = time.time()
+    result = function(*args)
+    return time.time() - start, result
+
+
+print('{0} jobs, up to {1} dependencies each'.format(n, ndeps))
+print('{0:<8}{1:<20}{2:>10}{3:>10}{4:>12}'.format(
+    'DAG', 'algorithm', 'time (s)', 'stages', 'max jobs'))
+for name, window in [('wide', n), ('deep', 4 * ndeps)]:
+    labels, deps = make_dag(window)
+    reference = None
+    for algorithm, function, args in [
+            ('rescan', rescan_stages, (labels, deps)),
+            ('compute_stages', spack.ci.compute_stages, (labels, deps)),
+            ('balanced', spack.ci.compute_stages, (labels, deps, True))]:
+        elapsed, stages = timed(function, *args)
+        if reference is None:
+            reference = stages
+        elif algorithm == 'compute_stages':
+            assert stages == reference
+        print('{0:<8}{1:<20}{2:>10.3f}{3:>10}{4:>12}'.format(
+            name, algorithm, elapsed, len(stages),
+            max(len(s) for s in stages)))
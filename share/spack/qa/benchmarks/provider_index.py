@@ -0,0 +1,162 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Time virtual provider lookups with and without bucketing and memoization.
+
+Usage:
+    spack python share/spack/qa/benchmarks/provider_index.py [SPEC ...]
+
+Concretizes each SPEC (default: a few MPI, BLAS and LAPACK heavy specs)
+once to warm up, then times, with the previous ``ProviderIndex`` lookups
+(which check every provided spec of a virtual, and cross all the provider
+maps pairwise, without memoization) and with the current ones:
+
+* ``providers_for()`` queries on the repository index, for every virtual
+  with and without version constraints,
+* ``satisfies()`` between the provider index of each concrete DAG and
+  those of its sub-DAGs, as ``Spec.satisfies_dependencies()`` does,
+* concretizing all the specs.
+"""
+from __future__ import print_function
+
+import contextlib
+import itertools
+import sys
+import time
+
+import six
+
+import llnl.util.lang
+
+import spack.provider_index as pi
+import spack.repo
+import spack.spec
+from spack.error import UnsatisfiableSpecError
+
+specs = sys.argv[1:] or ['hdf5+mpi', 'netcdf-c', 'petsc', 'mumps']
+
+
+def plain_satisfies(spec, other, spec_key=None, other_key=None):
+    return spec.satisfies(other, deps=False)
+
+
+def providers_for(self, virtual_spec):
+    """The linear scan ``ProviderIndex.providers_for()`` used to do."""
+    result = set()
+    if isinstance(virtual_spec, six.string_types):
+        virtual_spec = spack.spec.Spec(virtual_spec)
+
+    if virtual_spec.name in self.providers:
+        for p_spec, spec_set in self.providers[virtual_spec.name].items():
+            if p_spec.satisfies(virtual_spec, deps=False):
+                result.update(spec_set)
+
+    return sorted(s.copy() for s in result)
+
+
+def cross_provider_maps(lmap, rmap):
+    """The pairwise crossing ``ProviderIndex.satisfies()`` used to do."""
+    result = {}
+    for lspec, rspec in itertools.product(lmap, rmap):
+        try:
+            constrained = lspec.constrained(rspec)
+        except UnsatisfiableSpecError:
+            continue
+
+        for lp_spec, rp_spec in itertools.product(lmap[lspec], rmap[rspec]):
+            if lp_spec.name == rp_spec.name:
+                try:
+                    const = lp_spec.constrained(rp_spec, deps=False)
+                    result.setdefault(constrained, set()).add(const)
+                except UnsatisfiableSpecError:
+                    continue
+    return result
+
+
+def satisfies(self, other):
+    common = set(self.providers) & set(other.providers)
+    if not common:
+        return True
+
+    result = {}
+    for name in common:
+        crossed = cross_provider_maps(
+            self.providers[name], other.providers[name])
+        if crossed:
+            result[name] = crossed
+
+    return all(c in result for c in common)
+
+
+@contextlib.contextmanager
+def previous():
+    saved = (pi._satisfies, pi._IndexBase.providers_for,
+             pi._IndexBase.satisfies)
+    pi._satisfies = plain_satisfies
+    pi._IndexBase.providers_for = providers_for
+    pi._IndexBase.satisfies = satisfies
+    try:
+        yield
+    finally:
+        (pi._satisfies, pi._IndexBase.providers_for,
+         pi._IndexBase.satisfies) = saved
+
+
+@contextlib.contextmanager
+def current():
+    pi._satisfies_cache.clear()
+    pi._compatible_cache.clear()
+    yield
+
+
+def timed(function, *args):
+    start = time.time()
+    function(*args)
+    return time.time() - start
+
+
+def lookups(index, queries):
+    for _ in range(20):
+        for query in queries:
+            index.providers_for(query)
+
+
+def cross_satisfies(pairs):
+    for left, right in pairs:
+        left.satisfies(right)
+
+
+def concretize():
+    for spec in specs:
+        spack.spec.Spec(spec).concretized()
+
+
+index = spack.repo.path.provider_index
+queries = []
+for name, provided in index.providers.items():
+    queries.append(spack.spec.Spec(name))
+    queries.extend(spack.spec.Spec(str(p)) for p in provided if p.versions)
+
+concrete = [spack.spec.Spec(s).concretized() for s in specs]
+pairs = []
+for root in concrete:
+    root_index = pi.ProviderIndex(root.traverse(), restrict=True)
+    pairs.extend((root_index, pi.ProviderIndex(s.traverse(), restrict=True))
+                 for s in root.traverse())
+
+print('{0} queries, {1} index pairs, specs: {2}'.format(
+    len(queries), len(pairs), ' '.join(specs)))
+print('{0:<16}{1:>12}{2:>12}{3:>12}'.format(
+    'implementation', 'lookups', 'satisfies', 'concretize'))
+for name, mode in [('previous', previous), ('current', current)]:
+    with mode():
+        times = [timed(lookups, index, queries),
+                 timed(cross_satisfies, pairs),
+                 timed(concretize)]
+    print('{0:<16}{1:>12.3f}{2:>12.3f}{3:>12.3f}'.format(name, *times))
+
+for cache in llnl.util.lang.lru_cache_statistics():
+    if cache.name.startswith('provider'):
+        print(cache)
@@ -0,0 +1,144 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Time copies of concrete specs with and without structure sharing.
+
+Usage:
+    spack python share/spack/qa/benchmarks/spec_copy.py [N [COPIES]]
+
+Builds a synthetic concrete DAG of N specs (default 500), each with a
+version, compiler, architecture, variants and compiler flags.  Then it
+makes COPIES (default 50) full copies, and as many copies restricted to
+link and run dependencies (as environment views do), first with the
+previous ``Spec._dup()``, which duplicated the versions, architecture,
+compiler and variants of every node, and then with the current one, which
+shares them between copies of concrete specs.  It reports the time taken
+and, on Python 3, the memory held by the copies.
+"""
+from __future__ import print_function
+
+import contextlib
+import random
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import spack.dependency as dp
+from spack.spec import Spec, DependencyMap
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+copies = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+
+def deep_dup(self, other, deps=True, cleardeps=True, caches=None):
+    """``Spec._dup()`` before node attributes were shared."""
+    self._package = None
+    self.name = other.name
+    self.versions = other.versions.copy()
+    self.architecture = other.architecture.copy() if other.architecture \
+        else None
+    self.compiler = other.compiler.copy() if other.compiler else None
+    if cleardeps:
+        self._dependents = DependencyMap()
+        self._dependencies = DependencyMap()
+    self.compiler_flags = other.compiler_flags.copy()
+    self.compiler_flags.spec = self
+    self.variants = other.variants.copy()
+    for k, v in other.variants.items():
+        patches = getattr(v, '_patches_in_order_of_appearance', None)
+        if patches:
+            self.variants[k]._patches_in_order_of_appearance = patches
+    self.variants.spec = self
+    self.external_path = other.external_path
+    self.external_modules = other.external_modules
+    self.extra_attributes = other.extra_attributes
+    self.namespace = other.namespace
+
+    if caches is None:
+        caches = (deps is True or deps == dp.all_deptypes)
+    if deps:
+        deptypes = dp.all_deptypes
+        if isinstance(deps, (tuple, list)):
+            deptypes = deps
+        self._dup_deps(other, deptypes, caches)
+
+    self._concrete = other._concrete
+    if caches:
+        self._hash = other._hash
+        self._build_hash = other._build_hash
+        self._cmp_key_cache = other._cmp_key_cache
+        self._normal = other._normal
+        self._full_hash = other._full_hash
+    else:
+        self._hash = None
+        self._build_hash = None
+        self._cmp_key_cache = None
+        self._normal = False
+        self._full_hash = None
+    return True
+
+
+@contextlib.contextmanager
+def previous():
+    saved = Spec._dup
+    Spec._dup = deep_dup
+    try:
+        yield
+    finally:
+        Spec._dup = saved
+
+
+@contextlib.contextmanager
+def current():
+    yield
+
+
+def make_dag():
+    rng = random.Random(0)
+    specs = [Spec('pkg{0}@1.{0}.0%gcc@9.3.0+shared~debug build_type=Release '
+                  'cflags=-O2 arch=linux-centos7-x86_64'.format(i))
+             for i in range(n)]
+    for i, spec in enumerate(specs):
+        children = set(c for c in (2 * i + 1, 2 * i + 2) if c < n)
+        if children:
+            children.add(rng.randrange(i + 1, n))
+        for c in children:
+            deptypes = ('build',) if c % 7 == 0 else ('build', 'link')
+            spec._add_dependency(specs[c], deptypes)
+    specs[0]._mark_concrete()
+    return specs[0]
+
+
+def make_copies(root):
+    result = []
+    for _ in range(copies):
+        result.append(root.copy())
+        result.append(root.copy(deps=('link', 'run')))
+    return result
+
+
+root = make_dag()
+print('{0} nodes, {1} full and {1} link/run copies'.format(n, copies))
+print('{0:<16}{1:>12}{2:>14}'.format('implementation', 'time (s)',
+                                     'memory (MB)'))
+for name, mode in [('previous', previous), ('current', current)]:
+    with mode():
+        start = time.time()
+        make_copies(root)
+        elapsed = time.time() - start
+
+        memory = float('nan')
+        if tracemalloc:
+            tracemalloc.start()
+            result = make_copies(root)
+            memory = tracemalloc.get_traced_memory()[0] / 1024.0 ** 2
+            tracemalloc.stop()
+            assert all(c == root for c in result[::2])
+            del result
+    print('{0:<16}{1:>12.3f}{2:>14.1f}'.format(name, elapsed, memory))
@@ -0,0 +1,261 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Time spec formatting with and without compiled format strings.
+
+Usage:
+    spack python share/spack/qa/benchmarks/spec_format.py [N]
+
+Makes N (default 40000) concrete specs, as in a large store, and formats
+them the way ``spack find -l`` does, through ``spack.cmd.display_specs()``
+with output discarded, and with the default format string of ``str()``.
+It does so first with the previous ``Spec.format()``, which parsed the
+format string character by character for every spec, and then with the
+current one, which compiles each format string once, and with
+``spack.spec.format_specs()``, which formats all the specs of a listing
+in one call.
+"""
+from __future__ import print_function
+
+import contextlib
+import os
+import re
+import sys
+import time
+
+import six
+
+import llnl.util.tty.color as clr
+
+import spack.cmd
+import spack.paths
+import spack.spec
+import spack.store
+import spack.variant
+import spack.version
+from spack.spec import Spec, SpecFormatSigilError, SpecFormatStringError
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 40000
+
+
+def parse_every_time(self, format_string=spack.spec.default_format,
+                     **kwargs):
+    """``Spec.format()`` before format strings were compiled."""
+    # If we have an unescaped $ sigil, use the deprecated format strings
+    if re.search(r'[^\\]*\$', format_string):
+        return self.old_format(format_string, **kwargs)
+
+    color = kwargs.get('color', False)
+    transform = kwargs.get('transform', {})
+
+    out = six.StringIO()
+
+    def write(s, c=None):
+        f = clr.cescape(s)
+        if c is not None:
+            f = spack.spec.color_formats[c] + f + '@.'
+        clr.cwrite(f, stream=out, color=color)
+
+    def write_attribute(spec, attribute, color):
+        current = spec
+        if attribute.startswith('^'):
+            attribute = attribute[1:]
+            dep, attribute = attribute.split('.', 1)
+            current = self[dep]
+
+        if attribute == '':
+            raise SpecFormatStringError(
+                'Format string attributes must be non-empty')
+        attribute = attribute.lower()
+
+        sig = ''
+        if attribute[0] in '@%/':
+            # color sigils that are inside braces
+            sig = attribute[0]
+            attribute = attribute[1:]
+        elif attribute.startswith('arch='):
+            sig = ' arch='  # include space as separator
+            attribute = attribute[5:]
+
+        parts = attribute.split('.')
+        assert parts
+
+        # check that the sigil is valid for the attribute.
+        if sig == '@' and parts[-1] not in ('versions', 'version'):
+            raise SpecFormatSigilError(sig, 'versions', attribute)
+        elif sig == '%' and attribute not in ('compiler', 'compiler.name'):
+            raise SpecFormatSigilError(sig, 'compilers', attribute)
+        elif sig == '/' and not re.match(r'hash(:\d+)?$', attribute):
+            raise SpecFormatSigilError(sig, 'DAG hashes', attribute)
+        elif sig == ' arch=' and attribute not in ('architecture', 'arch'):
+            raise SpecFormatSigilError(sig, 'the architecture', attribute)
+
+        # find the morph function for our attribute
+        morph = transform.get(attribute, lambda s, x: x)
+
+        # Special cases for non-spec attributes and hashes.
+        # These must be the only non-dep component of the format attribute
+        if attribute == 'spack_root':
+            write(morph(spec, spack.paths.spack_root))
+            return
+        elif attribute == 'spack_install':
+            write(morph(spec, spack.store.layout.root))
+            return
+        elif re.match(r'hash(:\d)?', attribute):
+            col = '#'
+            if ':' in attribute:
+                _, length = attribute.split(':')
+                write(sig + morph(spec, spec.dag_hash(int(length))), col)
+            else:
+                write(sig + morph(spec, spec.dag_hash()), col)
+            return
+
+        # Iterate over components using getattr to get next element
+        for idx, part in enumerate(parts):
+            if not part:
+                raise SpecFormatStringError(
+                    'Format string attributes must be non-empty'
+                )
+            if part.startswith('_'):
+                raise SpecFormatStringError(
+                    'Attempted to format private attribute'
+                )
+            else:
+                if isinstance(current, spack.variant.VariantMap):
+                    # subscript instead of getattr for variant names
+                    current = current[part]
+                else:
+                    # aliases
+                    if part == 'arch':
+                        part = 'architecture'
+                    elif part == 'version':
+                        # Version requires concrete spec, versions does not
+                        # when concrete, they print the same thing
+                        part = 'versions'
+                    try:
+                        current = getattr(current, part)
+                    except AttributeError:
+                        parent = '.'.join(parts[:idx])
+                        m = 'Attempted to format attribute %s.' % attribute
+                        m += 'Spec.%s has no attribute %s' % (parent, part)
+                        raise SpecFormatStringError(m)
+                    if isinstance(current, spack.version.VersionList):
+                        if current == spack.spec._any_version:
+                            # We don't print empty version lists
+                            return
+
+                if callable(current):
+                    raise SpecFormatStringError(
+                        'Attempted to format callable object'
+                    )
+                if not current:
+                    # We're not printing anything
+                    return
+
+        # Set color codes for various attributes
+        col = None
+        if 'variants' in parts:
+            col = '+'
+        elif 'architecture' in parts:
+            col = '='
+        elif 'compiler' in parts or 'compiler_flags' in parts:
+            col = '%'
+        elif 'version' in parts:
+            col = '@'
+
+        # Finally, write the ouptut
+        write(sig + morph(spec, str(current)), col)
+
+    attribute = ''
+    in_attribute = False
+    escape = False
+
+    for c in format_string:
+        if escape:
+            out.write(c)
+            escape = False
+        elif c == '\\':
+            escape = True
+        elif in_attribute:
+            if c == '}':
+                write_attribute(self, attribute, color)
+                attribute = ''
+                in_attribute = False
+            else:
+                attribute += c
+        else:
+            if c == '}':
+                raise SpecFormatStringError(
+                    'Encountered closing } before opening {'
+                )
+            elif c == '{':
+                in_attribute = True
+            else:
+                out.write(c)
+    if in_attribute:
+        raise SpecFormatStringError(
+            'Format string terminated while reading attribute.'
+            'Missing terminating }.'
+        )
+    return out.getvalue()
+
+
+@contextlib.contextmanager
+def previous():
+    saved = Spec.format, spack.spec.format_specs
+    Spec.format = parse_every_time
+    spack.spec.format_specs = lambda specs, format_string, **kwargs: [
+        s.format(format_string, **kwargs) for s in specs]
+    try:
+        yield
+    finally:
+        Spec.format, spack.spec.format_specs = saved
+
+
+@contextlib.contextmanager
+def current():
+    yield
+
+
+def make_specs():
+    template = Spec('pkg@1.0.0%gcc@9.3.0+shared~debug build_type=Release '
+                    'arch=linux-centos7-x86_64')
+    specs = []
+    for i in range(n):
+        spec = template.copy()
+        spec.name = 'pkg{0}'.format(i % 5000)
+        spec.versions = spack.version.VersionList(['1.{0}.0'.format(i)])
+        spec._mark_concrete()
+        spec.dag_hash()
+        specs.append(spec)
+    return specs
+
+
+def find_long(specs):
+    with open(os.devnull, 'w') as devnull:
+        saved, sys.stdout = sys.stdout, devnull
+        try:
+            spack.cmd.display_specs(specs, long=True)
+        finally:
+            sys.stdout = saved
+
+
+def default_format(specs):
+    for s in specs:
+        s.format()
+
+
+specs = make_specs()
+print('{0} concrete specs'.format(n))
+print('{0:<16}{1:>16}{2:>16}'.format(
+    'implementation', 'find -l (s)', 'str() fmt (s)'))
+for name, mode in [('previous', previous), ('current', current)]:
+    with mode():
+        times = []
+        for fn in (find_long, default_format):
+            start = time.time()
+            fn(specs)
+            times.append(time.time() - start)
+    print('{0:<16}{1:>16.3f}{2:>16.3f}'.format(name, *times))
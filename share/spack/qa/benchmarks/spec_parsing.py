@@ -0,0 +1,48 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Measure the effect of the parsed spec cache on concretization.
+
+Usage:
+    spack python share/spack/qa/benchmarks/spec_parsing.py [SPEC ...]
+
+Concretizes the given specs (by default, the roots of a typical
+scientific software environment) in a fresh process, as ``spack spec``
+would, once with the cache of parsed specs and once with it disabled.
+It reports the time taken, including loading the package classes and
+their ``when=`` specs, and the hit rate of the cache.
+"""
+from __future__ import print_function
+
+import subprocess
+import sys
+import time
+
+import spack.paths
+import spack.spec
+
+default_specs = ['hdf5+mpi', 'netcdf-c', 'petsc', 'py-numpy', 'py-scipy',
+                 'boost', 'cmake', 'openmpi', 'fftw', 'trilinos']
+
+if len(sys.argv) > 1 and sys.argv[1] in ('cached', 'uncached'):
+    if sys.argv[1] == 'uncached':
+        spack.spec._parsed_specs.maxsize = 0
+    start = time.time()
+    for s in sys.argv[2:]:
+        spack.spec.Spec(s).concretized()
+    print(time.time() - start, spack.spec._parsed_specs.hit_rate)
+    sys.exit(0)
+
+specs = sys.argv[1:] or default_specs
+print('{0} specs: {1}'.format(len(specs), ' '.join(specs)))
+print('{0:<12}{1:>12}{2:>12}'.format('cache', 'time (s)', 'hit rate'))
+for mode in ('uncached', 'cached'):
+    output = subprocess.check_output(
+        [sys.executable, spack.paths.spack_script, 'python', sys.argv[0],
+         mode] + specs)
+    elapsed, rate = output.decode('utf-8').split()
+    print('{0:<12}{1:>12.1f}{2:>12}'.format(
+        mode, float(elapsed),
+        '-' if rate == 'None' else '{0:.1%}'.format(float(rate))))
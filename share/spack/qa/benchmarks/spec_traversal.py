@@ -0,0 +1,130 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Time spec DAG traversals with the recursive and the iterative engine.
+
+Usage:
+    spack python share/spack/qa/benchmarks/spec_traversal.py [N [REPEAT]]
+
+Builds a synthetic DAG of N specs (default 1000): a binary tree where each
+inner node also depends on one random leaf, so that nodes are reached
+along several paths but the number of paths stays linear in N.  For each
+order (pre, post) and cover (nodes, edges, paths) it checks that both
+engines yield the same edges, then times REPEAT (default 20) traversals
+with the previous recursive ``Spec.traverse_edges()``, which nests one
+generator per level and sorts the dependencies of every node it visits,
+and with the current one.
+"""
+from __future__ import print_function
+
+import operator
+import random
+import sys
+import time
+
+import six
+
+import spack.dependency as dp
+from spack.spec import Spec, DependencySpec
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+
+def recursive_traverse_edges(self, visited=None, d=0, deptype='all',
+                             dep_spec=None, **kwargs):
+    """The recursive ``Spec.traverse_edges()`` that was replaced."""
+    depth = kwargs.get('depth', False)
+    key_fun = kwargs.get('key', id)
+    if isinstance(key_fun, six.string_types):
+        key_fun = operator.attrgetter(key_fun)
+    yield_root = kwargs.get('root', True)
+    cover = kwargs.get('cover', 'nodes')
+    direction = kwargs.get('direction', 'children')
+    order = kwargs.get('order', 'pre')
+    deptype = dp.canonical_deptype(deptype)
+
+    if visited is None:
+        visited = set()
+    key = key_fun(self)
+
+    if key in visited and cover == 'nodes':
+        return
+
+    def return_val(dspec):
+        if not dspec:
+            if direction == 'parents':
+                dspec = DependencySpec(self, None, ())
+            else:
+                dspec = DependencySpec(None, self, ())
+        return (d, dspec) if depth else dspec
+
+    yield_me = yield_root or d > 0
+
+    if yield_me and order == 'pre':
+        yield return_val(dep_spec)
+
+    if not (key in visited and cover == 'edges'):
+        visited.add(key)
+
+        if direction == 'children':
+            where = self._dependencies
+            succ = lambda dspec: dspec.spec
+        else:
+            where = self._dependents
+            succ = lambda dspec: dspec.parent
+
+        for name, dspec in sorted(where.items()):
+            dt = dspec.deptypes
+            if dt and not any(d in deptype for d in dt):
+                continue
+
+            for child in recursive_traverse_edges(
+                    succ(dspec), visited, d + 1, deptype, dspec, **kwargs):
+                yield child
+
+    if yield_me and order == 'post':
+        yield return_val(dep_spec)
+
+
+def make_dag():
+    rng = random.Random(0)
+    specs = [Spec('pkg{0}@1.0'.format(i)) for i in range(n)]
+    leaves = range(n // 2, n)
+    for i, spec in enumerate(specs):
+        children = [c for c in (2 * i + 1, 2 * i + 2) if c < n]
+        if children:
+            children.append(rng.choice(leaves))
+        for c in set(children):
+            spec._add_dependency(specs[c], ('build', 'link'))
+    return specs[0]
+
+
+def edge_names(edges):
+    return [(d, dspec.spec.name) for d, dspec in edges]
+
+
+def timed(function, root, **kwargs):
+    start = time.time()
+    for _ in range(repeat):
+        for _ in function(root, **kwargs):
+            pass
+    return time.time() - start
+
+
+root = make_dag()
+print('{0} nodes, {1} traversals each'.format(n, repeat))
+print('{0:<8}{1:<8}{2:>10}{3:>14}{4:>12}{5:>10}'.format(
+    'order', 'cover', 'yielded', 'recursive', 'iterative', 'speedup'))
+for order in ('pre', 'post'):
+    for cover in ('nodes', 'edges', 'paths'):
+        kwargs = dict(order=order, cover=cover, depth=True)
+        expected = edge_names(recursive_traverse_edges(root, **kwargs))
+        assert edge_names(root.traverse_edges(**kwargs)) == expected
+
+        before = timed(recursive_traverse_edges, root, **kwargs)
+        after = timed(Spec.traverse_edges, root, **kwargs)
+        print('{0:<8}{1:<8}{2:>10}{3:>14.3f}{4:>12.3f}{5:>10.1f}'.format(
+            order, cover, len(expected), before, after, before / after))
@@ -0,0 +1,142 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Time version comparisons and version list operations on the builtin repo.
+
+Usage:
+    spack python share/spack/qa/benchmarks/versions.py [REPEAT]
+
+Collects the versions of every package in the builtin repository and the
+version constraints that packages put on their dependencies.  Then it
+times, REPEAT times (default 3), sorting the versions of each package,
+and intersecting each package's version list with, and checking it
+against, every constraint on it.  Each operation is timed with the
+previous algorithms (walking version components in ``__lt__``, pairwise
+intersection and linear scans of the lists) and with the current ones.
+"""
+from __future__ import print_function
+
+import functools
+import sys
+import time
+
+import spack.repo
+from spack.version import VersionList, infinity_versions
+
+repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+
+def component_walk_cmp(a, b):
+    """The comparison ``Version.__lt__`` used to make, as a cmp function."""
+    def lt(x, y):
+        if x.version == y.version:
+            return False
+        for a, b in zip(x.version, y.version):
+            if a == b:
+                continue
+            if a in infinity_versions:
+                if b in infinity_versions:
+                    return (infinity_versions.index(a) >
+                            infinity_versions.index(b))
+                return False
+            if b in infinity_versions:
+                return True
+            if type(a) is not type(b):
+                return type(b) is int
+            return a < b
+        return len(x.version) < len(y.version)
+    return -1 if lt(a, b) else (1 if lt(b, a) else 0)
+
+
+def pairwise_intersection(a, b):
+    """The version list intersection that checked all pairs."""
+    result = VersionList()
+    for s in a:
+        for o in b:
+            result.add(s.intersection(o))
+    return result
+
+
+def scan_satisfies(a, b):
+    """The version list satisfies() that scanned both lists."""
+    s = o = 0
+    while s < len(a) and o < len(b):
+        if a[s].satisfies(b[o]):
+            return True
+        elif a[s] < b[o]:
+            s += 1
+        else:
+            o += 1
+    return False
+
+
+start = time.time()
+versions = {}
+constraints = []
+for pkg in spack.repo.path.all_packages():
+    versions[pkg.name] = list(pkg.versions)
+    for name, conditions in pkg.dependencies.items():
+        for dependency in conditions.values():
+            if dependency.spec.versions != VersionList(':'):
+                constraints.append((name, dependency.spec.versions))
+lists = dict((name, VersionList(v)) for name, v in versions.items())
+constraints = [(lists[name], c) for name, c in constraints if name in lists]
+all_versions = [v for vlist in versions.values() for v in vlist]
+
+
+def valid(vlist, constraint):
+    # Intersecting ranges with common prefixes can yield invalid ranges
+    try:
+        pairwise_intersection(vlist, constraint)
+        return True
+    except ValueError:
+        return False
+
+
+constraints = [(vlist, c) for vlist, c in constraints if valid(vlist, c)]
+print('{0} packages, {1} versions, {2} constraints (loaded in {3:.1f}s)'
+      .format(len(versions), sum(len(v) for v in versions.values()),
+              len(constraints), time.time() - start))
+
+
+def timed(function):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        result = function()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+benchmarks = [
+    ('sort versions',
+     lambda: sorted(all_versions,
+                    key=functools.cmp_to_key(component_walk_cmp)),
+     lambda: sorted(all_versions)),
+    ('build lists',
+     None,
+     lambda: [VersionList(v) for v in versions.values()]),
+    ('intersection',
+     lambda: [pairwise_intersection(vlist, c) for vlist, c in constraints],
+     lambda: [vlist.intersection(c) for vlist, c in constraints]),
+    ('satisfies',
+     lambda: [scan_satisfies(vlist, c) for vlist, c in constraints],
+     lambda: [vlist.satisfies(c) for vlist, c in constraints]),
+    ('overlaps',
+     None,
+     lambda: [vlist.overlaps(c) for vlist, c in constraints]),
+]
+
+print('{0:<16}{1:>16}{2:>16}'.format(
+    'operation', 'previous (s)', 'current (s)'))
+for name, previous, current in benchmarks:
+    new, result = timed(current)
+    if previous is None:
+        print('{0:<16}{1:>16}{2:>16.3f}'.format(name, '-', new))
+        continue
+    old, expected = timed(previous)
+    assert result == expected
+    print('{0:<16}{1:>16.3f}{2:>16.3f}'.format(name, old, new))
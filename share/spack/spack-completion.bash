@@ -465,7 +465,7 @@ _spack_ci() {
 }
 
 _spack_ci_generate() {
-    SPACK_COMPREPLY="-h --help --output-file --copy-to --spack-repo --spack-ref --optimize --dependencies"
+    SPACK_COMPREPLY="-h --help --output-file --copy-to --spack-repo --spack-ref --optimize --dependencies --prune-dag"
 }
 
 _spack_ci_rebuild() {
@@ -898,7 +898,7 @@ _spack_flake8() {
 }
 
 _spack_gc() {
-    SPACK_COMPREPLY="-h --help -y --yes-to-all"
+    SPACK_COMPREPLY="-h --help -y --yes-to-all -j --jobs -n --dry-run"
 }
 
 _spack_gpg() {
@@ -1250,7 +1250,7 @@ _spack_pkg() {
     then
         SPACK_COMPREPLY="-h --help"
     else
-        SPACK_COMPREPLY="add list diff added changed removed"
+        SPACK_COMPREPLY="add list diff added changed removed affected"
     fi
 }
 
@@ -1308,6 +1308,15 @@ _spack_pkg_removed() {
     fi
 }
 
+_spack_pkg_affected() {
+    if $list_options
+    then
+        SPACK_COMPREPLY="-h --help -i --installed --json"
+    else
+        SPACK_COMPREPLY=""
+    fi
+}
+
 _spack_providers() {
     if $list_options
     then
@@ -1530,7 +1539,7 @@ _spack_test_env() {
 _spack_uninstall() {
     if $list_options
     then
-        SPACK_COMPREPLY="-h --help -f --force -R --dependents -y --yes-to-all -a --all"
+        SPACK_COMPREPLY="-h --help -f --force -R --dependents -y --yes-to-all -j --jobs -a --all"
     else
         _installed_packages
     fi